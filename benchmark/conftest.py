@@ -0,0 +1,36 @@
+import os
+import pytest
+
+from q4_majorshortsqueezes.synthetic import generate_ticker_history, SyntheticMarketConfig, write_market
+from q4_majorshortsqueezes.ticker import store_ticker_to_csv, TickerHistory
+
+
+HISTORY_ROW_COUNTS = [1_000, 10_000, 100_000]
+UNIVERSE_SIZES = [100, 5_000]
+# Universe benchmarks care about the number of files, not their length.
+# A year of trading days keeps the 5k universe at a manageable size on disk.
+UNIVERSE_HISTORY_ROW_COUNT = 250
+# Long histories start early, since 100k trading days from 2000 on exceed the date range of pandas.
+HISTORY_START_DATE = "1800-01-01"
+
+
+@pytest.fixture(scope="session", params=HISTORY_ROW_COUNTS, ids=lambda rows: f"rows_{rows}")
+def ticker_history(request) -> TickerHistory:
+    ticker_history, _ = generate_ticker_history("TICKER", config=SyntheticMarketConfig(rows=request.param,
+                                                                                        start_date=HISTORY_START_DATE))
+    yield ticker_history
+
+
+@pytest.fixture(scope="session")
+def ticker_history_csv_path(ticker_history, tmp_path_factory) -> str:
+    path = os.path.join(tmp_path_factory.mktemp("ticker_history"), "TICKER.csv")
+    store_ticker_to_csv(ticker_history, path)
+    yield path
+
+
+@pytest.fixture(scope="session", params=UNIVERSE_SIZES, ids=lambda size: f"tickers_{size}")
+def ticker_universe_dir(request, tmp_path_factory) -> str:
+    # The universe contains squeezes, gaps and bad rows, see `load_ground_truth`
+    dir_path = str(tmp_path_factory.mktemp(f"universe_{request.param}"))
+    write_market(dir_path, request.param, SyntheticMarketConfig(rows=UNIVERSE_HISTORY_ROW_COUNT))
+    yield dir_path
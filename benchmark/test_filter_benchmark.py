@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from q4_majorshortsqueezes.filter import multiply_price_within_x_days, SortedFIFOCache
+from q4_majorshortsqueezes.ticker import Ticker
+
+
+@pytest.mark.parametrize("days", [5, 10])
+def test_multiply_price_within_x_days(benchmark, ticker_history, days):
+    # A multiplier that is never reached forces a scan of the full history.
+    # A new ticker object per call ensures that no shared series are reused between rounds.
+    benchmark(lambda: multiply_price_within_x_days(Ticker("TICKER", ticker_history),
+                                                   multiplier=1000, days=days))
+
+
+@pytest.mark.parametrize("days", [7, 14])
+def test_multiply_price_within_x_calendar_days(benchmark, ticker_history, days):
+    benchmark(lambda: multiply_price_within_x_days(Ticker("TICKER", ticker_history),
+                                                   multiplier=1000, days=days, calendar_days=True))
+
+
+@pytest.mark.parametrize("size", [5, 10, 100])
+def test_sorted_fifo_cache_add(benchmark, size):
+    values = np.random.default_rng(0).uniform(1, 100, 10_000).tolist()
+
+    def add_all():
+        cache = SortedFIFOCache(size=size, sort_key_func=lambda x: x)
+        for value in values:
+            cache.add(value)
+            cache.get_first()
+
+    benchmark(add_all)
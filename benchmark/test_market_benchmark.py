@@ -0,0 +1,14 @@
+import pytest
+
+from q4_majorshortsqueezes.market import active_squeeze_counts, trading_calendar
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer
+
+THRESHOLDS = [(2, 5), (3, 5), (5, 5), (2, 10), (3, 10), (5, 10)]
+
+
+@pytest.mark.parametrize("chunk_size", [64, 512])
+def test_active_squeeze_counts(benchmark, ticker_universe_dir, chunk_size):
+    container = FileBackedTicketContainer(ticker_universe_dir)
+    calendar = trading_calendar(container)
+    benchmark.pedantic(active_squeeze_counts, args=(container, THRESHOLDS),
+                       kwargs=dict(calendar=calendar, chunk_size=chunk_size), rounds=3, iterations=1)
@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from q4_majorshortsqueezes import filter
+from q4_majorshortsqueezes.panel import evaluate_criteria, SharedPanel
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, Ticker
+
+CRITERION_PATH = "q4_majorshortsqueezes.filter/price_multi_2_within_5_days"
+WORKERS = 4
+
+
+def _evaluate_pickled(item):
+    symbol, ticker_history = item
+    return filter.price_multi_2_within_5_days(Ticker(symbol, ticker_history))
+
+
+@pytest.fixture(scope="module")
+def universe_histories(ticker_universe_dir):
+    yield FileBackedTicketContainer(ticker_universe_dir).get_data()
+
+
+def test_evaluate_with_pickled_histories(benchmark, universe_histories):
+    # The baseline: Each history is pickled to a worker process
+    def evaluate():
+        with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+            return list(pool.map(_evaluate_pickled, universe_histories.items(), chunksize=64))
+
+    benchmark.pedantic(evaluate, rounds=3, iterations=1)
+
+
+def test_evaluate_with_shared_panel(benchmark, universe_histories):
+    with SharedPanel.create(universe_histories) as panel:
+        benchmark.pedantic(evaluate_criteria, args=(panel, [CRITERION_PATH]), kwargs=dict(max_workers=WORKERS),
+                           rounds=3, iterations=1)
+
+
+def test_create_shared_panel(benchmark, universe_histories):
+    benchmark.pedantic(lambda: SharedPanel.create(universe_histories).close(), rounds=3, iterations=1)
@@ -0,0 +1,26 @@
+from unittest import mock
+
+from q4_majorshortsqueezes.api.pull_data import main
+from q4_majorshortsqueezes.synthetic import load_ground_truth
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer
+
+
+def test_main_from_local_dir(benchmark, ticker_universe_dir, tmp_path):
+    tickers = set(FileBackedTicketContainer(ticker_universe_dir).get_tickers())
+
+    def run_main():
+        return main(tickers=tickers,
+                    start_date=None,
+                    criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                    csv_dir_path=ticker_universe_dir,
+                    csv_output_dir_path=str(tmp_path))
+
+    # Disable downloading and ensure we measure the local data path only
+    with mock.patch("q4_majorshortsqueezes.api.pull_data.load_ticker_history") as m:
+        m.side_effect = RuntimeError("The ticker should be loaded via a csv file.")
+        # A full run over a large universe takes seconds, a single round is precise enough.
+        result = benchmark.pedantic(run_main, rounds=1, iterations=1)
+
+    squeezed_tickers = [ticker for ticker, ground_truth in sorted(load_ground_truth(ticker_universe_dir).items())
+                        if ground_truth.has_squeeze(multiplier=2, days=5)]
+    assert result.get_tickers() == squeezed_tickers
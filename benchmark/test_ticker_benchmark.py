@@ -0,0 +1,90 @@
+import glob
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.ticker import (
+    FileBackedTicketContainer,
+    load_ticker_histories_from_csv,
+    load_ticker_history_from_csv,
+    store_ticker_to_csv,
+)
+
+
+def test_load_ticker_history_from_csv(benchmark, ticker_history_csv_path):
+    benchmark(load_ticker_history_from_csv, ticker_history_csv_path)
+
+
+def test_load_ticker_history_from_csv_with_columns(benchmark, ticker_history_csv_path):
+    benchmark(load_ticker_history_from_csv, ticker_history_csv_path, columns=["Adj Close"])
+
+
+def test_load_ticker_history_from_csv_with_date_range(benchmark, ticker_history, ticker_history_csv_path):
+    # The most recent tenth of the history
+    start_date = ticker_history.index[-len(ticker_history) // 10]
+    benchmark(load_ticker_history_from_csv, ticker_history_csv_path, start_date=start_date)
+
+
+def _universe_file_paths(dir_path):
+    return {os.path.basename(path)[:-4]: path for path in sorted(glob.glob(os.path.join(dir_path, "*.csv")))}
+
+
+def test_parse_universe_dir_with_type_inference(benchmark, ticker_universe_dir):
+    # The loader before schema types were used, as a baseline
+    file_paths = _universe_file_paths(ticker_universe_dir)
+    benchmark(lambda: {ticker: pd.read_csv(path, index_col="Date") for ticker, path in file_paths.items()})
+
+
+def test_parse_universe_dir(benchmark, ticker_universe_dir):
+    file_paths = _universe_file_paths(ticker_universe_dir)
+    benchmark(lambda: {ticker: load_ticker_history_from_csv(path) for ticker, path in file_paths.items()})
+
+
+def test_parse_universe_dir_in_parallel(benchmark, ticker_universe_dir):
+    file_paths = _universe_file_paths(ticker_universe_dir)
+    benchmark(load_ticker_histories_from_csv, file_paths)
+
+
+def test_parse_universe_dir_in_parallel_with_pyarrow(benchmark, ticker_universe_dir):
+    pytest.importorskip("pyarrow")
+    file_paths = _universe_file_paths(ticker_universe_dir)
+    benchmark(load_ticker_histories_from_csv, file_paths, engine="pyarrow")
+
+
+def test_store_ticker_to_csv(benchmark, ticker_history):
+    benchmark(lambda: store_ticker_to_csv(ticker_history, io.StringIO()))
+
+
+def test_file_backed_container_get_tickers(benchmark, ticker_universe_dir):
+    container = FileBackedTicketContainer(ticker_universe_dir)
+    benchmark(container.get_tickers)
+
+
+def test_file_backed_container_lookups(benchmark, ticker_universe_dir):
+    container = FileBackedTicketContainer(ticker_universe_dir)
+    # Look up a fixed amount of tickers, so that universes of different sizes stay comparable.
+    tickers = container.get_tickers()[:100]
+
+    def look_up_all():
+        for ticker in tickers:
+            container[ticker]
+
+    benchmark(look_up_all)
+
+
+@pytest.mark.parametrize("write_behind", [False, True], ids=["sync", "write_behind"])
+def test_file_backed_container_stores(benchmark, ticker_history, tmpdir, write_behind):
+    container = FileBackedTicketContainer(tmpdir, write_behind=write_behind)
+    rounds = iter(range(1000))
+
+    def store_all():
+        # New tickers each round, so that write-behind cannot merge pending writes of the same ticker.
+        round_id = next(rounds)
+        for i in range(20):
+            container.store_ticker(f"T{round_id:03}{i:02}", ticker_history)
+
+    # Only the time until the caller can continue is measured, `close` waits for the remaining writes.
+    benchmark.pedantic(store_all, rounds=3, iterations=1)
+    container.close()
@@ -0,0 +1,62 @@
+# TODO: Setup a python shebang that work with poetry interpreters across users
+import argparse
+import logging
+import time
+
+from q4_majorshortsqueezes.synthetic import GROUND_TRUTH_FILE_NAME, SyntheticMarketConfig, write_market
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic ticker files for scale tests, which can be used like pulled ticker files, "
+                    "e.g. as `--ticker-source-dir` of `pull_data.py`.\n"
+                    "The histories contain squeezes, gaps and bad rows, which are listed in a "
+                    f"`{GROUND_TRUTH_FILE_NAME}` file in the output dir. The same seed always yields the same files.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--output-path", required=True,
+                        help="The dir to write the `<ticker>.csv` files to. It is created if it does not exist.\n"
+                             "Careful! The script will override existing files!")
+    parser.add_argument("--tickers", type=int, default=1_000,
+                        help="The amount of tickers, which are named `T00000`, `T00001`, etc.")
+    parser.add_argument("--rows", type=int, default=SyntheticMarketConfig.rows,
+                        help="The amount of trading days of each ticker.")
+    parser.add_argument("--start-date", default=SyntheticMarketConfig.start_date,
+                        help="The first date of each ticker.")
+    parser.add_argument("--squeeze-probability", type=float, default=SyntheticMarketConfig.squeeze_probability,
+                        help="The probability of a ticker to have a squeeze.")
+    parser.add_argument("--gap-probability", type=float, default=SyntheticMarketConfig.gap_probability,
+                        help="The probability of a ticker to have a gap of several weeks.")
+    parser.add_argument("--bad-row-probability", type=float, default=SyntheticMarketConfig.bad_row_probability,
+                        help="The probability of a ticker to have a row with zero, missing or negative prices.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the random number generator.")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Activates debug log level.")
+    return parser
+
+
+def main():
+    # Parse args
+    parser = create_arg_parser()
+    args = parser.parse_args()
+    # Setup logging
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+    config = SyntheticMarketConfig(rows=args.rows,
+                                   start_date=args.start_date,
+                                   squeeze_probability=args.squeeze_probability,
+                                   gap_probability=args.gap_probability,
+                                   bad_row_probability=args.bad_row_probability)
+    # Generate tickers
+    start = time.perf_counter()
+    ground_truths = write_market(args.output_path, args.tickers, config, seed=args.seed)
+    logging.info("Wrote %s tickers to `%s` in %.3fs.", len(ground_truths), args.output_path,
+                 time.perf_counter() - start)
+    logging.info("%s tickers have squeezes, %s have gaps and %s have bad rows.",
+                 sum(bool(truth.squeezes) for truth in ground_truths.values()),
+                 sum(bool(truth.gap_dates) for truth in ground_truths.values()),
+                 sum(bool(truth.bad_dates) for truth in ground_truths.values()))
+
+
+if __name__ == "__main__":
+    main()
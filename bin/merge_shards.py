@@ -0,0 +1,59 @@
+# TODO: Setup a python shebang that work with poetry interpreters across users
+import argparse
+import logging
+import os
+
+from q4_majorshortsqueezes.events import write_events_csv
+from q4_majorshortsqueezes.shard import merge_shards
+
+
+def dir_path(path):
+    if not os.path.exists(path):
+        raise argparse.ArgumentTypeError(f"{path} does not exist")
+
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"{path} is not a valid dir")
+
+    return path
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Combine the outputs of the shards of a sharded `pull_data.py` run, which was started with "
+                    "`--shard-index` and `--shard-count`, into the output of a single run over all tickers.\n"
+                    "All shards must have completed, i.e. written their manifests.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--shard-dirs", nargs='+', type=dir_path, required=True,
+                        help="The `--output-path` dirs of the shards, e.g. copied from several machines. "
+                             "Shards may share a dir.")
+    parser.add_argument("--output-path", required=True,
+                        help="The dir to write the ticker files of all satisfying tickers to. "
+                             "It may be one of the shard dirs.")
+    parser.add_argument("--results-csv", default=None,
+                        help="Write the squeeze events of all shards to this csv file, in the format of the "
+                             "result files of `results_1`.")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Activates debug log level.")
+    return parser
+
+
+def main():
+    # Parse args
+    parser = create_arg_parser()
+    args = parser.parse_args()
+    # Setup logging
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+    # Merge shards
+    manifest = merge_shards(args.shard_dirs, args.output_path)
+    logging.info("Merged %s tickers, %s satisfied all filters.", len(manifest.tickers), len(manifest.satisfied))
+    logging.info(f"The following tickers satisfied all filters: `%s`", ", ".join(manifest.satisfied))
+    # Write results
+    if args.results_csv:
+        with open(args.results_csv, mode="w", newline="") as fd:
+            write_events_csv(manifest.events, fd)
+        logging.info("Wrote %s squeeze events to `%s`", len(manifest.events), args.results_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,15 @@ import os
 from typing import Set
 
 from q4_majorshortsqueezes.api import pull_data
+from q4_majorshortsqueezes.api.pull_data import StageConcurrency
+from q4_majorshortsqueezes.ledger import FailureLedger
+from q4_majorshortsqueezes.metrics import Metrics, NULL_METRICS
+from q4_majorshortsqueezes.profiling import CriterionProfiler
+from q4_majorshortsqueezes.quality import QUALITY_MODES
+from q4_majorshortsqueezes.retry import RetryPolicy
+from q4_majorshortsqueezes.shard import Shard
 from q4_majorshortsqueezes.ticker import retrieve_tickers_with_get_all_tickers_package
+from q4_majorshortsqueezes.universe import get_listings, select_symbols, UniverseStore
 from q4_majorshortsqueezes import filter
 
 
@@ -38,20 +46,43 @@ def create_arg_parser():
     parser.add_argument("--min-market-cap", default="0",
                         help="Minimum market cap of tickers (in million USD). "
                              "This does not apply to tickers set with `--tickers`.")
+    parser.add_argument("--universe-dir", default=None,
+                        help="A dir of dated ticker universe snapshots. If it is set, the listings of all "
+                             "exchanges are stored as snapshot of today whenever they are pulled, and "
+                             "`--nyse`, `--nasdaq`, `--amex` and `--min-market-cap` select from the snapshot.\n"
+                             "The symbols that were added and removed since the previous snapshot are logged.")
+    parser.add_argument("--snapshot", default=None,
+                        help="Select the tickers from this snapshot of `--universe-dir` instead of pulling "
+                             "the current listings, which needs no network access. "
+                             "`latest` refers to the latest snapshot.")
+    parser.add_argument("--only-added-since", default=None,
+                        help="Only process the selected tickers that are not listed in this snapshot of "
+                             "`--universe-dir`, e.g. to only download new listings. "
+                             "This does not apply to tickers set with `--tickers`.")
     parser.add_argument("--ticker-source-dir", type=dir_path, default=None,
                         help="Load tickers from the given dir if it is available. "
                              "The script expects the following naming schema: `<ticker>.csv`.\n"
                              "If a ticker is not found in the directory, it is downloaded "
                              "as fallback.")
+    parser.add_argument("--index-source-dir", action="store_true",
+                        help="Write the summaries (and quality reports) of the tickers of `--ticker-source-dir` "
+                             "into the dir, so that later runs can reject tickers without loading them. "
+                             "By default, nothing is written to `--ticker-source-dir`.")
     parser.add_argument("--start-date", default=None,
                         help="The start date for analyzing ticker data. "
                              "By default the max available date range is used. "
-                             "This has only effect on newly downloaded tickers (,not csv loaded).")
+                             "Tickers of `--ticker-source-dir` are only read from this date on, too.")
+    parser.add_argument("--end-date", default=None,
+                        help="The end date (inclusive) for analyzing ticker data. "
+                             "By default the data up to today is used. "
+                             "Tickers of `--ticker-source-dir` are only read up to this date, too.")
     parser.add_argument("--filters", nargs='+', default=[],
                         help="A list of Python paths to python functions which each adhere to the "
                              "this interface: `List[Callable[[Ticker], bool]`.\n"
                              "The path format for a criterion function is: "
-                             "`full.qualified.path.to.module/func_name`.\n\n"
+                             "`full.qualified.path.to.module/func_name`.\n"
+                             "Kernels over the history arrays, which are compiled with Numba if it is "
+                             "installed, are prefixed with `kernel:`, see `q4_majorshortsqueezes.kernel`.\n\n"
                              "Predefined filters are available under: "
                              f"`{filter.__name__}`.\n\n"
                              "To filter for tickers that have in the past doubled their "
@@ -62,19 +93,122 @@ def create_arg_parser():
                              "The file are stored as `csv` with the following naming scheme: "
                              "`<ticker_name>.csv`.\n"
                              "Careful! The script will override existing files!")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Measure per-stage timings and throughput and log a summary table "
+                             "at the end of the run.")
+    parser.add_argument("--metrics-output", default=None,
+                        help="Write the measurements of `--metrics` to this file (implies `--metrics`).\n"
+                             "Files ending with `.prom` or `.txt` are written in the Prometheus text "
+                             "format, all other files as JSON.")
+    parser.add_argument("--profile", type=dir_path, default=None,
+                        help="Profile each filter and the ticker load path with cProfile and write the "
+                             "results to the given dir:\n"
+                             "a `<section>.prof` file per filter/load section and a `hotspots.txt` "
+                             "report with the top hotspots and slowest tickers of each section.")
+    parser.add_argument("--profile-top-n", type=int, default=20,
+                        help="The amount of hotspots and slowest tickers listed per section "
+                             "in the `--profile` report.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Process the tickers in a pipeline of the stages fetch (csv lookup or download), "
+                             "normalize, evaluate filters and persist.\n"
+                             "The stages run concurrently and are connected by bounded queues, so that e.g. "
+                             "downloads and filtering overlap. It is not used together with `--profile`.")
+    parser.add_argument("--fetch-workers", type=int, default=StageConcurrency.fetch,
+                        help="The amount of concurrent fetches of `--pipeline`. Stored tickers are looked up "
+                             "concurrently, but tickers are downloaded one at a time.")
+    parser.add_argument("--normalize-workers", type=int, default=StageConcurrency.normalize,
+                        help="The amount of concurrent normalizations of `--pipeline`.")
+    parser.add_argument("--evaluate-workers", type=int, default=StageConcurrency.evaluate,
+                        help="The amount of concurrent filter evaluations of `--pipeline`.")
+    parser.add_argument("--persist-workers", type=int, default=StageConcurrency.persist,
+                        help="The amount of concurrent writes of `--pipeline`.")
+    parser.add_argument("--queue-size", type=int, default=StageConcurrency.queue_size,
+                        help="The maximum amount of tickers waiting in front of each stage of `--pipeline`.")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Write the ticker files of `--output-path` in a background thread, "
+                             "while the next tickers are processed.")
+    parser.add_argument("--blob-store", default=None,
+                        help="Store the ticker files of `--output-path` as hard links into this content-addressed "
+                             "dir, so that identical ticker files of several output paths are stored only once.\n"
+                             "It must be on the same file system as `--output-path`.")
+    parser.add_argument("--quality", choices=QUALITY_MODES, default=None,
+                        help="Validate the price data of each ticker for zero, negative or missing prices, "
+                             "unadjusted split jumps and gaps.\n"
+                             "`flag` only logs the issues, `repair` drops invalid rows and undoes split jumps "
+                             "before filtering. The results of `--ticker-source-dir` tickers are cached in "
+                             "a `.ticker_quality.json` file in that dir.")
+    parser.add_argument("--failure-ledger", default=None,
+                        help="A JSON file that records the tickers that failed with their error. Tickers that "
+                             "succeed later are removed from it.\n"
+                             "By default, the ledger is stored as `.failure_ledger.json` in `--output-path`, "
+                             "or as `.failure_ledger_<index>_of_<count>.json` for a shard.")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Only process the tickers of `--failure-ledger`, instead of the tickers selected "
+                             "by the other options.\n"
+                             "For a shard, the results are merged into the shard's existing manifest.")
+    parser.add_argument("--max-attempts", type=int, default=RetryPolicy.max_attempts,
+                        help="The maximum amount of attempts per download. Failed attempts due to network errors "
+                             "or throttling are retried with exponential backoff.")
+    parser.add_argument("--backoff-seconds", type=float, default=RetryPolicy.backoff_seconds,
+                        help="The delay before the first retry of a download, which doubles with each retry.")
+    parser.add_argument("--throttle-threshold", type=int, default=RetryPolicy.throttle_threshold,
+                        help="Pause all downloads after this amount of consecutive throttling errors.")
+    parser.add_argument("--throttle-pause", type=float, default=RetryPolicy.throttle_pause_seconds,
+                        help="The seconds all downloads are paused after `--throttle-threshold` throttling errors.")
+    parser.add_argument("--shard-index", type=int, default=0,
+                        help="The zero-based shard of the tickers to process, see `--shard-count`.")
+    parser.add_argument("--shard-count", type=int, default=1,
+                        help="Partition the tickers into this amount of shards by a stable hash of their symbols "
+                             "and only process the shard `--shard-index`, e.g. to spread a run over several "
+                             "machines. All shards must select the same tickers.\n"
+                             "Each shard writes a `.shard_<index>_of_<count>.json` manifest to `--output-path`. "
+                             "`merge_shards.py` combines the shards into the result of a single run.")
     parser.add_argument("--verbose", "-v", action="store_true",
                         help="Activates debug log level.")
     return parser
 
 
-def determine_tickers(args: argparse.Namespace) -> Set[str]:
+def determine_tickers_from_universe(args: argparse.Namespace, metrics: Metrics = NULL_METRICS) -> Set[str]:
+    store = UniverseStore(args.universe_dir)
+    if args.snapshot:
+        snapshot_id = store.resolve(args.snapshot)
+    else:
+        logging.info("Start pulling the listings of all exchanges.")
+        with metrics.stage("listing_fetch"):
+            listings = get_listings(["nyse", "nasdaq", "amex"])
+        snapshot_id = store.save(listings)
+    logging.info("Universe snapshot: `%s`", snapshot_id)
+
+    previous_snapshot_id = store.previous(snapshot_id)
+    if previous_snapshot_id:
+        change = store.diff(previous_snapshot_id, snapshot_id)
+        logging.info("%s symbols were added and %s symbols were removed since snapshot `%s`.",
+                     len(change.added), len(change.removed), previous_snapshot_id)
+        logging.debug("Added symbols: %s", ", ".join(change.added))
+        logging.debug("Removed symbols: %s", ", ".join(change.removed))
+
+    exchanges = [exchange for exchange in ["nyse", "nasdaq", "amex"] if getattr(args, exchange)]
+    tickers = set(select_symbols(store.load(snapshot_id), exchanges, int(args.min_market_cap)))
+    if args.only_added_since:
+        since_snapshot_id = store.resolve(args.only_added_since)
+        tickers -= set(store.load(since_snapshot_id)["symbol"])
+        logging.info("%s selected symbols were added since snapshot `%s`.", len(tickers), since_snapshot_id)
+    return tickers
+
+
+def determine_tickers(args: argparse.Namespace, metrics: Metrics = NULL_METRICS) -> Set[str]:
     tickers = set()
-    if args.nyse or args.nasdaq or args.amex:
+    if (args.nyse or args.nasdaq or args.amex) and args.universe_dir:
+        tickers = determine_tickers_from_universe(args, metrics)
+        logging.info("Selected %s ticker symbols.", len(tickers))
+        logging.debug("Selected ticker symbols: %s", ", ".join(sorted(tickers)))
+    elif args.nyse or args.nasdaq or args.amex:
         logging.info("Start pulling ticker symbols with `get_all_tickers` package.")
-        tickers = retrieve_tickers_with_get_all_tickers_package(nyse=args.nyse,
-                                                                nasdaq=args.nasdaq,
-                                                                amex=args.amex,
-                                                                min_market_cap=int(args.min_market_cap))
+        with metrics.stage("listing_fetch"):
+            tickers = retrieve_tickers_with_get_all_tickers_package(nyse=args.nyse,
+                                                                    nasdaq=args.nasdaq,
+                                                                    amex=args.amex,
+                                                                    min_market_cap=int(args.min_market_cap))
         logging.info("Retrieved %s ticker symbols.", len(tickers))
         logging.debug("Retrieved ticker symbols: %s", ", ".join(sorted(tickers)))
     else:
@@ -82,6 +216,10 @@ def determine_tickers(args: argparse.Namespace) -> Set[str]:
             logging.warning("Option `--min-market-cap` has no effect. "
                             "Need to set at least one of the following options: "
                             "`--nyse`, `--nasdaq`, `--amex`")
+        if args.snapshot or args.only_added_since:
+            logging.warning("Options `--snapshot` and `--only-added-since` have no effect. "
+                            "Need to set at least one of the following options: "
+                            "`--nyse`, `--nasdaq`, `--amex`")
 
     tickers = tickers.union(set(args.tickers))
     logging.info("%s tickers to process.", len(tickers))
@@ -93,26 +231,77 @@ def main():
     # Parse args
     parser = create_arg_parser()
     args = parser.parse_args()
+    if (args.snapshot or args.only_added_since) and not args.universe_dir:
+        parser.error("`--snapshot` and `--only-added-since` require `--universe-dir`.")
+    try:
+        shard = Shard(args.shard_index, args.shard_count) if args.shard_count > 1 else None
+    except ValueError as error:
+        parser.error(str(error))
     # Setup logging
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
                         level=logging.DEBUG if args.verbose else logging.INFO)
     # Log important inputs
     logging.info("Tickers: `%s`", ", ".join(args.tickers))
     logging.info("Start date: `%s`", args.start_date)
+    logging.info("End date: `%s`", args.end_date)
     logging.info("Filters: `%s`", " ".join(args.filters))
     logging.info("Output path: `%s`", args.output_path)
+    metrics = Metrics() if args.metrics or args.metrics_output else NULL_METRICS
+    profiler = CriterionProfiler(top_n=args.profile_top_n) if args.profile else None
+    concurrency = StageConcurrency(fetch=args.fetch_workers,
+                                   normalize=args.normalize_workers,
+                                   evaluate=args.evaluate_workers,
+                                   persist=args.persist_workers,
+                                   queue_size=args.queue_size) if args.pipeline else None
+    # Shards that share an output path keep separate ledgers
+    ledger_file_name = f".failure_ledger_{shard.index}_of_{shard.count}.json" if shard else ".failure_ledger.json"
+    ledger = FailureLedger(args.failure_ledger or os.path.join(args.output_path, ledger_file_name))
+    retry_policy = RetryPolicy(max_attempts=args.max_attempts,
+                               backoff_seconds=args.backoff_seconds,
+                               throttle_threshold=args.throttle_threshold,
+                               throttle_pause_seconds=args.throttle_pause)
     # Determine tickers
-    tickers = determine_tickers(args)
+    if args.retry_failed:
+        tickers = set(ledger.symbols())
+        logging.info("Retrying %s failed tickers of `%s`.", len(tickers), ledger.path)
+    else:
+        tickers = determine_tickers(args, metrics)
     # Pull data
     logging.info("Start pulling and filtering tickers.")
-    filtered_tickers = pull_data.main(tickers=tickers,
-                                      start_date=args.start_date,
-                                      criterion_paths=args.filters,
-                                      csv_dir_path=args.ticker_source_dir,
-                                      csv_output_dir_path=args.output_path)
+    with metrics.stage("total"):
+        filtered_tickers = pull_data.main(tickers=tickers,
+                                          start_date=args.start_date,
+                                          criterion_paths=args.filters,
+                                          csv_dir_path=args.ticker_source_dir,
+                                          index_source_dir=args.index_source_dir,
+                                          csv_output_dir_path=args.output_path,
+                                          metrics=metrics,
+                                          profiler=profiler,
+                                          concurrency=concurrency,
+                                          write_behind=args.write_behind,
+                                          end_date=args.end_date,
+                                          blob_store_path=args.blob_store,
+                                          quality=args.quality,
+                                          ledger=ledger,
+                                          retry_policy=retry_policy,
+                                          shard=shard,
+                                          # The retried tickers are only part of the shard's universe
+                                          update_shard_manifest=bool(shard and args.retry_failed))
     logging.info("Finished pulling and filtering tickers.")
     logging.info(f"The following tickers satisfied all filters: `%s`",
                  ", ".join(filtered_tickers.get_tickers()))
+    if ledger.entries:
+        logging.info("%s tickers failed, see `%s`. Retry them with `--retry-failed`.", len(ledger.entries),
+                     ledger.path)
+    # Report measurements
+    if metrics.enabled:
+        logging.info("Run metrics:\n%s", metrics.summary_table())
+    if args.metrics_output:
+        metrics.write(args.metrics_output)
+        logging.info("Wrote run metrics to `%s`", args.metrics_output)
+    if profiler:
+        report_path = profiler.write_report(args.profile)
+        logging.info("Wrote profiling report to `%s`", report_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+# TODO: Setup a python shebang that work with poetry interpreters across users
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+from q4_majorshortsqueezes.catalog import CATALOG_COLUMNS, EventCatalog
+
+
+def dir_path(path):
+    if not os.path.exists(path):
+        raise argparse.ArgumentTypeError(f"{path} does not exist")
+
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"{path} is not a valid dir")
+
+    return path
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Query the squeeze events of all result files of a study.\n"
+                    "All given conditions must match, a condition with several values matches any of them. "
+                    "E.g. the NASDAQ tickers with a min market cap of 100m that tripled within 10 days "
+                    "during 2021:\n"
+                    "`--exchanges nasdaq --min-market-caps 100 --multipliers 3 --days 10 "
+                    "--start-date 2021-01-01 --end-date 2021-12-31`",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--results-dir", type=dir_path, default="results_1",
+                        help="The dir of the result files `<exchange>_min_<market cap>_multi_<multiplier>_days_<days>.csv`.")
+    parser.add_argument("--tickers", nargs='+', default=None,
+                        help="Only events of these tickers.")
+    parser.add_argument("--exchanges", nargs='+', default=None,
+                        help="Only events of these exchanges.")
+    parser.add_argument("--min-market-caps", nargs='+', type=int, default=None,
+                        help="Only events of the results of these min market caps (in million USD).")
+    parser.add_argument("--multipliers", nargs='+', type=int, default=None,
+                        help="Only events of the results of these price multipliers.")
+    parser.add_argument("--days", nargs='+', type=int, default=None,
+                        help="Only events of the results of these amounts of consecutive days.")
+    parser.add_argument("--start-date", default=None,
+                        help="Only events on or after this date.")
+    parser.add_argument("--end-date", default=None,
+                        help="Only events on or before this date.")
+    parser.add_argument("--group-by", nargs='+', default=None,
+                        choices=[*CATALOG_COLUMNS, "year"],
+                        help="Print the event count, distinct ticker count and max increase per group "
+                             "instead of the events.")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Print at most this amount of rows.")
+    parser.add_argument("--output", default=None,
+                        help="Write the result as csv to this file instead of printing it.")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Activates debug log level.")
+    return parser
+
+
+def main():
+    # Parse args
+    parser = create_arg_parser()
+    args = parser.parse_args()
+    # Setup logging
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s',
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+    # Load catalog
+    start = time.perf_counter()
+    catalog = EventCatalog.from_results_dir(args.results_dir)
+    logging.info("Loaded %s events of `%s` in %.3fs.", len(catalog), args.results_dir, time.perf_counter() - start)
+    # Query
+    start = time.perf_counter()
+    result = catalog.query(tickers=args.tickers, exchanges=args.exchanges, min_market_caps=args.min_market_caps,
+                           multipliers=args.multipliers, days=args.days,
+                           start_date=args.start_date, end_date=args.end_date)
+    if args.group_by:
+        result = EventCatalog.aggregate(result, args.group_by)
+    logging.info("Query returned %s rows in %.3fs.", len(result), time.perf_counter() - start)
+    if args.limit is not None:
+        result = result.head(args.limit)
+    # Report result
+    if args.output:
+        result.to_csv(args.output, index=bool(args.group_by))
+        logging.info("Wrote result to `%s`", args.output)
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", None):
+            print(result.to_string(index=bool(args.group_by)))
+
+
+if __name__ == "__main__":
+    main()
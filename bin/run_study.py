@@ -0,0 +1,78 @@
+# TODO: Setup a python shebang that work with poetry interpreters across users
+import argparse
+import logging
+import os
+
+from q4_majorshortsqueezes import study
+
+
+def dir_path(path):
+    if not os.path.exists(path):
+        raise argparse.ArgumentTypeError(f"{path} does not exist")
+
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"{path} is not a valid dir")
+
+    return path
+
+
+def create_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Run the short squeeze study of `results_1` in parallel.\n"
+                    "This replaces `results_1/create_filtered_tickers.sh` "
+                    "and writes files of the same names and formats.\n"
+                    "Unlike the script, it neither looks up the exchange listings nor downloads missing tickers: "
+                    "It filters only the ticker files that are already in the source dirs, and reads each ticker "
+                    "from the source dir of the smallest min market cap that contains it.\n"
+                    "Completed steps are recorded in a manifest file, so that an interrupted study "
+                    "continues where it stopped when the script is run again.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--data-dir", type=dir_path, default=".",
+                        help="The dir that contains the source dirs "
+                             "`ticker_data__<exchange>_min_<market cap>m`.\n"
+                             "The filtered ticker data dirs and the step logs are written to it, too.")
+    parser.add_argument("--results-dir", type=dir_path, default="results_1",
+                        help="The dir the result csv files are written to.")
+    parser.add_argument("--manifest", default=None,
+                        help="The manifest file of completed steps. "
+                             "Defaults to `.study_manifest.json` in the results dir.")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the completed steps of the manifest and run all steps again.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="The amount of worker processes. Defaults to the amount of CPUs.")
+    parser.add_argument("--exchanges", nargs='+', default=study.EXCHANGES,
+                        help="The exchanges of the study.")
+    parser.add_argument("--market-caps", nargs='+', type=int, default=study.MARKET_CAPS,
+                        help="The min market caps (in million USD) of the study.")
+    parser.add_argument("--blob-dir", default=None,
+                        help="Store the filtered ticker files as hard links into this content-addressed dir, "
+                             "so that the data of a ticker is stored once instead of once per filter step.\n"
+                             "It must be on the same file system as `--data-dir`.")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Activates debug log level.")
+    return parser
+
+
+def main():
+    # Parse args
+    parser = create_arg_parser()
+    args = parser.parse_args()
+    # Setup logging
+    logging.basicConfig(format=study.LOG_FORMAT,
+                        level=logging.DEBUG if args.verbose else logging.INFO)
+    # Load manifest
+    manifest_path = args.manifest or os.path.join(args.results_dir, ".study_manifest.json")
+    if args.restart and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = study.StudyManifest(manifest_path)
+    logging.info("Manifest: `%s`", manifest_path)
+    # Run study
+    steps = study.build_study_steps(args.data_dir, args.results_dir,
+                                    exchanges=args.exchanges, market_caps=args.market_caps,
+                                    blob_dir=args.blob_dir)
+    study.run_steps(steps, manifest, max_workers=args.workers)
+    logging.info("Finished study.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
-import importlib
 import logging
+import os
+import sys
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
 
+from q4_majorshortsqueezes.criteria import import_criterion_functions
+from q4_majorshortsqueezes.events import EventCollector
+from q4_majorshortsqueezes.ledger import FailureLedger
+from q4_majorshortsqueezes.metrics import Metrics, NULL_METRICS
+from q4_majorshortsqueezes.pipeline import Pipeline, PipelineStage
+from q4_majorshortsqueezes.profiling import CriterionProfiler
+from q4_majorshortsqueezes.quality import check_ticker_history
+from q4_majorshortsqueezes.retry import Downloader, RetryingDownloader, RetryPolicy
+from q4_majorshortsqueezes.shard import Shard, ShardManifest, universe_digest
 from q4_majorshortsqueezes.ticker import (
+    download_ticker_history,
     FileBackedTicketContainer,
     InMemoryTickerContainer,
     load_ticker_history,
+    normalize_ticker_history,
+    Ticker,
     TickerContainer,
     TickerHistory,
 )
@@ -12,16 +28,43 @@ from q4_majorshortsqueezes.ticker import (
 from typing import Callable, List, Optional, Set
 
 
+@dataclass
+class StageConcurrency:
+    """The amount of worker threads per stage of the pipelined `main` and the size of the queues between them.
+
+    The fetch workers look up stored tickers concurrently, but download one ticker at a time, see `_serialized`.
+    """
+    fetch: int = 8
+    normalize: int = 1
+    evaluate: int = 1
+    persist: int = 1
+    queue_size: int = 32
+
+
+@dataclass
+class _TickerWork:
+    number: int
+    ticker: str
+    history: Optional[TickerHistory] = None
+    downloaded: bool = False
+
+
 def main(tickers: Set[str], start_date: Optional[str], criterion_paths: List[str],
-         csv_dir_path: Optional[str] = None, csv_output_dir_path: Optional[str] = None) \
-        -> TickerContainer:
+         csv_dir_path: Optional[str] = None, csv_output_dir_path: Optional[str] = None,
+         metrics: Optional[Metrics] = None, profiler: Optional[CriterionProfiler] = None,
+         concurrency: Optional[StageConcurrency] = None, write_behind: bool = False,
+         end_date: Optional[str] = None, blob_store_path: Optional[str] = None, quality: Optional[str] = None,
+         ledger: Optional[FailureLedger] = None, retry_policy: Optional[RetryPolicy] = None,
+         downloader: Optional[Downloader] = None, shard: Optional[Shard] = None,
+         update_shard_manifest: bool = False, index_source_dir: bool = False) -> TickerContainer:
     """Pull data for all given tickers and return the ones that satisfy all filter criteria.
 
     Args:
         tickers: A set of tickers, e.g, {"GME", "AMC", "SPY"}.
                  The tickers will always be processed in alphabetical order.
         start_date: The start date in the form YYYY-MM-DD.
-                    This has only effect on newly downloaded price data.
+                    Only the price data from this date on is downloaded or loaded from `csv_dir_path`
+                    and filtered. The stored price data of `csv_output_dir_path` is limited to it, too.
                     If `None` is given the max date range will be used.
         criterion_paths: Python paths to python functions which each adhere to the
                          this interface: `List[Callable[[Ticker], bool]`.
@@ -32,62 +75,276 @@ def main(tickers: Set[str], start_date: Optional[str], criterion_paths: List[str
                       a file named `GME.csv` to load the data from there.
                       If no file is found or this parameter is `None`, the ticker
                       data is downloaded.
+                      Tickers are rejected without loading their data, if the summary index
+                      of the directory shows that they cannot satisfy all criteria.
+                      The directory is only read, unless `index_source_dir` is set.
         csv_output_dir_path: A directory path which ticker data is stored to.
                              This can be the same dir as `csv_dir_path`. Keep in mind
                              that filtering will not work in this case, since this function
                              does not delete the input files from `csv_dir_path`.
                              If this parameter is set, the function returns a
                              FileBackedTicketContainer, instead of a InMemoryTickerContainer.
+        metrics: Collects per-stage timings and throughput counters of the run, e.g.
+                 `csv_load`, `download`, `filter` and `write` as well as `criterion:<path>`.
+                 If `None` is given, no measurements are taken.
+        profiler: Profiles each criterion (section `<criterion path>`) and the load path
+                  (sections `import_criteria`, `csv_load` and `download`) per ticker.
+                  If `None` is given, nothing is profiled.
+        concurrency: If given, the tickers are processed by a pipeline of the stages
+                     fetch (csv lookup or download) → normalize → evaluate criteria → persist,
+                     which run concurrently in worker threads connected by bounded queues.
+                     The depths of the queues are observed as `queue_depth:<stage>` metrics.
+                     Since cProfile cannot profile concurrent threads, the tickers are processed
+                     one after another if a profiler is given.
+                     If `None` is given, the tickers are processed one after another.
+        write_behind: Write the ticker data of `csv_output_dir_path` in a background thread.
+                      All files are written when this function returns.
+        end_date: The end date (inclusive) in the form YYYY-MM-DD, see `start_date`.
+                  If `None` is given the price data up to today will be used.
+        blob_store_path: Store the ticker data of `csv_output_dir_path` as hard links into this
+                         content-addressed blob dir, see `BlobStore`.
+        quality: Validate the loaded and downloaded price data in this mode, `flag` or `repair`,
+                 see `quality.py`. If `None` is given, the data is not validated.
+        ledger: Records the tickers that failed and removes the ones that succeeded. It is saved at the end
+                of the run, so that a later run can retry the failed tickers only.
+        retry_policy: Retry failed downloads with backoff and pause all downloads when the data provider
+                      throttles them, see `retry.py`. If `None` is given, failed downloads are not retried.
+        downloader: Downloads the raw price data of a ticker. Defaults to `download_ticker_history`.
+        shard: Only process the tickers of this shard and write its `ShardManifest` to `csv_output_dir_path`
+               at the end of the run, see `shard.py`. All shards must be given the same tickers.
+        update_shard_manifest: Merge the results into the existing manifest of the shard, instead of replacing it,
+                               e.g. when only the failed tickers of the shard are retried. The tickers of the
+                               shard's universe are kept and the results of the given tickers are replaced.
+        index_source_dir: Write the summary and quality indexes of the loaded tickers into `csv_dir_path`,
+                          so that later runs over the directory can reject tickers by their summaries.
 
     Returns:
         A mapping of tickers and their historical data if they satisfied all filter criteria.
     """
-    container = (FileBackedTicketContainer(csv_output_dir_path) if csv_output_dir_path
-                 else InMemoryTickerContainer())
-    for criterion in import_criterion_functions(criterion_paths):
-        container.add_criterion(criterion)
+    if shard and not csv_output_dir_path:
+        raise ValueError("A shard needs a `csv_output_dir_path` to write its manifest to.")
+    if update_shard_manifest:
+        manifest_path = os.path.join(csv_output_dir_path, shard.manifest_file_name) if shard else None
+        if not (manifest_path and os.path.exists(manifest_path)):
+            raise ValueError("Updating a shard manifest needs a shard that wrote its manifest to "
+                             "`csv_output_dir_path` before.")
+    metrics = metrics or NULL_METRICS
+    container = (FileBackedTicketContainer(csv_output_dir_path, metrics=metrics, write_behind=write_behind,
+                                           blob_store_path=blob_store_path)
+                 if csv_output_dir_path else InMemoryTickerContainer(metrics=metrics))
+    with metrics.stage("import_criteria"), _profile(profiler, "import_criteria", "*"):
+        criteria = import_criterion_functions(criterion_paths)
+    # Checks on ticker summaries that allow to reject tickers without loading their history
+    summary_prefilters = [criterion.summary_prefilter for criterion in criteria
+                          if hasattr(criterion, "summary_prefilter")]
+    for criterion_path, criterion in zip(criterion_paths, criteria):
+        if profiler:
+            criterion = profiler.wrap_criterion(criterion_path, criterion)
+        container.add_criterion(criterion, name=criterion_path)
+
+    read_container = (FileBackedTicketContainer(csv_dir_path, metrics=metrics, start_date=start_date, end_date=end_date,
+                                                quality=quality, save_indexes=index_source_dir)
+                      if csv_dir_path else None)
+    download = downloader or download_ticker_history
+    if concurrency:
+        download = _serialized(download)
+    if retry_policy:
+        download = RetryingDownloader(download, retry_policy)
+
+    if shard:
+        universe = universe_digest(tickers)
+        tickers = shard.select(tickers)
+        logging.info("Processing %s tickers of shard %s of %s.", len(tickers), shard.index, shard.count)
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            logging.warning("Squeeze events are logged at INFO level, the shard manifest will not list them.")
+    # The squeeze events of a shard are collected from the log, like the results of a single run
+    collector = EventCollector() if shard else None
+    # The tickers stored by this run, unlike `container.get_tickers`, which lists the files of earlier runs, too
+    stored: Set[str] = set()
+    if collector:
+        logging.getLogger().addHandler(collector)
+    try:
+        if concurrency and profiler:
+            logging.warning("Processing the tickers one after another, since profiling does not support concurrency.")
+        if concurrency and not profiler:
+            _run_pipeline(tickers, start_date, end_date, csv_dir_path, container, read_container, summary_prefilters,
+                          metrics, concurrency, quality, download, ledger, stored)
+        else:
+            _run_sequentially(tickers, start_date, end_date, csv_dir_path, container, read_container,
+                              summary_prefilters, metrics, profiler, quality, download, ledger, stored)
+    except BaseException:
+        # Keep the results of the processed tickers, e.g. the pending write-behind files, without masking the error
+        try:
+            _close_run(container, read_container, ledger)
+        except Exception:
+            logging.exception("Failed to store the results of the aborted run.")
+        raise
+    finally:
+        if collector:
+            logging.getLogger().removeHandler(collector)
+
+    _close_run(container, read_container, ledger)
+    if shard:
+        manifest = ShardManifest(shard_index=shard.index,
+                                 shard_count=shard.count,
+                                 universe_digest=universe,
+                                 tickers=sorted(tickers),
+                                 satisfied=sorted(stored),
+                                 events=collector.events)
+        if update_shard_manifest:
+            manifest = ShardManifest.load(manifest_path).updated(manifest)
+        manifest.save(csv_output_dir_path)
+    return container
+
 
-    read_container = FileBackedTicketContainer(csv_dir_path) if csv_dir_path else None
+def _close_run(container: TickerContainer, read_container: Optional[FileBackedTicketContainer],
+               ledger: Optional[FailureLedger]):
+    """Write all pending files of a run."""
+    try:
+        if read_container:
+            read_container.flush()
+        if ledger:
+            ledger.save()
+    finally:
+        container.close()
 
+
+def _run_sequentially(tickers: Set[str], start_date: Optional[str], end_date: Optional[str],
+                      csv_dir_path: Optional[str], container: TickerContainer,
+                      read_container: Optional[FileBackedTicketContainer], summary_prefilters: List[Callable],
+                      metrics: Metrics, profiler: Optional[CriterionProfiler], quality: Optional[str],
+                      download: Downloader, ledger: Optional[FailureLedger], stored: Set[str]):
+    """Process the tickers like `main`, one after another, and add the stored tickers to `stored`."""
     for i, ticker in enumerate(sorted(tickers), start=1):
+        metrics.increment("tickers_processed")
         try:
             ticker_history = None
 
+            if read_container and summary_prefilters:
+                summary = read_container.get_summary(ticker)
+                if summary and not all(prefilter(summary) for prefilter in summary_prefilters):
+                    logging.info("%s. Skipping `%s`, its summary cannot satisfy all filters.", i, ticker)
+                    metrics.increment("tickers_prefiltered")
+                    if ledger:
+                        ledger.record_success(ticker)
+                    continue
+
             if read_container:
                 logging.info("%s. Looking up `%s` from %s", i, ticker, csv_dir_path)
-                ticker_history = read_container[ticker]
+                with metrics.stage("csv_load"), _profile(profiler, "csv_load", ticker):
+                    ticker_history = read_container[ticker]
                 if ticker_history is None:
                     logging.info("%s. Failed to look up `%s` from %s", i, ticker, csv_dir_path)
 
             if ticker_history is None:
                 logging.info("%s. Downloading: `%s`", i, ticker)
-                ticker_history = load_ticker_history(ticker, start_date)
+                with metrics.stage("download"), _profile(profiler, "download", ticker):
+                    ticker_history = load_ticker_history(ticker, start_date, end_date, download=download)
+                metrics.increment("tickers_downloaded")
+                if quality:
+                    with metrics.stage("quality"):
+                        _, ticker_history = check_ticker_history(ticker, ticker_history, quality)
 
             logging.info("%s. Got ticker data. Start filtering of: `%s`", i,  ticker)
-            container.store_ticker(ticker, ticker_history)
-        except ValueError:
+            with metrics.stage("filter"):
+                if container.store_ticker(ticker, ticker_history):
+                    stored.add(ticker)
+            if ledger:
+                ledger.record_success(ticker)
+        except ValueError as error:
             # Swallow all errors and let users check the logs to see what has failed
             logging.exception("%s. Ticker `%s` failed.", i, ticker)
+            metrics.increment("tickers_failed")
+            if ledger:
+                ledger.record_failure(ticker, error)
 
-    return container
 
+def _run_pipeline(tickers: Set[str], start_date: Optional[str], end_date: Optional[str], csv_dir_path: Optional[str],
+                  container: TickerContainer, read_container: Optional[FileBackedTicketContainer],
+                  summary_prefilters: List[Callable], metrics: Metrics, concurrency: StageConcurrency,
+                  quality: Optional[str] = None, download: Downloader = download_ticker_history,
+                  ledger: Optional[FailureLedger] = None, stored: Optional[Set[str]] = None):
+    """Process the tickers like `main`, but with a pipeline of concurrent stages.
+
+    The stored tickers are added to `stored`, if it is given.
+    """
+    def fetch(work: _TickerWork) -> Optional[_TickerWork]:
+        metrics.increment("tickers_processed")
+        if read_container and summary_prefilters:
+            summary = read_container.get_summary(work.ticker)
+            if summary and not all(prefilter(summary) for prefilter in summary_prefilters):
+                logging.info("%s. Skipping `%s`, its summary cannot satisfy all filters.", work.number, work.ticker)
+                metrics.increment("tickers_prefiltered")
+                if ledger:
+                    ledger.record_success(work.ticker)
+                return None
 
-def import_criterion_functions(criterion_paths: List[str]) -> List[Callable[[TickerHistory], bool]]:
-    """Import and return a criterion functions for each given path.
+        if read_container:
+            logging.info("%s. Looking up `%s` from %s", work.number, work.ticker, csv_dir_path)
+            with metrics.stage("csv_load"):
+                work.history = read_container[work.ticker]
+            if work.history is None:
+                logging.info("%s. Failed to look up `%s` from %s", work.number, work.ticker, csv_dir_path)
 
-    Args:
-        criterion_paths: Python paths to python functions which each adhere to the
-                         this interface: `List[Callable[[TickerHistory], bool]`.
-                         The path format for a criterion function is:
-                         `full.qualified.path.to.module/func_name`
+        if work.history is None:
+            logging.info("%s. Downloading: `%s`", work.number, work.ticker)
+            with metrics.stage("download"):
+                work.history = download(work.ticker, start_date, end_date)
+            work.downloaded = True
+            metrics.increment("tickers_downloaded")
+        return work
 
-    Returns:
-        The imported criterion functions.
+    def normalize(work: _TickerWork) -> _TickerWork:
+        if work.downloaded:
+            with metrics.stage("normalize"):
+                work.history = normalize_ticker_history(work.history)
+            if quality:
+                with metrics.stage("quality"):
+                    _, work.history = check_ticker_history(work.ticker, work.history, quality)
+        return work
+
+    def evaluate(work: _TickerWork) -> Optional[_TickerWork]:
+        logging.info("%s. Got ticker data. Start filtering of: `%s`", work.number, work.ticker)
+        with metrics.stage("filter"):
+            satisfied = container.satisfies_criteria(Ticker(work.ticker, work.history))
+        if ledger:
+            ledger.record_success(work.ticker)
+        return work if satisfied else None
+
+    def persist(work: _TickerWork):
+        container.add_ticker(work.ticker, work.history)
+        if stored is not None:
+            stored.add(work.ticker)
+
+    def on_error(work: _TickerWork):
+        # Swallow all errors and let users check the logs to see what has failed
+        logging.exception("%s. Ticker `%s` failed.", work.number, work.ticker)
+        metrics.increment("tickers_failed")
+        if ledger:
+            ledger.record_failure(work.ticker, sys.exc_info()[1])
+
+    pipeline = Pipeline([PipelineStage("fetch", fetch, concurrency.fetch),
+                         PipelineStage("normalize", normalize, concurrency.normalize),
+                         PipelineStage("evaluate", evaluate, concurrency.evaluate),
+                         PipelineStage("persist", persist, concurrency.persist)],
+                        queue_size=concurrency.queue_size, metrics=metrics, on_error=on_error)
+    pipeline.run(_TickerWork(i, ticker) for i, ticker in enumerate(sorted(tickers), start=1))
+
+
+def _serialized(download: Downloader) -> Downloader:
+    """Wrap a downloader, such that only one thread downloads at a time.
+
+    `yf.download` keeps the results of a call in module globals, which are reset by each call. Hence,
+    concurrent downloads can mix up the data of different tickers.
     """
-    functions = []
-    for criterion_path in criterion_paths:
-        module_path, func_name = criterion_path.split("/")
-        module = importlib.import_module(module_path)
-        functions.append(getattr(module, func_name))
+    lock = threading.Lock()
+
+    def serialized_download(ticker: str, start_date: Optional[str], end_date: Optional[str] = None):
+        with lock:
+            return download(ticker, start_date, end_date)
+
+    return serialized_download
+
 
-    return functions
+def _profile(profiler: Optional[CriterionProfiler], section: str, ticker: str):
+    return profiler.profile(section, ticker) if profiler else nullcontext()
@@ -0,0 +1,96 @@
+"""
+A content-addressed store of ticker files, so that identical ticker histories are stored only once.
+
+Each distinct file content is stored once as blob, named by its SHA-256 digest. Ticker files of
+containers that use the store are hard links to the blobs: Storing the same history in many result
+dirs, e.g. GME in dozens of filter steps of a study, writes and occupies its data only once.
+Ticker files are never modified in place but always replaced by a new link, hence a change of one
+ticker file never affects the other links of its blob.
+"""
+import errno
+import hashlib
+import logging
+import os
+import threading
+
+# The errors of file systems that cannot link the files
+NO_LINK_ERRNOS = (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP)
+
+
+class BlobStore:
+    """A directory of blobs, stored as `<digest[:2]>/<digest>.csv`.
+
+    The blob dir must be on the same file system as the dirs that link to it. Otherwise, the
+    content is written to each linking file as a fallback.
+
+    Args:
+        dir_path: The directory of the blobs. It is created if it does not exist.
+    """
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        os.makedirs(dir_path, exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.dir_path, digest[:2], f"{digest}.csv")
+
+    def put(self, content: str) -> str:
+        """Store the content as blob unless it is stored already and return the blob's path."""
+        path = self.blob_path(hashlib.sha256(content.encode()).hexdigest())
+        if not os.path.exists(path):
+            self._write_blob(content, path)
+        return path
+
+    def _write_blob(self, content: str, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, mode="w") as fd:
+            fd.write(content)
+        # Concurrent writers of the same blob write the same content, the first one wins. Replacing the
+        # blob would detach the files that are linked to it already.
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        except OSError as error:
+            if error.errno not in NO_LINK_ERRNOS:
+                raise
+            os.replace(temp_path, path)
+            return
+        os.remove(temp_path)
+
+    def link(self, content: str, path: str) -> int:
+        """Create a file at `path` with the content, linked to the content's blob. The file must not exist.
+
+        Returns:
+            The amount of bytes written, which is zero if the blob was stored already.
+        """
+        blob_path = self.blob_path(hashlib.sha256(content.encode()).hexdigest())
+        bytes_written = 0
+        if not os.path.exists(blob_path):
+            self._write_blob(content, blob_path)
+            bytes_written = len(content)
+        try:
+            os.link(blob_path, path)
+        except OSError as error:
+            if error.errno not in NO_LINK_ERRNOS:
+                raise
+            logging.debug("Cannot link `%s` to blob `%s`, writing a copy.", path, blob_path)
+            with open(path, mode="w") as fd:
+                fd.write(content)
+            bytes_written += len(content)
+        return bytes_written
+
+    def prune(self) -> int:
+        """Remove the blobs that no ticker file links to anymore. Must not run while files are linked.
+
+        Returns:
+            The amount of removed blobs.
+        """
+        removed = 0
+        for dir_path, _, file_names in os.walk(self.dir_path):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                if file_name.endswith(".csv") and os.stat(path).st_nlink == 1:
+                    os.remove(path)
+                    removed += 1
+        return removed
@@ -0,0 +1,117 @@
+"""
+An in-memory catalog of the squeeze events of all result files of a study, e.g. `results_1`.
+
+Each result file `<exchange>_min_<market cap>_multi_<multiplier>_days_<days>.csv` contributes its events
+together with the parameters of its identifier. The catalog keeps all events in a single typed table that
+is sorted by date. Ticker, exchange and parameter values are indexed by the row positions of each value,
+hence queries combine index lookups and a binary search of the date range instead of scanning the csv
+files, e.g. "which NASDAQ tickers with a min market cap of 100m tripled within 10 days during 2021":
+
+    catalog = EventCatalog.from_results_dir("results_1")
+    catalog.query(exchanges=["nasdaq"], min_market_caps=[100], multipliers=[3], days=[10],
+                  start_date="2021-01-01", end_date="2021-12-31")
+"""
+import glob
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.study import parse_identifier
+
+RESULT_FILES_PATTERN = "*_min_*_multi_*_days_*.csv"
+INDEXED_COLUMNS = ["ticker", "exchange", "min_market_cap", "multiplier", "days"]
+CATALOG_COLUMNS = ["ticker", "date", "adj_close", "increase", "exchange", "min_market_cap", "multiplier", "days"]
+
+
+def read_result_file(file_path: str) -> pd.DataFrame:
+    """Read the events of a result file together with the parameters of its identifier."""
+    exchange, min_market_cap, multiplier, days = parse_identifier(Path(file_path).stem)
+    events = pd.read_csv(file_path, dtype={"Ticker": str, "Date": str, "Adj Close": np.float64,
+                                           "Increase": np.float64})
+    return pd.DataFrame({"ticker": events["Ticker"],
+                         "date": pd.to_datetime(events["Date"]),
+                         "adj_close": events["Adj Close"],
+                         "increase": events["Increase"],
+                         "exchange": exchange,
+                         "min_market_cap": np.int64(min_market_cap),
+                         "multiplier": np.int64(multiplier),
+                         "days": np.int64(days)})
+
+
+class EventCatalog:
+    """An indexed table of squeeze events.
+
+    Args:
+        events: The events with the columns of `CATALOG_COLUMNS`.
+    """
+    def __init__(self, events: pd.DataFrame):
+        events = events[CATALOG_COLUMNS].sort_values(["date", "ticker"], kind="stable").reset_index(drop=True)
+        events["ticker"] = events["ticker"].astype("category")
+        events["exchange"] = events["exchange"].astype("category")
+        self.events = events
+        self._dates = events["date"].to_numpy()
+        # Column -> value -> positions of the rows with the value
+        self._index: Dict[str, Dict[object, np.ndarray]] = {
+            column: events.groupby(column, observed=True).indices for column in INDEXED_COLUMNS}
+
+    @classmethod
+    def from_results_dir(cls, dir_path: str) -> "EventCatalog":
+        """Load the events of all result files of the dir."""
+        file_paths = sorted(glob.glob(os.path.join(dir_path, RESULT_FILES_PATTERN)))
+        frames = [read_result_file(file_path) for file_path in file_paths]
+        return cls(pd.concat(frames, ignore_index=True) if frames
+                   else pd.DataFrame({column: [] for column in CATALOG_COLUMNS}).astype({"date": "datetime64[ns]"}))
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def values(self, column: str) -> List:
+        """Return the distinct values of an indexed column in ascending order."""
+        return sorted(self._index[column])
+
+    def _mask(self, column: str, values: Optional[Iterable]) -> Optional[np.ndarray]:
+        if values is None:
+            return None
+        mask = np.zeros(len(self.events), dtype=bool)
+        for value in values:
+            mask[self._index[column].get(value, [])] = True
+        return mask
+
+    def query(self, tickers: Optional[Iterable[str]] = None, exchanges: Optional[Iterable[str]] = None,
+              min_market_caps: Optional[Iterable[int]] = None, multipliers: Optional[Iterable[int]] = None,
+              days: Optional[Iterable[int]] = None,
+              start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """Return the events that match all given conditions, sorted by date and ticker.
+
+        Each condition that is `None` matches all events. The other conditions match the events with any
+        of the given values. `start_date` and `end_date` are inclusive.
+        """
+        start = 0 if start_date is None else np.searchsorted(self._dates, np.datetime64(start_date), side="left")
+        end = len(self._dates) if end_date is None else np.searchsorted(self._dates, np.datetime64(end_date),
+                                                                        side="right")
+        selected = np.zeros(len(self.events), dtype=bool)
+        selected[start:end] = True
+        conditions = {"ticker": tickers, "exchange": exchanges, "min_market_cap": min_market_caps,
+                      "multiplier": multipliers, "days": days}
+        for column, values in conditions.items():
+            mask = self._mask(column, values)
+            if mask is not None:
+                selected &= mask
+        return self.events[selected]
+
+    @staticmethod
+    def aggregate(events: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+        """Aggregate events per group: their count, the count of distinct tickers and the max increase.
+
+        `by` may contain the columns of `CATALOG_COLUMNS` and `year`, the year of the event date.
+        Groups are sorted by their event count in descending order.
+        """
+        keys = [events["date"].dt.year.rename("year") if column == "year" else events[column] for column in by]
+        grouped = events.groupby(keys, observed=True)
+        return pd.DataFrame({"events": grouped.size(),
+                             "tickers": grouped["ticker"].nunique(),
+                             "max_increase": grouped["increase"].max()}).sort_values("events", ascending=False,
+                                                                                     kind="stable")
@@ -0,0 +1,34 @@
+"""
+Import of criterion functions by their path, independent of the API layer, so that worker processes,
+e.g. of `panel.py`, can import criteria without importing `pull_data`.
+"""
+import importlib
+from typing import Callable, List
+
+from q4_majorshortsqueezes.kernel import kernel_criterion, KERNEL_PATH_PREFIX
+from q4_majorshortsqueezes.ticker import TickerHistory
+
+
+def import_criterion_functions(criterion_paths: List[str]) -> List[Callable[[TickerHistory], bool]]:
+    """Import and return a criterion functions for each given path.
+
+    Args:
+        criterion_paths: Python paths to python functions which each adhere to the
+                         this interface: `List[Callable[[TickerHistory], bool]`.
+                         The path format for a criterion function is:
+                         `full.qualified.path.to.module/func_name`
+                         Paths of kernels over history arrays are prefixed with `kernel:`,
+                         e.g. `kernel:full.qualified.path.to.module/func_name`, see `kernel.py`.
+
+    Returns:
+        The imported criterion functions.
+    """
+    functions = []
+    for criterion_path in criterion_paths:
+        is_kernel = criterion_path.startswith(KERNEL_PATH_PREFIX)
+        module_path, func_name = criterion_path[len(KERNEL_PATH_PREFIX) if is_kernel else 0:].split("/")
+        module = importlib.import_module(module_path)
+        function = getattr(module, func_name)
+        functions.append(kernel_criterion(function) if is_kernel else function)
+
+    return functions
@@ -0,0 +1,51 @@
+"""
+Squeeze events are the JSON objects the filters log when a ticker satisfies them, e.g.:
+`{"Ticker": "GME", "Date": "2021-01-14", "Adj Close": 39.91, "Increase": 2.25} - satisfied filter ...`
+
+The study results are csv files of these events. This module extracts the events from log lines
+and writes them in the same csv format as `results_1/transform_ljson_to_csv.py`.
+"""
+import csv
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, TextIO
+
+EVENT_PATTERN = re.compile(r'{"Ticker":.*}')
+DEFAULT_EVENT_KEYS = ["Ticker", "Date", "Adj Close", "Increase"]
+
+SqueezeEvent = Dict[str, object]
+
+
+def read_events_from_log(lines: Iterable[str]) -> List[SqueezeEvent]:
+    """Extract the squeeze events from the INFO lines of a log."""
+    events = []
+    for line in lines:
+        if "INFO" not in line:
+            continue
+        match = EVENT_PATTERN.search(line)
+        if match:
+            events.append(json.loads(match.group(0)))
+    return events
+
+
+class EventCollector(logging.Handler):
+    """Collects the squeeze events of the INFO records it handles, e.g. while attached to the root logger."""
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.events: List[SqueezeEvent] = []
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno != logging.INFO:
+            return
+        match = EVENT_PATTERN.search(record.getMessage())
+        if match:
+            self.events.append(json.loads(match.group(0)))
+
+
+def write_events_csv(events: List[SqueezeEvent], fd: TextIO):
+    """Write squeeze events as csv. The header is written even if there are no events."""
+    keys = events[0].keys() if events else DEFAULT_EVENT_KEYS
+    dict_writer = csv.DictWriter(fd, keys)
+    dict_writer.writeheader()
+    dict_writer.writerows(events)
@@ -1,8 +1,11 @@
 import json
 import logging
+import numpy as np
+import pandas as pd
 from functools import partial
 from typing import Any, Callable, Generic, List, TypeVar
 
+from q4_majorshortsqueezes.summary import TickerSummary
 from q4_majorshortsqueezes.ticker import Ticker
 
 
@@ -93,11 +96,114 @@ class SortedFIFOCache(Generic[T]):
         return next(iter(self._sorted_values), None)
 
 
+def range_min(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return the minimum of `values[starts[i]:ends[i]]` for each i, ignoring NaN values.
+
+    The ranges are answered with a sparse table of minima over power-of-two sized blocks.
+    Building the table takes O(n * log(w)) for the longest range w and each range is then answered
+    with two lookups, all without Python loops over the rows.
+
+    Args:
+        values: The values to compute the minima of.
+        starts: The inclusive start index of each range.
+        ends: The exclusive end index of each range.
+
+    Returns:
+        An array with the minimum of each range. Empty ranges are NaN.
+    """
+    lengths = ends - starts
+    result = np.full(len(starts), np.nan)
+    non_empty = np.flatnonzero(lengths > 0)
+    if not non_empty.size:
+        return result
+
+    # tables[k][j] is the minimum of values[j:j + 2**k]
+    tables = [np.asarray(values, dtype=float)]
+    while 2 ** len(tables) <= lengths.max():
+        previous, half = tables[-1], 2 ** (len(tables) - 1)
+        tables.append(np.fmin(previous[:-half], previous[half:]))
+
+    # Each range is covered by two (overlapping) blocks of the largest power of two that fits in it
+    levels = np.floor(np.log2(lengths[non_empty])).astype(int)
+    for level in np.unique(levels):
+        rows = non_empty[levels == level]
+        table = tables[level]
+        result[rows] = np.fmin(table[starts[rows]], table[ends[rows] - 2 ** level])
+    return result
+
+
+def prior_rolling_min(ticker: Ticker, column: str, days: int, calendar_days: bool = False) -> np.ndarray:
+    """Return the minimum of the values of the previous days for each row of a history column.
+
+    The result is shared between all criteria evaluated on the same ticker object.
+    The first row has no prior values and is NaN.
+
+    Args:
+        ticker: Ticker data object.
+        column: The history column, e.g. `Adj Close`.
+        days: The amount of previous days to compute the minimum of.
+        calendar_days: If false, the window consists of the previous `days` rows (trading days).
+                       If true, the window consists of all previous rows whose `date_id` is at most
+                       `days` calendar days before the row's `date_id`. This accounts for trading
+                       halts and other gaps in the history.
+
+    Returns:
+        An array with the same length as the ticker history.
+    """
+    def compute():
+        if calendar_days:
+            date_ids = ticker.values("date_id")
+            starts = np.searchsorted(date_ids, date_ids - days, side="left")
+            return range_min(ticker.values(column), starts, np.arange(len(date_ids)))
+
+        rolling_min = pd.Series(ticker.values(column)).rolling(days, min_periods=1).min()
+        return rolling_min.shift(1).to_numpy()
+
+    return ticker.shared(("prior_rolling_min", column, days, calendar_days), compute)
+
+
+def window_multiples(ticker: Ticker, low_column: str, high_column: str, days: int,
+                     calendar_days: bool = False) -> np.ndarray:
+    """Return for each row the multiple between its price and the lowest price of the previous days.
+
+    This is the window engine of the price filters. It compares the `high_column` value of each row
+    with the lowest `low_column` value of the previous `days` rows, e.g. `Low` -> `High`,
+    `OC_Low` -> `OC_High` or `Adj Close` -> `Adj Close`.
+    The result as well as the rolling minimum of `low_column` are shared between all criteria
+    evaluated on the same ticker object. Hence, filters that only differ in their multiplier
+    or in their `high_column` do not cause another pass over the data.
+
+    Args:
+        ticker: Ticker data object.
+        low_column: The history column the window minimum is computed of.
+        high_column: The history column that is compared to the window minimum.
+        days: The amount of previous days that make up the window.
+        calendar_days: Whether `days` are calendar days or trading days, see `prior_rolling_min`.
+
+    Returns:
+        An array with the same length as the ticker history. Rows without a window (the first row) or
+        with a window minimum of zero are NaN.
+    """
+    def compute():
+        window_min = prior_rolling_min(ticker, low_column, days, calendar_days)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            multiples = ticker.values(high_column) / window_min
+        multiples[window_min == 0] = np.nan
+        return multiples
+
+    return ticker.shared(("window_multiples", low_column, high_column, days, calendar_days), compute)
+
+
 def multiply_price_within_x_days(ticker: Ticker,
-                                 multiplier: int, days: int) -> bool:
+                                 multiplier: int, days: int,
+                                 low_column: str = "Adj Close", high_column: str = "Adj Close",
+                                 calendar_days: bool = False) -> bool:
     """Check whether the price of the ticker has ever increased by a multiplier within consecutive days.
 
-    The function used the highs (`High` attribute) and lows (`Low` attribute) of each day.
+    By default, the function uses the adjusted close prices (`Adj Close` attribute) of each day:
+    Each adjusted close price is compared to the lowest adjusted close price of the
+    previous `days` trading days. Other price bases can be set with `low_column` and `high_column`,
+    see `window_multiples`.
 
     Args:
         ticker: Ticker data object.
@@ -106,40 +212,206 @@ def multiply_price_within_x_days(ticker: Ticker,
         days: The amount of days in which the increase must be observed.
               Internally, this is translated to a moving time window which simply moves forward
               one trading day after another.
+        low_column: The history column of the low prices, e.g. `Low` or `OC_Low`.
+        high_column: The history column of the high prices, e.g. `High` or `OC_High`.
+        calendar_days: If true, `days` are calendar days instead of trading days.
+                       Gaps in the history, e.g. trading halts, then shrink the window.
 
     Returns:
         True, if the ticket multiplied by `multiplier` within the given consecutive `days`;
         Otherwise, returns false.
     """
-    cache_adj_close = SortedFIFOCache(size=days, sort_key_func=lambda x: x)
-
-    for adj_close, date in zip(ticker.history['Adj Close'], ticker.history.index):
-        # At first there are no values cached:
-        if cache_adj_close.get_first():
-            increase = adj_close / cache_adj_close.get_first()
-            if increase >= multiplier:
-                info_json = json.dumps({"Ticker": ticker.symbol, "Date": date,
-                                        "Adj Close": adj_close, "Increase": increase})
-                logging.info("%s - satisfied filter `%s(multiplier=%s, days=%s)`.",
-                             info_json, multiply_price_within_x_days.__name__, multiplier, days)
-                return True
-
-        cache_adj_close.add(adj_close)
-
-    logging.info("Failed filter: %s(multiplier=%s, days=%s)",
-                 multiply_price_within_x_days.__name__, multiplier, days)
+    params = f"multiplier={multiplier}, days={days}"
+    if (low_column, high_column) != ("Adj Close", "Adj Close"):
+        params += f", low_column={low_column}, high_column={high_column}"
+    if calendar_days:
+        params += ", calendar_days=True"
+
+    increase = window_multiples(ticker, low_column, high_column, days, calendar_days)
+    satisfied = np.flatnonzero(increase >= multiplier)
+
+    if satisfied.size:
+        i = satisfied[0]
+        info_json = json.dumps({"Ticker": ticker.symbol, "Date": ticker.dates()[i],
+                                high_column: ticker.values(high_column)[i], "Increase": increase[i]})
+        logging.info("%s - satisfied filter `%s(%s)`.",
+                     info_json, multiply_price_within_x_days.__name__, params)
+        return True
+
+    logging.info("Failed filter: %s(%s)", multiply_price_within_x_days.__name__, params)
+    return False
+
+
+def prior_rolling_median(ticker: Ticker, column: str, days: int) -> np.ndarray:
+    """Return the median of the values of the previous `days` rows for each row of a history column.
+
+    The rolling median is computed by pandas with a skip list, i.e. each row costs O(log(days)).
+    The result is shared between all criteria evaluated on the same ticker object.
+    The first row has no prior values and is NaN.
+    """
+    def compute():
+        rolling_median = pd.Series(ticker.values(column), dtype=float).rolling(days, min_periods=1).median()
+        return rolling_median.shift(1).to_numpy()
+
+    return ticker.shared(("prior_rolling_median", column, days), compute)
+
+
+def multiply_price_with_volume_spike(ticker: Ticker,
+                                     multiplier: int, days: int,
+                                     volume_multiplier: float, volume_days: int,
+                                     low_column: str = "Adj Close", high_column: str = "Adj Close",
+                                     calendar_days: bool = False) -> bool:
+    """Check whether the price of the ticker has ever multiplied on a day with a volume spike.
+
+    The price increase is measured like in `multiply_price_within_x_days`. Additionally, the traded
+    volume of the day the increase is observed must be at least `volume_multiplier` times the median
+    volume of the previous `volume_days` trading days. Both conditions are evaluated together
+    on shared series, so the volume confirmation does not cause another scan of the price data.
+
+    Args:
+        ticker: Ticker data object.
+        multiplier: See `multiply_price_within_x_days`.
+        days: See `multiply_price_within_x_days`.
+        volume_multiplier: How much higher than usual the volume must be, e.g. 3 for three times the median.
+        volume_days: The amount of previous trading days the median volume is computed of.
+        low_column: See `multiply_price_within_x_days`.
+        high_column: See `multiply_price_within_x_days`.
+        calendar_days: See `multiply_price_within_x_days`.
+
+    Returns:
+        True, if the ticket multiplied by `multiplier` within the given consecutive `days` on a day
+        with a volume spike; Otherwise, returns false.
+    """
+    params = (f"multiplier={multiplier}, days={days}, "
+              f"volume_multiplier={volume_multiplier}, volume_days={volume_days}")
+    if (low_column, high_column) != ("Adj Close", "Adj Close"):
+        params += f", low_column={low_column}, high_column={high_column}"
+    if calendar_days:
+        params += ", calendar_days=True"
+
+    increase = window_multiples(ticker, low_column, high_column, days, calendar_days)
+    median_volume = prior_rolling_median(ticker, "Volume", volume_days)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_increase = ticker.values("Volume") / median_volume
+    satisfied = np.flatnonzero((increase >= multiplier) & (median_volume > 0) &
+                               (volume_increase >= volume_multiplier))
+
+    if satisfied.size:
+        i = satisfied[0]
+        info_json = json.dumps({"Ticker": ticker.symbol, "Date": ticker.dates()[i],
+                                high_column: ticker.values(high_column)[i], "Increase": increase[i],
+                                "Volume": int(ticker.values("Volume")[i]),
+                                "Volume Increase": volume_increase[i]})
+        logging.info("%s - satisfied filter `%s(%s)`.",
+                     info_json, multiply_price_with_volume_spike.__name__, params)
+        return True
+
+    logging.info("Failed filter: %s(%s)", multiply_price_with_volume_spike.__name__, params)
     return False
 
 
+def may_multiply_price_within_x_days(summary: TickerSummary, multiplier: int) -> bool:
+    """Check on a ticker's summary whether `multiply_price_within_x_days` can be satisfied at all.
+
+    No window of consecutive days can show a higher increase than the maximum ratio between
+    a price and the lowest price of all previous days.
+
+    Args:
+        summary: The summary statistics of the stored ticker history.
+        multiplier: See `multiply_price_within_x_days`.
+
+    Returns:
+        False, if the ticker can never satisfy `multiply_price_within_x_days` with the given multiplier;
+        Otherwise, returns true.
+    """
+    return summary.max_running_ratio >= multiplier
+
+
+def price_multi_criterion(multiplier: int, days: int,
+                          low_column: str = "Adj Close", high_column: str = "Adj Close",
+                          calendar_days: bool = False) -> Callable[[Ticker], bool]:
+    """Create a `multiply_price_within_x_days` criterion.
+
+    Since the ticker summaries are based on adjusted close prices, criteria that only use
+    `Adj Close` offer the summary check `may_multiply_price_within_x_days` via their
+    `summary_prefilter` attribute. This allows to reject tickers without loading their history.
+    """
+    criterion = partial(multiply_price_within_x_days, multiplier=multiplier, days=days,
+                        low_column=low_column, high_column=high_column, calendar_days=calendar_days)
+    if (low_column, high_column) == ("Adj Close", "Adj Close"):
+        criterion.summary_prefilter = partial(may_multiply_price_within_x_days, multiplier=multiplier)
+    return criterion
+
+
+def volume_confirmed_criterion(multiplier: int, days: int,
+                               volume_multiplier: float, volume_days: int = 20,
+                               low_column: str = "Adj Close", high_column: str = "Adj Close",
+                               calendar_days: bool = False) -> Callable[[Ticker], bool]:
+    """Create a `multiply_price_with_volume_spike` criterion.
+
+    Like `price_multi_criterion`, criteria that only use `Adj Close` offer a `summary_prefilter`.
+    """
+    criterion = partial(multiply_price_with_volume_spike, multiplier=multiplier, days=days,
+                        volume_multiplier=volume_multiplier, volume_days=volume_days,
+                        low_column=low_column, high_column=high_column, calendar_days=calendar_days)
+    if (low_column, high_column) == ("Adj Close", "Adj Close"):
+        criterion.summary_prefilter = partial(may_multiply_price_within_x_days, multiplier=multiplier)
+    return criterion
+
+
 """
 The following filters implement the requested short squeeze filter:
 `definition of a major short squeeze is when a stock doubles in price (or more) within one week`.
 This function is compliant with the criterion interface of `ticker.TicketContainer.`
 """
-price_multi_2_within_5_days = partial(multiply_price_within_x_days, multiplier=2, days=5)
-price_multi_2_within_10_days = partial(multiply_price_within_x_days, multiplier=2, days=10)
-price_multi_3_within_5_days = partial(multiply_price_within_x_days, multiplier=3, days=5)
-price_multi_3_within_10_days = partial(multiply_price_within_x_days, multiplier=3, days=10)
-price_multi_5_within_5_days = partial(multiply_price_within_x_days, multiplier=5, days=5)
-price_multi_5_within_10_days = partial(multiply_price_within_x_days, multiplier=5, days=10)
+price_multi_2_within_5_days = price_multi_criterion(multiplier=2, days=5)
+price_multi_2_within_10_days = price_multi_criterion(multiplier=2, days=10)
+price_multi_3_within_5_days = price_multi_criterion(multiplier=3, days=5)
+price_multi_3_within_10_days = price_multi_criterion(multiplier=3, days=10)
+price_multi_5_within_5_days = price_multi_criterion(multiplier=5, days=5)
+price_multi_5_within_10_days = price_multi_criterion(multiplier=5, days=10)
 double_price_within_a_week = price_multi_2_within_5_days  # More readable name for the README.md
+
+"""
+The following filters measure the window in calendar days instead of trading days.
+Trading halts and other gaps in the history do not stretch the window.
+"""
+price_multi_2_within_7_calendar_days = price_multi_criterion(multiplier=2, days=7, calendar_days=True)
+price_multi_2_within_14_calendar_days = price_multi_criterion(multiplier=2, days=14, calendar_days=True)
+price_multi_3_within_7_calendar_days = price_multi_criterion(multiplier=3, days=7, calendar_days=True)
+price_multi_3_within_14_calendar_days = price_multi_criterion(multiplier=3, days=14, calendar_days=True)
+price_multi_5_within_7_calendar_days = price_multi_criterion(multiplier=5, days=7, calendar_days=True)
+price_multi_5_within_14_calendar_days = price_multi_criterion(multiplier=5, days=14, calendar_days=True)
+
+"""
+The following filters measure the increase between the daily lows and highs (`Low` -> `High`),
+i.e. they also capture intraday spikes.
+"""
+low_high_multi_2_within_5_days = price_multi_criterion(multiplier=2, days=5, low_column="Low", high_column="High")
+low_high_multi_2_within_10_days = price_multi_criterion(multiplier=2, days=10, low_column="Low", high_column="High")
+low_high_multi_3_within_5_days = price_multi_criterion(multiplier=3, days=5, low_column="Low", high_column="High")
+low_high_multi_3_within_10_days = price_multi_criterion(multiplier=3, days=10, low_column="Low", high_column="High")
+low_high_multi_5_within_5_days = price_multi_criterion(multiplier=5, days=5, low_column="Low", high_column="High")
+low_high_multi_5_within_10_days = price_multi_criterion(multiplier=5, days=10, low_column="Low", high_column="High")
+
+"""
+The following filters measure the increase between the lower and upper bound of the daily
+open and close prices (`OC_Low` -> `OC_High`), i.e. they ignore intraday spikes.
+"""
+oc_multi_2_within_5_days = price_multi_criterion(multiplier=2, days=5, low_column="OC_Low", high_column="OC_High")
+oc_multi_2_within_10_days = price_multi_criterion(multiplier=2, days=10, low_column="OC_Low", high_column="OC_High")
+oc_multi_3_within_5_days = price_multi_criterion(multiplier=3, days=5, low_column="OC_Low", high_column="OC_High")
+oc_multi_3_within_10_days = price_multi_criterion(multiplier=3, days=10, low_column="OC_Low", high_column="OC_High")
+oc_multi_5_within_5_days = price_multi_criterion(multiplier=5, days=5, low_column="OC_Low", high_column="OC_High")
+oc_multi_5_within_10_days = price_multi_criterion(multiplier=5, days=10, low_column="OC_Low", high_column="OC_High")
+
+"""
+The following filters additionally require that the volume of the day the price increase is
+observed is at least three times the median volume of the previous 20 trading days.
+"""
+price_multi_2_within_5_days_volume_3x = volume_confirmed_criterion(multiplier=2, days=5, volume_multiplier=3)
+price_multi_2_within_10_days_volume_3x = volume_confirmed_criterion(multiplier=2, days=10, volume_multiplier=3)
+price_multi_3_within_5_days_volume_3x = volume_confirmed_criterion(multiplier=3, days=5, volume_multiplier=3)
+price_multi_3_within_10_days_volume_3x = volume_confirmed_criterion(multiplier=3, days=10, volume_multiplier=3)
+price_multi_5_within_5_days_volume_3x = volume_confirmed_criterion(multiplier=5, days=5, volume_multiplier=3)
+price_multi_5_within_10_days_volume_3x = volume_confirmed_criterion(multiplier=5, days=10, volume_multiplier=3)
@@ -0,0 +1,92 @@
+"""
+Kernels are criteria written as functions over the raw NumPy arrays of a ticker history, e.g.:
+
+    def doubled_within_5_days(adj_close):
+        for i in range(5, len(adj_close)):
+            if adj_close[i] >= 2 * adj_close[i - 5:i].min():
+                return True
+        return False
+
+The parameter names select the history columns: Each name is matched with the column whose name
+in lower case and with spaces replaced by underscores is equal, e.g. `adj_close` is `Adj Close`,
+`volume` is `Volume` and `date_id` is `date_id`.
+
+If Numba is installed, e.g. with `poetry install -E jit`, kernels are JIT-compiled on their first call
+and the compiled code is cached on disk. Otherwise, or if Numba cannot compile a kernel, the kernel runs
+as plain Python function.
+Kernels are used as criteria by wrapping them with `kernel_criterion` or by prefixing their path
+with `kernel:`, see `criteria.import_criterion_functions`.
+"""
+import inspect
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from q4_majorshortsqueezes.ticker import Ticker, TICKER_HISTORY_DTYPES
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KERNEL_PATH_PREFIX = "kernel:"
+
+
+def column_for_parameter(parameter_name: str) -> str:
+    """Return the history column that is passed to a kernel parameter.
+
+    Raises:
+        ValueError: If no history column matches the parameter name.
+    """
+    columns = {column.lower().replace(" ", "_"): column for column in TICKER_HISTORY_DTYPES}
+    if parameter_name not in columns:
+        raise ValueError(f"Kernel parameter `{parameter_name}` does not name a history column. "
+                         f"Valid names are: {', '.join(columns)}")
+    return columns[parameter_name]
+
+
+class KernelCriterion:
+    """A criterion that evaluates a kernel on the history columns of a ticker.
+
+    Args:
+        kernel: The kernel function. Its parameters name the history columns it gets, see `column_for_parameter`.
+        jit: Whether the kernel is compiled with Numba, if Numba is installed.
+    """
+    def __init__(self, kernel: Callable[..., bool], jit: bool = True):
+        self.kernel = kernel
+        self.__name__ = getattr(kernel, "__name__", repr(kernel))
+        self.columns: List[str] = [column_for_parameter(name) for name in inspect.signature(kernel).parameters]
+        self._compiled: Optional[Callable[..., bool]] = numba.njit(cache=True)(kernel) if jit and numba else None
+        # Numba compiles the kernel on its first call, which may fail
+        self._compile_tried = self._compiled is None
+
+    @property
+    def is_compiled(self) -> Optional[bool]:
+        """Whether the kernel runs as compiled code. `None` until the first call, if it is yet to be compiled."""
+        if not self._compile_tried:
+            return None
+        return self._compiled is not None
+
+    def __call__(self, ticker: Ticker) -> bool:
+        arrays = [np.ascontiguousarray(ticker.values(column)) for column in self.columns]
+        if self._compiled is not None:
+            try:
+                return bool(self._compiled(*arrays))
+            except numba.core.errors.NumbaError:
+                logging.warning("Failed to compile kernel `%s`, it runs as Python function.", self.__name__,
+                                exc_info=True)
+                self._compiled = None
+            finally:
+                self._compile_tried = True
+        return bool(self.kernel(*arrays))
+
+
+_kernel_criteria: Dict[Callable, KernelCriterion] = {}
+
+
+def kernel_criterion(kernel: Callable[..., bool]) -> KernelCriterion:
+    """Return a criterion for the kernel. The criterion is created once per kernel, so that it is compiled once."""
+    if kernel not in _kernel_criteria:
+        _kernel_criteria[kernel] = KernelCriterion(kernel)
+    return _kernel_criteria[kernel]
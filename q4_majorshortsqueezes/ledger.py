@@ -0,0 +1,71 @@
+"""
+A persistent ledger of the tickers that failed in bulk pulls.
+
+Bulk pulls over thousands of tickers always lose some of them to network errors or throttling.
+The ledger keeps these tickers with their error between runs, so that they can be retried later
+without pulling the whole universe again, e.g. with `bin/pull_data.py --retry-failed`.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+
+@dataclass
+class LedgerEntry:
+    """A ticker whose last processing failed."""
+    symbol: str
+    error_class: str
+    message: str
+    # The time of the last failure, seconds since the epoch:
+    timestamp: float
+    # The amount of runs in which the ticker failed in a row:
+    attempts: int
+
+
+class FailureLedger:
+    """Records the tickers that failed in a JSON file, so that a later run can retry only them.
+
+    A failure is recorded with the class of its error, or of the error's cause, e.g. for a `DownloadError`.
+    A ticker that is processed successfully later is removed from the ledger.
+    The ledger is thread-safe. Changes are kept in memory until `save` is called.
+
+    Args:
+        path: The ledger file. It is created on `save` if it does not exist.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, LedgerEntry] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as fd:
+                self.entries = {symbol: LedgerEntry(**entry) for symbol, entry in json.load(fd).items()}
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self.entries)
+
+    def record_failure(self, symbol: str, error: BaseException):
+        cause = error.__cause__ or error
+        with self._lock:
+            previous = self.entries.get(symbol)
+            self.entries[symbol] = LedgerEntry(symbol=symbol,
+                                               error_class=type(cause).__name__,
+                                               message=str(cause),
+                                               timestamp=time.time(),
+                                               attempts=previous.attempts + 1 if previous else 1)
+
+    def record_success(self, symbol: str):
+        with self._lock:
+            self.entries.pop(symbol, None)
+
+    def save(self):
+        """Persist the ledger atomically."""
+        with self._lock:
+            content = {symbol: asdict(entry) for symbol, entry in sorted(self.entries.items())}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, mode="w") as fd:
+            json.dump(content, fd, indent=2)
+        os.replace(temp_path, self.path)
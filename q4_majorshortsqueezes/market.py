@@ -0,0 +1,112 @@
+"""
+Market-wide scans answer questions across all stored tickers per trading day, e.g. how many
+squeezes were active on each day, which the per-ticker criteria of `filter.py` cannot answer.
+
+All tickers are aligned onto a common trading calendar: The calendar is a sorted list of dates and
+each ticker's prices become a column of a (days x tickers) matrix, which is NaN on the days the ticker
+has no price, e.g. before its listing. Window computations then run on whole matrices instead of per ticker.
+The tickers are processed in chunks of columns, so that the memory use only depends on the chunk size and
+the calendar length, not on the amount of tickers.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer
+
+DATE_COLUMN = "Date"
+LISTED_COLUMN = "listed"
+
+
+def threshold_column(multiplier: int, days: int) -> str:
+    return f"multi_{multiplier}_days_{days}"
+
+
+def trading_calendar(container: FileBackedTicketContainer, max_workers: Optional[int] = None,
+                     chunk_size: int = 512) -> pd.Index:
+    """Return the sorted union of the dates of all stored tickers. Only the date column of the files is parsed.
+
+    The tickers are loaded in chunks of `chunk_size` tickers and merged into the union of the previous chunks,
+    so that only the dates of one chunk are in memory at once.
+    """
+    tickers = container.get_tickers()
+    dates = np.array([], dtype=object)
+    for start in range(0, len(tickers), chunk_size):
+        ticker_histories = container.get_data(max_workers=max_workers, tickers=tickers[start:start + chunk_size],
+                                              columns=[])
+        if ticker_histories:
+            chunk_dates = np.concatenate([ticker_history.index.to_numpy(dtype=object)
+                                          for ticker_history in ticker_histories.values()])
+            dates = np.union1d(dates, chunk_dates)
+    return pd.Index(dates.tolist(), name=DATE_COLUMN)
+
+
+def align_to_calendar(ticker_histories: Dict[str, pd.DataFrame], column: str, calendar: pd.Index) -> np.ndarray:
+    """Return a (days x tickers) matrix of a history column, with NaN on days a ticker has no value."""
+    matrix = np.full((len(calendar), len(ticker_histories)), np.nan)
+    for i, ticker_history in enumerate(ticker_histories.values()):
+        positions = calendar.get_indexer(ticker_history.index)
+        known = positions >= 0
+        matrix[positions[known], i] = ticker_history[column].to_numpy(dtype=float)[known]
+    return matrix
+
+
+def prior_rolling_min_matrix(matrix: np.ndarray, days: int) -> np.ndarray:
+    """Return the minimum of the previous `days` rows of each column, ignoring NaN. The first row is NaN.
+
+    This is the matrix version of `filter.prior_rolling_min` on trading days.
+    """
+    rolling_min = pd.DataFrame(matrix).rolling(days, min_periods=1).min().shift(1)
+    return rolling_min.to_numpy()
+
+
+def active_squeeze_counts(container: FileBackedTicketContainer, thresholds: List[Tuple[int, int]],
+                          column: str = "Adj Close", calendar: Optional[pd.Index] = None,
+                          chunk_size: int = 512, max_workers: Optional[int] = None) -> pd.DataFrame:
+    """Count for each trading day the tickers whose price is a multiple of their recent low.
+
+    A ticker counts for a threshold `(multiplier, days)` on a day, if its price on that day is at least
+    `multiplier` times its lowest price of the previous `days` days of the calendar. This is the condition of
+    `multiply_price_within_x_days`, evaluated on every day instead of stopping at the first match.
+    Windows consist of calendar days, hence they equal the trading-day windows of `filter.py` for tickers
+    that have a price on every calendar day between their first and last date.
+
+    Args:
+        container: The stored tickers. Its date range bounds the scanned days.
+        thresholds: The `(multiplier, days)` pairs to count.
+        column: The price column, e.g. `Adj Close`.
+        calendar: The trading days. Defaults to the union of the dates of all stored tickers, see `trading_calendar`.
+        chunk_size: The amount of tickers loaded and aligned at once. A chunk takes about
+                    `8 * chunk_size * len(calendar)` bytes per matrix.
+        max_workers: The amount of threads that parse the ticker files, see `load_ticker_histories_from_csv`.
+
+    Returns:
+        A data frame indexed by the calendar with a count column per threshold, see `threshold_column`, and
+        a `listed` column with the amount of tickers that have a price on each day.
+    """
+    calendar = (trading_calendar(container, max_workers, chunk_size) if calendar is None
+                else pd.Index(calendar, name=DATE_COLUMN))
+    counts = {threshold_column(multiplier, days): np.zeros(len(calendar), dtype=np.int64)
+              for multiplier, days in thresholds}
+    listed = np.zeros(len(calendar), dtype=np.int64)
+    days_options = sorted({days for _, days in thresholds})
+
+    tickers = container.get_tickers()
+    for start in range(0, len(tickers), chunk_size):
+        ticker_histories = container.get_data(max_workers=max_workers, tickers=tickers[start:start + chunk_size],
+                                              columns=[column])
+        prices = align_to_calendar(ticker_histories, column, calendar)
+        listed += np.count_nonzero(~np.isnan(prices), axis=1)
+        for days in days_options:
+            window_min = prior_rolling_min_matrix(prices, days)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                multiples = prices / window_min
+            multiples[window_min == 0] = np.nan
+            for multiplier, threshold_days in thresholds:
+                if threshold_days == days:
+                    with np.errstate(invalid="ignore"):
+                        counts[threshold_column(multiplier, days)] += np.count_nonzero(multiples >= multiplier,
+                                                                                       axis=1)
+
+    return pd.DataFrame({**counts, LISTED_COLUMN: listed}, index=calendar)
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator
+
+
+@dataclass
+class StageTiming:
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+
+
+@dataclass
+class Observation:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    """Collects per-stage wall and CPU timings as well as counters of a run.
+
+    Stages are named code sections, e.g. `download` or `criterion:<name>`, that can be entered
+    many times. Counters track throughput, e.g. processed tickers, rows or bytes.
+    Observations track sampled values, e.g. queue depths, by their count, mean and maximum.
+    The CPU time is the process time, i.e. it includes the CPU time of all threads.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages: Dict[str, StageTiming] = {}
+        self.counters: Dict[str, int] = {}
+        self.observations: Dict[str, Observation] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the wall and CPU time of the code block and add it to the stage `name`."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def add_time(self, name: str, wall_seconds: float, cpu_seconds: float):
+        with self._lock:
+            timing = self.stages.setdefault(name, StageTiming())
+            timing.calls += 1
+            timing.wall_seconds += wall_seconds
+            timing.cpu_seconds += cpu_seconds
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            observation = self.observations.setdefault(name, Observation())
+            observation.count += 1
+            observation.total += value
+            observation.max = max(observation.max, value)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {"stages": {name: asdict(timing) for name, timing in self.stages.items()},
+                "counters": dict(self.counters),
+                "observations": {name: {**asdict(observation), "mean": observation.mean}
+                                 for name, observation in self.observations.items()}}
+
+    def summary_table(self) -> str:
+        """Return a human readable table of all stage timings and counters."""
+        names = [*self.stages, *self.counters, *self.observations]
+        width = max([len("Observation")] + [len(name) for name in names])
+        lines = [f"{'Stage':<{width}} {'Calls':>10} {'Wall [s]':>12} {'CPU [s]':>12}"]
+        for name, timing in sorted(self.stages.items()):
+            lines.append(f"{name:<{width}} {timing.calls:>10} "
+                         f"{timing.wall_seconds:>12.3f} {timing.cpu_seconds:>12.3f}")
+        lines.append("")
+        lines.append(f"{'Counter':<{width}} {'Value':>10}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<{width}} {value:>10}")
+        if self.observations:
+            lines.append("")
+            lines.append(f"{'Observation':<{width}} {'Count':>10} {'Mean':>12} {'Max':>12}")
+            for name, observation in sorted(self.observations.items()):
+                lines.append(f"{name:<{width}} {observation.count:>10} "
+                             f"{observation.mean:>12.3f} {observation.max:>12.3f}")
+        return "\n".join(lines)
+
+    def to_prometheus_text(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric, attribute in [("q4_stage_calls_total", "calls"),
+                                  ("q4_stage_wall_seconds_total", "wall_seconds"),
+                                  ("q4_stage_cpu_seconds_total", "cpu_seconds")]:
+            lines.append(f"# TYPE {metric} counter")
+            for name, timing in sorted(self.stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {getattr(timing, attribute)}')
+        for name, value in sorted(self.counters.items()):
+            metric = f"q4_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for metric, attribute, metric_type in [("q4_observation_count", "count", "counter"),
+                                               ("q4_observation_mean", "mean", "gauge"),
+                                               ("q4_observation_max", "max", "gauge")]:
+            if self.observations:
+                lines.append(f"# TYPE {metric} {metric_type}")
+            for name, observation in sorted(self.observations.items()):
+                lines.append(f'{metric}{{observation="{name}"}} {getattr(observation, attribute)}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path: str):
+        """Write the metrics to a file.
+
+        Args:
+            file_path: The output file. Files ending with `.prom` or `.txt` are written in the
+                       Prometheus text format, all other files are written as JSON.
+        """
+        with open(file_path, mode="w") as fd:
+            if file_path.endswith((".prom", ".txt")):
+                fd.write(self.to_prometheus_text())
+            else:
+                json.dump(self.to_dict(), fd, indent=2)
+
+
+_NULL_STAGE = nullcontext()
+
+
+class NullMetrics(Metrics):
+    """Metrics that ignore all measurements. Used whenever instrumentation is disabled."""
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def add_time(self, name: str, wall_seconds: float, cpu_seconds: float):
+        pass
+
+    def increment(self, name: str, value: int = 1):
+        pass
+
+    def observe(self, name: str, value: float):
+        pass
+
+
+NULL_METRICS = NullMetrics()
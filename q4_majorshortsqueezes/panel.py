@@ -0,0 +1,225 @@
+"""
+A panel keeps the price histories of many tickers in shared memory, so that criteria can be
+evaluated in worker processes without pickling a data frame per ticker.
+
+Each column of all histories is concatenated into a single flat array in its own
+`multiprocessing.shared_memory` block. An offsets index maps each ticker to its slice:
+The history of the i-th ticker is `column[offsets[i]:offsets[i + 1]]`.
+Workers attach to the blocks and evaluate criteria on `ArrayTicker` objects, which are
+backed by zero-copy NumPy views.
+"""
+import sys
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.criteria import import_criterion_functions
+from q4_majorshortsqueezes.ticker import TICKER_HISTORY_DTYPES, TickerHistory
+
+DATE_COLUMN = "Date"
+
+
+@dataclass
+class PanelLayout:
+    """Everything a process needs to attach to a panel. It is small and cheap to pickle."""
+    symbols: List[str]
+    offsets: np.ndarray
+    # Column name -> (shared memory block name, dtype)
+    columns: Dict[str, Tuple[str, str]]
+
+
+class ArrayTicker:
+    """A ticker whose history columns are NumPy arrays, e.g. views into a `SharedPanel`.
+
+    It provides the same `symbol`, `values`, `dates` and `shared` interface as `Ticker`, hence
+    criteria that only use these work with both. The `history` data frame is only built on access.
+    """
+    def __init__(self, symbol: str, columns: Dict[str, np.ndarray], dates: np.ndarray,
+                 market_cap: Optional[int] = None):
+        self.symbol = symbol
+        self.market_cap = market_cap
+        self._columns = columns
+        self._dates = dates
+        self._shared: Dict[Hashable, Any] = {}
+
+    def shared(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return a value derived from the ticker's history that is computed only once, see `Ticker.shared`."""
+        if key not in self._shared:
+            self._shared[key] = compute()
+        return self._shared[key]
+
+    def values(self, column: str) -> np.ndarray:
+        """Return a history column. The array is read-only."""
+        return self._columns[column]
+
+    def dates(self) -> np.ndarray:
+        """Return the dates of the history. The array is read-only."""
+        return self._dates
+
+    @property
+    def history(self) -> TickerHistory:
+        return self.shared(("history",), lambda: pd.DataFrame(
+            {column: np.array(values) for column, values in self._columns.items()},
+            index=pd.Index(np.array(self._dates), name=DATE_COLUMN)))
+
+
+class SharedPanel:
+    """Price histories of many tickers in shared memory blocks.
+
+    The process that creates a panel with `create` owns its blocks and removes them when the panel is
+    closed, garbage collected or the interpreter exits. Other processes `attach` to the blocks by the
+    panel's `layout` and only release their handles.
+    Use the panel as context manager to release it deterministically.
+    """
+    def __init__(self, layout: PanelLayout, blocks: Dict[str, shared_memory.SharedMemory], owner: bool):
+        self.layout = layout
+        self._blocks = blocks
+        self._arrays: Dict[str, np.ndarray] = {}
+        for column, (_, dtype) in layout.columns.items():
+            array = np.ndarray((int(layout.offsets[-1]),), dtype=dtype, buffer=blocks[column].buf)
+            array.flags.writeable = False
+            self._arrays[column] = array
+        self._index = {symbol: i for i, symbol in enumerate(layout.symbols)}
+        self._finalizer = weakref.finalize(self, _release_blocks, list(blocks.values()), owner)
+
+    @classmethod
+    def create(cls, ticker_histories: Dict[str, TickerHistory],
+               columns: Optional[List[str]] = None) -> "SharedPanel":
+        """Copy the histories into new shared memory blocks.
+
+        Args:
+            ticker_histories: A mapping of tickers and their price history.
+            columns: The history columns to copy. Defaults to all columns of `TICKER_HISTORY_DTYPES`
+                     that all histories have.
+
+        Returns:
+            The panel, which owns the new blocks.
+        """
+        if columns is None:
+            columns = [column for column in TICKER_HISTORY_DTYPES
+                       if all(column in ticker_history for ticker_history in ticker_histories.values())]
+        symbols = list(ticker_histories)
+        lengths = [len(ticker_histories[symbol]) for symbol in symbols]
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+
+        # A single concatenation is much faster than extracting the columns of each history
+        panel_frame = pd.concat([ticker_histories[symbol] for symbol in symbols]) if symbols else pd.DataFrame()
+        sources = {column: panel_frame[column].to_numpy() if symbols else np.empty(0) for column in columns}
+        sources[DATE_COLUMN] = panel_frame.index.to_numpy(dtype=str) if symbols else np.empty(0, dtype="U10")
+
+        blocks: Dict[str, shared_memory.SharedMemory] = {}
+        layout_columns: Dict[str, Tuple[str, str]] = {}
+        try:
+            for column, source in sources.items():
+                # Shared memory blocks cannot be empty
+                block = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+                blocks[column] = block
+                np.ndarray(source.shape, dtype=source.dtype, buffer=block.buf)[:] = source
+                layout_columns[column] = (block.name, source.dtype.str)
+        except BaseException:
+            _release_blocks(list(blocks.values()), owner=True)
+            raise
+
+        return cls(PanelLayout(symbols, offsets, layout_columns), blocks, owner=True)
+
+    @classmethod
+    def attach(cls, layout: PanelLayout) -> "SharedPanel":
+        """Attach to the blocks of a panel that was created by another process."""
+        # Only the owner may remove the blocks. Before Python 3.13, attaching always registers a block with the
+        # resource tracker. That is harmless for child processes, which share the tracker of their parent.
+        options = {"track": False} if sys.version_info >= (3, 13) else {}
+        blocks = {column: shared_memory.SharedMemory(name=name, **options)
+                  for column, (name, _) in layout.columns.items()}
+        return cls(layout, blocks, owner=False)
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.layout.symbols
+
+    def __len__(self) -> int:
+        return len(self.layout.symbols)
+
+    def ticker(self, symbol: str) -> ArrayTicker:
+        """Return the ticker with views into the panel's blocks."""
+        return self.ticker_at(self._index[symbol])
+
+    def ticker_at(self, i: int) -> ArrayTicker:
+        """Return the i-th ticker of the panel with views into the panel's blocks."""
+        start, end = self.layout.offsets[i], self.layout.offsets[i + 1]
+        columns = {column: array[start:end] for column, array in self._arrays.items() if column != DATE_COLUMN}
+        return ArrayTicker(self.layout.symbols[i], columns, self._arrays[DATE_COLUMN][start:end])
+
+    def close(self):
+        """Release the panel. The owner also removes the shared memory blocks."""
+        # Views must not outlive the buffers of the blocks
+        self._arrays.clear()
+        self._finalizer()
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _release_blocks(blocks: List[shared_memory.SharedMemory], owner: bool):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # A view of the block is still referenced, the block is closed when the process exits
+            pass
+        if owner:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# The state of a worker process of `evaluate_criteria`
+_worker_panel: Optional[SharedPanel] = None
+_worker_criteria: List[Callable] = []
+
+
+def _init_worker(layout: PanelLayout, criterion_paths: List[str]):
+    global _worker_panel, _worker_criteria
+    _worker_panel = SharedPanel.attach(layout)
+    _worker_criteria = import_criterion_functions(criterion_paths)
+
+
+def _evaluate_range(start: int, end: int) -> List[bool]:
+    results = []
+    for i in range(start, end):
+        ticker = _worker_panel.ticker_at(i)
+        results.append(all(criterion(ticker) for criterion in _worker_criteria))
+    return results
+
+
+def evaluate_criteria(panel: SharedPanel, criterion_paths: List[str], max_workers: Optional[int] = None,
+                      chunk_size: int = 64) -> Dict[str, bool]:
+    """Evaluate criteria for all tickers of a panel in worker processes.
+
+    The workers attach to the panel's shared memory blocks, hence no price data is pickled.
+    Criteria are passed by their paths and imported by the workers. They must only use the
+    `ArrayTicker` interface.
+
+    Args:
+        panel: The panel of the tickers.
+        criterion_paths: The paths of the criterion functions, `full.qualified.path.to.module/func_name`.
+        max_workers: The amount of worker processes. Defaults to the amount of CPUs.
+        chunk_size: The amount of tickers a worker evaluates per task.
+
+    Returns:
+        A mapping of each ticker and whether it satisfies all criteria.
+    """
+    chunks = [(start, min(start + chunk_size, len(panel))) for start in range(0, len(panel), chunk_size)]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(panel.layout, criterion_paths)) as pool:
+        futures = [pool.submit(_evaluate_range, start, end) for start, end in chunks]
+        satisfied = [result for future in futures for result in future.result()]
+    return dict(zip(panel.symbols, satisfied))
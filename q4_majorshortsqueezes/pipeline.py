@@ -0,0 +1,128 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+from q4_majorshortsqueezes.metrics import Metrics, NULL_METRICS
+
+# Tells the worker threads of a stage that no more items follow.
+_DONE = object()
+# The interval in which blocked threads check whether the pipeline was aborted.
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineStage:
+    """A processing step of a `Pipeline`.
+
+    Args:
+        name: The name of the stage. The depth of its input queue is observed as `queue_depth:<name>`.
+        func: Processes an item and returns the item that is passed to the next stage.
+              If `None` is returned, the item is dropped.
+        workers: The amount of threads that run the stage concurrently.
+    """
+    name: str
+    func: Callable[[Any], Optional[Any]]
+    workers: int = 1
+
+
+class Pipeline:
+    """Runs items through a sequence of stages, each in its own worker threads.
+
+    Consecutive stages are connected by bounded queues: A stage that cannot keep up blocks the
+    stages in front of it (backpressure), so at most `queue_size` items wait in front of a stage.
+    Thereby e.g. network-bound and CPU-bound stages overlap instead of waiting for each other.
+    If every stage has a single worker, the items pass each stage in the order they were given.
+
+    A `ValueError` raised by a stage only drops the item it was raised for and is passed to `on_error`.
+    Any other exception aborts the pipeline and is raised by `run`.
+
+    Args:
+        stages: The stages in processing order.
+        queue_size: The maximum amount of items waiting in front of each stage.
+        metrics: Observes the depth of each stage's input queue whenever an item is enqueued.
+        on_error: Called with the item whose processing raised a `ValueError`, while the error is handled.
+                  By default, the error is logged.
+    """
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 32, metrics: Optional[Metrics] = None,
+                 on_error: Optional[Callable[[Any], None]] = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.metrics = metrics or NULL_METRICS
+        self.on_error = on_error or (lambda item: logging.exception("Processing of `%s` failed.", item))
+
+    def run(self, items: Iterable[Any]):
+        """Process all items and return when the last stage has processed all of them."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        abort = threading.Event()
+        errors: List[BaseException] = []
+        remaining_workers = [stage.workers for stage in self.stages]
+        lock = threading.Lock()
+
+        def put(index: int, item: Any) -> bool:
+            while not abort.is_set():
+                try:
+                    queues[index].put(item, timeout=_POLL_SECONDS)
+                except queue.Full:
+                    continue
+                if item is not _DONE:
+                    self.metrics.observe(f"queue_depth:{self.stages[index].name}", queues[index].qsize())
+                return True
+            return False
+
+        def fail(error: BaseException):
+            with lock:
+                errors.append(error)
+            abort.set()
+
+        def feed():
+            try:
+                for item in items:
+                    if not put(0, item):
+                        return
+                for _ in range(self.stages[0].workers):
+                    put(0, _DONE)
+            except BaseException as error:
+                fail(error)
+
+        def work(index: int):
+            stage = self.stages[index]
+            try:
+                while not abort.is_set():
+                    try:
+                        item = queues[index].get(timeout=_POLL_SECONDS)
+                    except queue.Empty:
+                        continue
+                    if item is _DONE:
+                        break
+                    try:
+                        result = stage.func(item)
+                    except ValueError:
+                        self.on_error(item)
+                        continue
+                    if result is not None and index + 1 < len(self.stages):
+                        put(index + 1, result)
+            except BaseException as error:
+                fail(error)
+            finally:
+                with lock:
+                    remaining_workers[index] -= 1
+                    is_last_worker = remaining_workers[index] == 0
+                if is_last_worker and index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].workers):
+                        put(index + 1, _DONE)
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{i}", daemon=True)
+                        for i in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
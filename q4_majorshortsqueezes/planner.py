@@ -0,0 +1,109 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, TYPE_CHECKING
+
+from q4_majorshortsqueezes.metrics import Metrics, NULL_METRICS
+
+if TYPE_CHECKING:
+    from q4_majorshortsqueezes.ticker import Ticker
+
+
+@dataclass
+class PlannedCriterion:
+    name: str
+    criterion: Callable[["Ticker"], bool]
+    # Estimates that were given by the user. They take precedence over learned values.
+    cost: Optional[float] = None
+    selectivity: Optional[float] = None
+    evaluations: int = 0
+    passes: int = 0
+    total_seconds: float = 0.0
+
+    def estimated_cost(self) -> float:
+        """Estimated evaluation time per ticker in seconds."""
+        if self.cost is not None:
+            return self.cost
+        if self.evaluations == 0:
+            # Unknown criteria are assumed to be equally expensive, which keeps them in the given order.
+            return 1.0
+        return self.total_seconds / self.evaluations
+
+    def estimated_selectivity(self) -> float:
+        """Estimated fraction of tickers that satisfy the criterion."""
+        if self.selectivity is not None:
+            return self.selectivity
+        # Laplace smoothing: Unknown criteria start at 0.5 and a few evaluations never yield 0 or 1.
+        return (self.passes + 1) / (self.evaluations + 2)
+
+    def rank(self) -> float:
+        """The expected cost to reject a ticker. Criteria with a lower rank are evaluated first.
+
+        This is the classic ordering of conjunctive predicates: cost / (1 - selectivity).
+        A criterion that every ticker satisfies never saves any work and is evaluated last.
+        """
+        rejection_probability = 1.0 - self.estimated_selectivity()
+        if rejection_probability <= 0:
+            return float("inf")
+        return self.estimated_cost() / rejection_probability
+
+
+class CriterionPlanner:
+    """Evaluates a conjunction of criteria in the order that is expected to be the cheapest.
+
+    The planner learns the cost and the selectivity of each criterion from its evaluations,
+    unless estimates are given. Cheap and highly selective criteria are evaluated first and
+    the evaluation stops with the first criterion a ticker does not satisfy.
+    Since all criteria are evaluated on the same `Ticker` object, they share
+    precomputed series, see `Ticker.shared`.
+    Tickers may be evaluated by several threads at once, which share the learned statistics.
+
+    Args:
+        metrics: Collects the timings of the criteria as stages `criterion:<name>`.
+    """
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics or NULL_METRICS
+        self._criteria: List[PlannedCriterion] = []
+        # Guards the criteria list and their learned statistics
+        self._lock = threading.Lock()
+
+    def add(self, name: str, criterion: Callable[["Ticker"], bool],
+            cost: Optional[float] = None, selectivity: Optional[float] = None):
+        """Add a criterion.
+
+        Args:
+            name: The name used to report the criterion.
+            criterion: The criterion function.
+            cost: Estimated evaluation time per ticker in seconds. Learned from evaluations if `None`.
+            selectivity: Estimated fraction of tickers that satisfy the criterion.
+                         Learned from evaluations if `None`.
+        """
+        with self._lock:
+            self._criteria.append(PlannedCriterion(name, criterion, cost=cost, selectivity=selectivity))
+
+    def plan(self) -> List[PlannedCriterion]:
+        """Return the criteria in the order they are evaluated next."""
+        # `sorted` is stable, so criteria with equal ranks keep the order they were added in.
+        with self._lock:
+            return sorted(self._criteria, key=PlannedCriterion.rank)
+
+    def evaluate(self, ticker: "Ticker") -> bool:
+        """Return whether the ticker satisfies all criteria."""
+        for planned in self.plan():
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time() if self.metrics.enabled else 0.0
+            satisfied = planned.criterion(ticker)
+            wall_seconds = time.perf_counter() - wall_start
+            if self.metrics.enabled:
+                self.metrics.add_time(f"criterion:{planned.name}", wall_seconds,
+                                      time.process_time() - cpu_start)
+
+            with self._lock:
+                planned.evaluations += 1
+                planned.total_seconds += wall_seconds
+                if satisfied:
+                    planned.passes += 1
+            if not satisfied:
+                return False
+
+        return True
@@ -0,0 +1,91 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from q4_majorshortsqueezes.ticker import Ticker
+
+
+class CriterionProfiler:
+    """Profiles criterion functions and the ticker load path with cProfile.
+
+    Each profiled section (e.g. a criterion or `csv_load`) gets its own profile, so
+    a single slow criterion can be spotted even if many criteria are used.
+    Additionally, the duration of each section is tracked per ticker to name the
+    tickers whose evaluation was slowest.
+
+    Args:
+        top_n: The amount of hotspot functions and slowest tickers listed per section in the report.
+    """
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._durations: Dict[str, List[Tuple[float, str]]] = {}
+
+    @contextmanager
+    def profile(self, section: str, ticker: str) -> Iterator[None]:
+        """Profile the code block and account it to the given section and ticker."""
+        profile = self._profiles.setdefault(section, cProfile.Profile())
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._durations.setdefault(section, []).append((time.perf_counter() - start, ticker))
+
+    def wrap_criterion(self, section: str, criterion: Callable[[Ticker], bool]) -> Callable[[Ticker], bool]:
+        """Return a criterion that behaves like the given one but is profiled under `section`."""
+        @wraps(criterion)
+        def profiled_criterion(ticker: Ticker) -> bool:
+            with self.profile(section, ticker.symbol):
+                return criterion(ticker)
+
+        return profiled_criterion
+
+    def slowest_tickers(self, section: str) -> List[Tuple[float, str]]:
+        """Return the `top_n` slowest tickers of the section as (seconds, ticker) pairs."""
+        return sorted(self._durations.get(section, []), reverse=True)[:self.top_n]
+
+    def write_report(self, output_dir_path: str) -> str:
+        """Write a profile artifact per section and a hotspot report to the given directory.
+
+        The profile artifacts are named `<section>.prof` and can be inspected with `pstats`
+        or tools like `snakeviz`. The hotspot report `hotspots.txt` lists for each section
+        the total time, the `top_n` functions by cumulative time and the `top_n` slowest tickers.
+
+        Args:
+            output_dir_path: The directory to write the files to.
+
+        Returns:
+            The path of the hotspot report.
+        """
+        report = io.StringIO()
+        sections = sorted(self._profiles, key=lambda s: sum(d for d, _ in self._durations.get(s, [])),
+                          reverse=True)
+        for section in sections:
+            durations = self._durations.get(section, [])
+            self._profiles[section].dump_stats(os.path.join(output_dir_path, f"{_file_name(section)}.prof"))
+
+            report.write(f"=== {section} ===\n")
+            report.write(f"Calls: {len(durations)}, total time: {sum(d for d, _ in durations):.3f}s\n\n")
+            report.write("Slowest tickers:\n")
+            for duration, ticker in self.slowest_tickers(section):
+                report.write(f"  {ticker:<10} {duration:.6f}s\n")
+            report.write("\n")
+            stats = pstats.Stats(self._profiles[section], stream=report)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+
+        report_path = os.path.join(output_dir_path, "hotspots.txt")
+        with open(report_path, mode="w") as fd:
+            fd.write(report.getvalue())
+        return report_path
+
+
+def _file_name(section: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", section)
@@ -0,0 +1,165 @@
+"""
+Data-quality validation of ticker histories.
+
+Yahoo Finance data contains rows that break the price filters: Zero, negative or missing prices and
+jumps of unadjusted splits. E.g. a window minimum close to zero inflates the `Increase` of
+`multiply_price_within_x_days` to huge values. The validation detects these rows with vectorized checks:
+ - Invalid rows: A price column is NaN, zero or negative.
+ - Split artifacts: The open, high, low and close of a day all differ from the ones of the previous day by
+   about the same common split ratio, e.g. 2, 10 or 1/2, as if the prices were not split-adjusted.
+   Genuine price moves of that size, e.g. squeezes, have a wide intraday range, hence they do not match.
+ - Gaps: More than `MAX_GAP_BUSINESS_DAYS` business days between two consecutive rows. Gaps are only reported.
+
+In `flag` mode, the issues are only logged. In `repair` mode, invalid rows are dropped and the prices before
+each split artifact are scaled by its split ratio, which undoes the jump. A single-day spike is a jump followed
+by the inverse jump, hence only the spike itself is scaled.
+The results are kept as `QualityReport` per ticker in a sidecar file next to stored histories, so that
+clean tickers are not validated again.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.summary import TickerSidecarIndex
+
+QUALITY_MODES = ["flag", "repair"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "OC_High", "OC_Low"]
+SPLIT_COLUMNS = ["Open", "High", "Low", "Close"]
+SPLIT_RATIOS = np.array([2, 3, 4, 5, 8, 10, 15, 20, 25, 30, 40, 50, 100], dtype=float)
+# The maximum relative difference between a jump and a split ratio
+SPLIT_TOLERANCE = 0.05
+MAX_GAP_BUSINESS_DAYS = 5
+
+
+@dataclass
+class QualityReport:
+    """The data-quality issues of a ticker history."""
+    row_count: int
+    invalid_rows: int
+    split_artifacts: int
+    gaps: int
+    # The file state the report was computed for, see `TickerSidecarIndex`:
+    file_size: int = 0
+    file_mtime_ns: int = 0
+
+    @property
+    def needs_repair(self) -> bool:
+        return bool(self.invalid_rows or self.split_artifacts)
+
+
+class QualityIndex(TickerSidecarIndex):
+    """A sidecar file next to stored ticker histories that keeps a quality report per ticker."""
+    FILE_NAME = ".ticker_quality.json"
+    RECORD_TYPE = QualityReport
+    DESCRIPTION = "ticker quality index"
+
+    def update(self, ticker: str, file_path: str, report: QualityReport):
+        """Remember the report of the ticker history that is stored in `file_path`."""
+        stat = os.stat(file_path)
+        report.file_size, report.file_mtime_ns = stat.st_size, stat.st_mtime_ns
+        self.put(ticker, report)
+
+
+def invalid_rows(ticker_history: pd.DataFrame) -> np.ndarray:
+    """Return a mask of the rows with a NaN, zero or negative price."""
+    columns = [column for column in PRICE_COLUMNS if column in ticker_history]
+    prices = ticker_history[columns].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        return ~(prices > 0).all(axis=1)
+
+
+def split_ratios(ticker_history: pd.DataFrame) -> np.ndarray:
+    """Return for each row the ratio of its split artifact, which is 1.0 for rows without one.
+
+    The ratio is the rounded jump from the previous row, e.g. 0.5 for the unadjusted prices after a 2:1 split.
+    It is only an artifact if the open, high, low and close all jumped by the same split ratio.
+    Histories without these columns are not checked, since a single column cannot tell a split artifact
+    from a genuine jump, e.g. of a squeeze.
+    """
+    ratios = np.ones(len(ticker_history))
+    if len(ticker_history) < 2 or not all(column in ticker_history for column in SPLIT_COLUMNS):
+        return ratios
+    prices = ticker_history[SPLIT_COLUMNS].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Compare on a log scale, so that up and down jumps are treated alike
+        log_jumps = np.log(prices[1:] / prices[:-1])
+        candidates = np.log(SPLIT_RATIOS)
+        nearest = candidates[np.abs(np.abs(log_jumps)[..., None] - candidates).argmin(axis=-1)]
+        matches = np.abs(np.abs(log_jumps) - nearest) <= np.log1p(SPLIT_TOLERANCE)
+        split_ratio = np.sign(log_jumps) * nearest
+        artifacts = matches.all(axis=1) & (split_ratio == split_ratio[:, :1]).all(axis=1)
+    ratios[1:][artifacts] = np.exp(split_ratio[artifacts, 0])
+    return ratios
+
+
+def gap_count(ticker_history: pd.DataFrame) -> int:
+    """Return the amount of gaps of more than `MAX_GAP_BUSINESS_DAYS` business days between consecutive rows."""
+    if len(ticker_history) < 2:
+        return 0
+    dates = pd.to_datetime(ticker_history.index).to_numpy(dtype="datetime64[D]")
+    return int(np.count_nonzero(np.busday_count(dates[:-1], dates[1:]) > MAX_GAP_BUSINESS_DAYS))
+
+
+def validate_ticker_history(ticker_history: pd.DataFrame, repair: bool = False) \
+        -> Tuple[QualityReport, pd.DataFrame]:
+    """Check a ticker history for data-quality issues and optionally repair them.
+
+    Args:
+        ticker_history: The price history of a ticker.
+        repair: Whether to drop invalid rows and undo split artifacts.
+
+    Returns:
+        The report of the issues and the history, which is repaired if `repair` is set. If there is nothing to
+        repair, the given history is returned.
+    """
+    invalid = invalid_rows(ticker_history)
+    valid_history = ticker_history[~invalid] if invalid.any() else ticker_history
+    ratios = split_ratios(valid_history)
+    artifacts = ratios != 1.0
+    report = QualityReport(row_count=len(ticker_history),
+                           invalid_rows=int(np.count_nonzero(invalid)),
+                           split_artifacts=int(np.count_nonzero(artifacts)),
+                           gaps=gap_count(valid_history))
+    if not repair or not report.needs_repair:
+        return report, ticker_history
+
+    repaired = valid_history.copy()
+    if artifacts.any():
+        # The prices before each artifact are scaled by its ratio: The factor of a row is the
+        # product of the ratios of all later artifacts.
+        factors = np.append(np.cumprod(ratios[:0:-1])[::-1], 1.0)
+        columns = [column for column in PRICE_COLUMNS if column in repaired]
+        repaired[columns] = repaired[columns].to_numpy(dtype=float) * factors[:, None]
+    return report, repaired
+
+
+def check_ticker_history(ticker: str, ticker_history: pd.DataFrame, mode: str,
+                         report: Optional[QualityReport] = None) -> Tuple[QualityReport, pd.DataFrame]:
+    """Validate a ticker history in the given mode and log its issues.
+
+    Args:
+        ticker: The ticker symbol, for logging.
+        ticker_history: The price history of the ticker.
+        mode: `flag` to only log the issues or `repair` to repair them, see `validate_ticker_history`.
+        report: A previous report of the same history. The validation is skipped if it shows nothing to repair
+                or if the issues are only flagged.
+
+    Returns:
+        The quality report and the checked history.
+    """
+    if mode not in QUALITY_MODES:
+        raise ValueError(f"Unknown quality mode `{mode}`, valid modes are: {', '.join(QUALITY_MODES)}")
+    if report is None or (mode == "repair" and report.needs_repair):
+        report, ticker_history = validate_ticker_history(ticker_history, repair=mode == "repair")
+    if report.needs_repair:
+        logging.warning("Ticker `%s` has %s invalid rows and %s split artifacts%s.", ticker, report.invalid_rows,
+                        report.split_artifacts, ", which are repaired" if mode == "repair" else "")
+    if report.gaps:
+        logging.debug("Ticker `%s` has %s gaps of more than %s business days.", ticker, report.gaps,
+                      MAX_GAP_BUSINESS_DAYS)
+    return report, ticker_history
@@ -0,0 +1,145 @@
+"""
+Retries of ticker downloads for bulk pulls.
+
+A failed download is retried with exponential backoff. Throttling errors of the data provider are also
+counted by a circuit breaker that is shared by all download threads: After several consecutive throttling
+errors, it pauses all downloads for a while instead of letting each thread run into the limit again.
+A download that still fails after all attempts raises a `DownloadError`, which is a `ValueError`, so that
+it only fails its ticker like any other ticker error.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+
+Downloader = Callable[[str, Optional[str], Optional[str]], pd.DataFrame]
+
+
+@dataclass
+class RetryPolicy:
+    """How ticker downloads are retried.
+
+    Args:
+        max_attempts: The maximum amount of attempts per download.
+        backoff_seconds: The delay before the first retry. Each further retry waits twice as long.
+        max_backoff_seconds: The maximum delay before a retry.
+        throttle_threshold: The amount of consecutive throttling errors that open the circuit breaker.
+        throttle_pause_seconds: How long an open circuit breaker pauses all downloads.
+    """
+    max_attempts: int = 3
+    backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 60.0
+    throttle_threshold: int = 3
+    throttle_pause_seconds: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay after the given failed attempt, starting at 1."""
+        return min(self.backoff_seconds * 2 ** (attempt - 1), self.max_backoff_seconds)
+
+
+class DownloadError(ValueError):
+    """A download failed in all attempts. The error of the last attempt is the cause."""
+
+
+class TransientDownloadError(ValueError):
+    """A download failed due to a network error and may succeed when it is retried.
+
+    It is a `ValueError`, so that it only fails its ticker, even if the download is not retried.
+    """
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether the error signals that the data provider throttles the requests, e.g. HTTP 429."""
+    return "RateLimit" in type(error).__name__ or "Too Many Requests" in str(error) or "429" in str(error)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a download may succeed when it is retried: Throttling and network errors."""
+    return is_throttling_error(error) or isinstance(error, (OSError, TransientDownloadError))
+
+
+class CircuitBreaker:
+    """Pauses all callers after consecutive throttling errors.
+
+    Args:
+        threshold: The amount of consecutive throttling errors that open the breaker.
+        pause_seconds: How long the breaker stays open.
+        clock: Returns the current time in seconds.
+        sleep: Waits for the given seconds.
+    """
+    def __init__(self, threshold: int, pause_seconds: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.threshold = threshold
+        self.pause_seconds = pause_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._consecutive_errors = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.clock() < self._open_until
+
+    def wait(self):
+        """Block while the breaker is open."""
+        while True:
+            with self._lock:
+                remaining = self._open_until - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(remaining)
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_errors = 0
+
+    def record_throttling(self):
+        with self._lock:
+            self._consecutive_errors += 1
+            if self._consecutive_errors >= self.threshold:
+                self._consecutive_errors = 0
+                self._open_until = self.clock() + self.pause_seconds
+                logging.warning("Throttled %s times in a row, pausing all downloads for %ss.", self.threshold,
+                                self.pause_seconds)
+
+
+class RetryingDownloader:
+    """Wraps a downloader with retries and a circuit breaker, see `RetryPolicy`.
+
+    Args:
+        download: Downloads the raw price data of a ticker, like `download_ticker_history`.
+        policy: How failed downloads are retried.
+        sleep: Waits for the given seconds, used for backoff and pauses.
+        clock: Returns the current time in seconds.
+    """
+    def __init__(self, download: Downloader, policy: RetryPolicy, sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        self.download = download
+        self.policy = policy
+        self.sleep = sleep
+        self.circuit_breaker = CircuitBreaker(policy.throttle_threshold, policy.throttle_pause_seconds,
+                                              clock=clock, sleep=sleep)
+
+    def __call__(self, ticker: str, start_date: Optional[str], end_date: Optional[str] = None) -> pd.DataFrame:
+        for attempt in range(1, self.policy.max_attempts + 1):
+            self.circuit_breaker.wait()
+            try:
+                ticker_history = self.download(ticker, start_date, end_date)
+            except Exception as error:
+                if is_throttling_error(error):
+                    self.circuit_breaker.record_throttling()
+                if not is_retryable_error(error):
+                    raise
+                if attempt == self.policy.max_attempts:
+                    raise DownloadError(f"Download of `{ticker}` failed {attempt} times.") from error
+                delay = self.policy.backoff(attempt)
+                logging.info("Download of `%s` failed (%s), retrying in %ss.", ticker, type(error).__name__, delay)
+                self.sleep(delay)
+            else:
+                self.circuit_breaker.record_success()
+                return ticker_history
@@ -0,0 +1,151 @@
+"""
+Sharded execution of `pull_data.main` on several processes or machines.
+
+The tickers are partitioned into shards by a stable hash of their symbol, hence every node assigns
+a ticker to the same shard without any coordination, as long as all nodes process the same tickers.
+Each shard writes a `ShardManifest` next to its ticker files when it completes. `merge_shards` combines
+the shard outputs into the ticker files and squeeze events of a single run over all tickers.
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, List, Set
+
+from q4_majorshortsqueezes.events import SqueezeEvent
+
+MANIFEST_FILE_PATTERN = ".shard_*_of_*.json"
+
+
+def shard_of(ticker: str, shard_count: int) -> int:
+    """Return the shard of a ticker. Unlike `hash`, the result is the same in every process."""
+    digest = hashlib.sha256(ticker.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def universe_digest(tickers: Iterable[str]) -> str:
+    """Return a digest of a set of tickers, to check that all shards partitioned the same tickers."""
+    return hashlib.sha256("\n".join(sorted(tickers)).encode()).hexdigest()
+
+
+@dataclass
+class Shard:
+    """One of `count` shards of the tickers, `index` is zero-based."""
+    index: int
+    count: int
+
+    def __post_init__(self):
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(f"Invalid shard {self.index} of {self.count}, the index must be in [0, {self.count}).")
+
+    @property
+    def manifest_file_name(self) -> str:
+        return f".shard_{self.index}_of_{self.count}.json"
+
+    def select(self, tickers: Iterable[str]) -> Set[str]:
+        """Return the tickers of this shard."""
+        return {ticker for ticker in tickers if shard_of(ticker, self.count) == self.index}
+
+
+@dataclass
+class ShardManifest:
+    """The partial result of a shard."""
+    shard_index: int
+    shard_count: int
+    # The digest of all tickers before they were partitioned, see `universe_digest`:
+    universe_digest: str
+    tickers: List[str]
+    # The tickers that satisfied all filter criteria:
+    satisfied: List[str]
+    # The squeeze events logged by the filters:
+    events: List[SqueezeEvent] = field(default_factory=list)
+
+    def save(self, dir_path: str):
+        """Persist the manifest atomically in the dir of the shard's ticker files."""
+        path = os.path.join(dir_path, Shard(self.shard_index, self.shard_count).manifest_file_name)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, mode="w") as fd:
+            json.dump(asdict(self), fd, indent=2)
+        os.replace(temp_path, path)
+
+    def updated(self, retry: "ShardManifest") -> "ShardManifest":
+        """Return this manifest with the results of a run that retried some of its tickers, e.g. failed ones.
+
+        The results of the retried tickers are replaced, the universe of the shard is kept.
+        """
+        retried = set(retry.tickers)
+        return ShardManifest(shard_index=self.shard_index,
+                             shard_count=self.shard_count,
+                             universe_digest=self.universe_digest,
+                             tickers=sorted(retried.union(self.tickers)),
+                             satisfied=sorted((set(self.satisfied) - retried).union(retry.satisfied)),
+                             events=sorted([event for event in self.events if event["Ticker"] not in retried]
+                                           + retry.events, key=lambda event: event["Ticker"]))
+
+    @classmethod
+    def load(cls, path: str) -> "ShardManifest":
+        with open(path) as fd:
+            return cls(**json.load(fd))
+
+
+def find_shard_manifests(dir_paths: List[str]) -> List[str]:
+    """Return the paths of the shard manifests in the given dirs."""
+    return sorted({path for dir_path in dir_paths
+                   for path in glob.glob(os.path.join(dir_path, MANIFEST_FILE_PATTERN))})
+
+
+def merge_shards(dir_paths: List[str], output_dir_path: str) -> ShardManifest:
+    """Combine the ticker files of the shards that wrote their manifests to the given dirs.
+
+    The ticker files of the satisfied tickers are copied to the output dir, unless a shard wrote them
+    there already. The events are ordered by ticker like the ones of a single run, which processes the
+    tickers in alphabetical order.
+
+    Args:
+        dir_paths: The output dirs of the shards. Shards may share an output dir.
+        output_dir_path: The dir to copy the ticker files to. It may be one of the shard output dirs.
+
+    Returns:
+        A manifest of all shards, as if a single shard had processed all tickers.
+
+    Raises:
+        ValueError: If shards are missing or duplicated or if they did not partition the same tickers.
+    """
+    manifest_paths = find_shard_manifests(dir_paths)
+    if not manifest_paths:
+        raise ValueError(f"No shard manifests found in: {', '.join(dir_paths)}")
+    manifests = [(os.path.dirname(path), ShardManifest.load(path)) for path in manifest_paths]
+
+    shard_count = manifests[0][1].shard_count
+    digest = manifests[0][1].universe_digest
+    if any(manifest.shard_count != shard_count for _, manifest in manifests):
+        raise ValueError("The shard manifests have different shard counts.")
+    if any(manifest.universe_digest != digest for _, manifest in manifests):
+        raise ValueError("The shards partitioned different tickers, e.g. since the listings changed between "
+                         "their runs.")
+    indices = sorted(manifest.shard_index for _, manifest in manifests)
+    if indices != list(range(shard_count)):
+        missing = sorted(set(range(shard_count)) - set(indices))
+        raise ValueError(f"Expected each of {shard_count} shards once, found shards {indices} "
+                         f"(missing: {missing}).")
+
+    os.makedirs(output_dir_path, exist_ok=True)
+    for dir_path, manifest in manifests:
+        for ticker in manifest.satisfied:
+            source_path = os.path.join(dir_path, f"{ticker}.csv")
+            target_path = os.path.join(output_dir_path, f"{ticker}.csv")
+            if not (os.path.exists(target_path) and os.path.samefile(source_path, target_path)):
+                shutil.copyfile(source_path, target_path)
+        logging.info("Merged shard %s of %s: %s of %s tickers satisfied all filters.", manifest.shard_index,
+                     shard_count, len(manifest.satisfied), len(manifest.tickers))
+
+    return ShardManifest(shard_index=0,
+                         shard_count=1,
+                         universe_digest=digest,
+                         tickers=sorted(ticker for _, manifest in manifests for ticker in manifest.tickers),
+                         satisfied=sorted(ticker for _, manifest in manifests for ticker in manifest.satisfied),
+                         events=sorted((event for _, manifest in manifests for event in manifest.events),
+                                       key=lambda event: event["Ticker"]))
@@ -0,0 +1,290 @@
+"""
+Orchestration of the short squeeze study of `results_1`.
+
+The study filters the tickers of each exchange and min market cap with each price filter.
+Since the min market cap universes of an exchange are nested, each ticker is loaded and filtered
+only once per exchange and the results of each min market cap are derived from the ticker's market cap.
+The study is split into steps with dependencies. Independent steps run in parallel on a process pool and
+each completed step is checkpointed in a manifest file, so that a study can be resumed after a crash.
+The study produces the files of `results_1/create_filtered_tickers.sh`, but not necessarily the same content:
+The script filtered the current listings of an exchange (`--<exchange> --min-market-cap`) and downloaded
+the tickers that were missing from its source dir. The study never looks up listings or downloads data, it
+filters only the ticker files that are already in the source dirs. Moreover, it reads each ticker from the
+source dir of the smallest min market cap that contains it, see `scan_exchange`.
+The produced files are:
+ - `<data_dir>/ticker_data__<identifier>/`: The price data of the tickers that satisfied a filter.
+ - `<data_dir>/<identifier>.log`: The log of a filter step.
+ - `<results_dir>/<identifier>.csv`: The squeeze events of a filter step.
+ - `<results_dir>/unfiltered_ticker_counts.csv`: The ticker counts of the unfiltered source dirs.
+The identifier is `<exchange>_min_<market cap>_multi_<multiplier>_days_<days>`.
+The source dirs `<data_dir>/ticker_data__<exchange>_min_<market cap>m` must exist.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from q4_majorshortsqueezes.api import pull_data
+from q4_majorshortsqueezes.events import read_events_from_log, write_events_csv
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, Ticker
+
+EXCHANGES = ["nyse", "nasdaq", "amex"]
+MARKET_CAPS = [1000, 100, 10]
+MULTIPLIERS = [2, 3, 5]
+DAYS = [5, 10]
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+@dataclass
+class Step:
+    """A unit of work of the study. `func(*args)` must be picklable to run it in another process."""
+    step_id: str
+    func: Callable[..., None]
+    args: tuple
+    dependencies: List[str] = field(default_factory=list)
+
+
+class StudyManifest:
+    """Tracks the completed steps of a study in a JSON file.
+
+    Args:
+        path: The manifest file. It is created if it does not exist.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.completed: Dict[str, float] = {}
+        if os.path.exists(path):
+            with open(path) as fd:
+                self.completed = json.load(fd)["completed"]
+
+    def mark_completed(self, step_id: str):
+        """Record the step as completed and persist the manifest atomically."""
+        self.completed[step_id] = time.time()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, mode="w") as fd:
+            json.dump({"completed": self.completed}, fd, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def identifier(exchange: str, market_cap: int, multiplier: int, days: int) -> str:
+    return f"{exchange}_min_{market_cap}_multi_{multiplier}_days_{days}"
+
+
+def parse_identifier(step_identifier: str) -> Tuple[str, int, int, int]:
+    """Return the exchange, min market cap, multiplier and days of an identifier, the inverse of `identifier`.
+
+    Raises:
+        ValueError: If the identifier has another format.
+    """
+    tokens = step_identifier.split("_")
+    if len(tokens) != 7 or tokens[1::2] != ["min", "multi", "days"]:
+        raise ValueError(f"`{step_identifier}` is not a study identifier.")
+    return tokens[0], int(tokens[2]), int(tokens[4]), int(tokens[6])
+
+
+def source_dir_path(data_dir: str, exchange: str, market_cap: int) -> str:
+    return os.path.join(data_dir, f"ticker_data__{exchange}_min_{market_cap}m")
+
+
+def write_unfiltered_ticker_counts(data_dir: str, results_dir: str,
+                                   exchanges: List[str], market_caps: List[int]):
+    """Write the ticker counts of the source dirs to `unfiltered_ticker_counts.csv`."""
+    with open(os.path.join(results_dir, "unfiltered_ticker_counts.csv"), mode="w") as fd:
+        fd.write("Exchange,Min Marketcap,Ticket Count\n")
+        for exchange in exchanges:
+            for market_cap in market_caps:
+                source_dir = source_dir_path(data_dir, exchange, market_cap)
+                ticker_count = len(FileBackedTicketContainer(source_dir).get_tickers())
+                fd.write(f"{exchange},{market_cap},{ticker_count}\n")
+
+
+def market_cap_buckets(data_dir: str, exchange: str, market_caps: List[int]) -> Dict[str, List[int]]:
+    """Return the min market caps of the source dirs that contain each ticker, in ascending order.
+
+    The universes of the source dirs are nested: Each ticker of a larger min market cap is contained in
+    the source dirs of all smaller min market caps, too. Violations are logged as warnings.
+    """
+    buckets: Dict[str, List[int]] = {}
+    for market_cap in sorted(market_caps):
+        for ticker in FileBackedTicketContainer(source_dir_path(data_dir, exchange, market_cap)).get_tickers():
+            buckets.setdefault(ticker, []).append(market_cap)
+
+    for ticker, ticker_market_caps in buckets.items():
+        expected_market_caps = [market_cap for market_cap in sorted(market_caps)
+                                if market_cap <= ticker_market_caps[-1]]
+        if ticker_market_caps != expected_market_caps:
+            logging.warning("The market cap dirs of `%s` are not nested: %s", ticker, ticker_market_caps)
+    return buckets
+
+
+def scan_exchange(data_dir: str, exchange: str, market_caps: List[int], multipliers: List[int], days: List[int],
+                  blob_dir: Optional[str] = None):
+    """Filter the tickers of an exchange for all min market caps and write the satisfying tickers and the step logs.
+
+    Each ticker is loaded and evaluated only once, from the source dir of the smallest min market cap that
+    contains it. Its market cap is the largest min market cap whose source dir contains it. The ticker's results
+    are written to the outputs of all min market caps up to its market cap, as if each min market cap had been
+    filtered on its own.
+    If `blob_dir` is set, the stored ticker files are hard links into this `BlobStore`, hence each ticker's data
+    is written and stored only once instead of once per output dir.
+    """
+    buckets = market_cap_buckets(data_dir, exchange, market_caps)
+    read_containers = {market_cap: FileBackedTicketContainer(source_dir_path(data_dir, exchange, market_cap))
+                       for market_cap in market_caps}
+    criteria = {(multiplier, day_count): pull_data.import_criterion_functions(
+                    [f"q4_majorshortsqueezes.filter/price_multi_{multiplier}_within_{day_count}_days"])[0]
+                for multiplier in multipliers for day_count in days}
+
+    output_containers: Dict[Tuple[int, int, int], FileBackedTicketContainer] = {}
+    log_handlers: Dict[Tuple[int, int, int], logging.Handler] = {}
+    for market_cap in market_caps:
+        for multiplier, day_count in criteria:
+            step_identifier = identifier(exchange, market_cap, multiplier, day_count)
+            output_dir = os.path.join(data_dir, f"ticker_data__{step_identifier}")
+            os.makedirs(output_dir, exist_ok=True)
+            output_containers[(market_cap, multiplier, day_count)] = FileBackedTicketContainer(
+                output_dir, blob_store_path=blob_dir)
+            log_handlers[(market_cap, multiplier, day_count)] = logging.FileHandler(
+                os.path.join(data_dir, f"{step_identifier}.log"), mode="w")
+            log_handlers[(market_cap, multiplier, day_count)].setFormatter(logging.Formatter(LOG_FORMAT))
+
+    collector = _RecordCollector()
+    try:
+        with _route_logs(collector):
+            for i, (ticker, ticker_market_caps) in enumerate(sorted(buckets.items()), start=1):
+                ticker_buckets = [market_cap for market_cap in market_caps if market_cap <= ticker_market_caps[-1]]
+                try:
+                    logging.info("%s. Looking up `%s` with min market cap %sm", i, ticker, ticker_market_caps[-1])
+                    ticker_history = read_containers[ticker_market_caps[0]][ticker]
+                    ticker_object = Ticker(ticker, ticker_history, market_cap=ticker_market_caps[-1])
+                    _emit(collector, [log_handlers[(market_cap, *key)]
+                                      for market_cap in ticker_buckets for key in criteria])
+
+                    for (multiplier, day_count), criterion in criteria.items():
+                        satisfied = criterion(ticker_object)
+                        if satisfied:
+                            for market_cap in ticker_buckets:
+                                output_containers[(market_cap, multiplier, day_count)].store_ticker(
+                                    ticker, ticker_history)
+                        _emit(collector, [log_handlers[(market_cap, multiplier, day_count)]
+                                          for market_cap in ticker_buckets])
+                except ValueError:
+                    logging.exception("%s. Ticker `%s` failed.", i, ticker)
+                    _emit(collector, [log_handlers[(market_cap, *key)]
+                                      for market_cap in ticker_buckets for key in criteria])
+    finally:
+        for handler in log_handlers.values():
+            handler.close()
+        for container in [*read_containers.values(), *output_containers.values()]:
+            container.flush()
+
+
+def write_result_csv(data_dir: str, results_dir: str, step_identifier: str):
+    """Extract the squeeze events of a filter step from its log and write them to the result csv."""
+    with open(os.path.join(data_dir, f"{step_identifier}.log")) as fd:
+        events = read_events_from_log(fd)
+    with open(os.path.join(results_dir, f"{step_identifier}.csv"), mode="w", newline="") as fd:
+        write_events_csv(events, fd)
+
+
+class _RecordCollector(logging.Handler):
+    """Keeps the log records it handles until they are emitted to their final handlers."""
+    def __init__(self):
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+def _emit(collector: _RecordCollector, handlers: List[logging.Handler]):
+    """Pass the collected log records to the given handlers and clear the collector."""
+    for record in collector.records:
+        for handler in handlers:
+            handler.handle(record)
+    collector.records.clear()
+
+
+@contextmanager
+def _route_logs(handler: logging.Handler) -> Iterator[None]:
+    """Route all log records of the current process to the handler while the context is active."""
+    root = logging.getLogger()
+    previous_handlers, previous_level = root.handlers[:], root.level
+    root.handlers = [handler]
+    root.setLevel(logging.DEBUG)
+    try:
+        yield
+    finally:
+        root.handlers = previous_handlers
+        root.setLevel(previous_level)
+
+
+def build_study_steps(data_dir: str, results_dir: str,
+                      exchanges: List[str] = EXCHANGES, market_caps: List[int] = MARKET_CAPS,
+                      multipliers: List[int] = MULTIPLIERS, days: List[int] = DAYS,
+                      blob_dir: Optional[str] = None) -> List[Step]:
+    """Create the steps of the study and their dependencies. See `scan_exchange` for `blob_dir`."""
+    steps = [Step("counts", write_unfiltered_ticker_counts, (data_dir, results_dir, exchanges, market_caps))]
+    for exchange in exchanges:
+        steps.append(Step(f"scan:{exchange}", scan_exchange,
+                          (data_dir, exchange, market_caps, multipliers, days, blob_dir)))
+        for market_cap in market_caps:
+            for multiplier in multipliers:
+                for day_count in days:
+                    step_identifier = identifier(exchange, market_cap, multiplier, day_count)
+                    steps.append(Step(f"csv:{step_identifier}", write_result_csv,
+                                      (data_dir, results_dir, step_identifier),
+                                      dependencies=[f"scan:{exchange}"]))
+    return steps
+
+
+def run_steps(steps: List[Step], manifest: StudyManifest, max_workers: Optional[int] = None):
+    """Run all steps that are not completed yet on a process pool, respecting their dependencies.
+
+    A failing step does not stop independent steps. Steps that depend on a failed step are skipped.
+
+    Args:
+        steps: The steps to run.
+        manifest: The manifest of completed steps. Completed steps are skipped and
+                  each newly completed step is recorded.
+        max_workers: The amount of worker processes. Defaults to the amount of CPUs.
+
+    Raises:
+        RuntimeError: If any step failed.
+    """
+    pending = {step.step_id: step for step in steps if step.step_id not in manifest.completed}
+    logging.info("%s of %s steps are already completed.", len(steps) - len(pending), len(steps))
+    failed: Set[str] = set()
+    running: Dict[Future, Step] = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for step in list(pending.values()):
+                if any(dependency in failed for dependency in step.dependencies):
+                    logging.error("Skipping step `%s`, since a dependency failed.", step.step_id)
+                    failed.add(pending.pop(step.step_id).step_id)
+                elif all(dependency in manifest.completed for dependency in step.dependencies):
+                    logging.info("Starting step `%s`.", step.step_id)
+                    running[pool.submit(step.func, *step.args)] = pending.pop(step.step_id)
+
+            if not running:
+                if pending:
+                    raise RuntimeError(f"Steps with unknown dependencies: {', '.join(sorted(pending))}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                if future.exception():
+                    logging.error("Step `%s` failed.", step.step_id, exc_info=future.exception())
+                    failed.add(step.step_id)
+                else:
+                    logging.info("Completed step `%s`.", step.step_id)
+                    manifest.mark_completed(step.step_id)
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} steps failed: {', '.join(sorted(failed))}")
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import threading
+import numpy as np
+import pandas as pd
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class TickerSummary:
+    """Cheap summary statistics of the `Adj Close` prices of a stored ticker history.
+
+    `max_running_ratio` is the maximum ratio between a price and the lowest price of all
+    previous days. No window of consecutive days can show a higher increase, hence filters
+    can use it to rule out tickers without loading their history.
+    """
+    row_count: int
+    min: float
+    max: float
+    max_running_ratio: float
+    last_date: str
+    # The file state the summary was computed for, to detect outdated summaries:
+    file_size: int
+    file_mtime_ns: int
+
+
+def summarize_ticker_history(ticker_history: pd.DataFrame, file_path: str) -> TickerSummary:
+    """Compute the summary of a ticker history that is stored in the given file."""
+    adj_close = ticker_history["Adj Close"].to_numpy(dtype=float)
+    stat = os.stat(file_path)
+
+    if len(adj_close) < 2 or np.nanmin(adj_close) <= 0:
+        # Non-positive prices make ratios meaningless, such tickers can never be ruled out.
+        max_running_ratio = float("inf")
+    else:
+        prior_min = np.fmin.accumulate(adj_close)[:-1]
+        with np.errstate(invalid="ignore"):
+            max_running_ratio = float(np.nanmax(adj_close[1:] / prior_min, initial=0.0))
+
+    return TickerSummary(row_count=len(adj_close),
+                         min=float(np.nanmin(adj_close)) if len(adj_close) else float("nan"),
+                         max=float(np.nanmax(adj_close)) if len(adj_close) else float("nan"),
+                         max_running_ratio=max_running_ratio,
+                         last_date=str(ticker_history.index[-1]) if len(adj_close) else "",
+                         file_size=stat.st_size,
+                         file_mtime_ns=stat.st_mtime_ns)
+
+
+class TickerSidecarIndex:
+    """A sidecar file next to stored ticker histories that keeps a record per ticker.
+
+    Records are dataclasses with the fields `file_size` and `file_mtime_ns` of the file state they were
+    computed for. They are only returned as long as the ticker's file has not changed since.
+    Changes are kept in memory until `save` is called. The index may be shared by threads, e.g. the loader
+    threads of `get_data` and a background writer.
+
+    Args:
+        dir_path: The directory of the ticker history files.
+    """
+    FILE_NAME: str
+    RECORD_TYPE: type
+    DESCRIPTION: str
+
+    def __init__(self, dir_path: str):
+        self.path = os.path.join(dir_path, self.FILE_NAME)
+        self._records: Optional[Dict[str, Any]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        """Return the records, which are read from the sidecar file on first use. The caller holds the lock."""
+        if self._records is None:
+            self._records = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path) as fd:
+                        self._records = {ticker: self.RECORD_TYPE(**record)
+                                         for ticker, record in json.load(fd).items()}
+                except (ValueError, TypeError):
+                    logging.warning("Ignoring corrupt %s `%s`.", self.DESCRIPTION, self.path)
+        return self._records
+
+    def get(self, ticker: str, file_path: str) -> Optional[Any]:
+        """Return the record of the ticker stored in `file_path` or `None` if there is no up-to-date one."""
+        with self._lock:
+            record = self._load().get(ticker)
+        if record is None:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (record.file_size, record.file_mtime_ns):
+            return None
+        return record
+
+    def put(self, ticker: str, record: Any):
+        """Remember the record of the ticker."""
+        with self._lock:
+            self._load()[ticker] = record
+            self._dirty = True
+
+    def save(self):
+        """Write all changes to the sidecar file."""
+        with self._lock:
+            if not self._dirty:
+                return
+            temp_path = f"{self.path}.tmp"
+            try:
+                with open(temp_path, mode="w") as fd:
+                    json.dump({ticker: asdict(record) for ticker, record in sorted(self._records.items())}, fd)
+                os.replace(temp_path, self.path)
+                self._dirty = False
+            except OSError:
+                logging.warning("Failed to write %s `%s`.", self.DESCRIPTION, self.path, exc_info=True)
+
+
+class TickerSummaryIndex(TickerSidecarIndex):
+    """A sidecar file next to stored ticker histories that keeps a summary per ticker, see `TickerSidecarIndex`."""
+    FILE_NAME = ".ticker_summaries.json"
+    RECORD_TYPE = TickerSummary
+    DESCRIPTION = "ticker summary index"
+
+    def get(self, ticker: str, file_path: str) -> Optional[TickerSummary]:
+        """Return the summary of the ticker stored in `file_path` or `None` if there is no up-to-date one."""
+        return super().get(ticker, file_path)
+
+    def update(self, ticker: str, file_path: str, ticker_history: pd.DataFrame):
+        """Compute and remember the summary of the ticker history that is stored in `file_path`."""
+        self.put(ticker, summarize_ticker_history(ticker_history, file_path))
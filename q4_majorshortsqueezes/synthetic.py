@@ -0,0 +1,259 @@
+"""
+Deterministic synthetic ticker histories for scale tests and benchmarks.
+
+The histories are random walks in the frame layout of `load_ticker_history` and are stored with
+`store_ticker_to_csv`, hence they can be used wherever real ticker files are used, but offline and
+for universes of any size. The same seed always yields the same histories.
+
+Three kinds of events are injected and recorded as `GroundTruth` of each ticker:
+ - Squeezes: The `Adj Close` rises by a known multiplier within `squeeze_days` trading days and decays
+   afterwards. The daily volatility of the random walk is far too low to double the price within a few
+   weeks, hence the injected squeezes are the only ones the price filters can find.
+ - Gaps: `GAP_BUSINESS_DAYS` business days without rows, like a trading halt.
+ - Bad rows: Rows with zero, missing or negative prices, see `quality.py`.
+"""
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.ticker import store_ticker_to_csv, TickerHistory
+
+GAP_BUSINESS_DAYS = 10
+BAD_ROW_KINDS = ["zero", "missing", "negative"]
+GROUND_TRUTH_FILE_NAME = ".synthetic_ground_truth.json"
+# The largest window of the price filters the ground truth can answer for, see `GroundTruth.has_squeeze`
+MAX_WINDOW_DAYS = 20
+
+
+@dataclass
+class SyntheticMarketConfig:
+    """The shape of the generated histories and how often events are injected.
+
+    Args:
+        rows: The amount of trading days of each history.
+        start_date: The first date of each history, formatted YYYY-MM-DD.
+        volatility: The standard deviation of the daily log returns.
+        squeeze_probability: The probability of a ticker to have a squeeze.
+        squeeze_multipliers: The range the multiplier of a squeeze is drawn from.
+        squeeze_days: The amount of trading days from the start to the peak of a squeeze.
+        gap_probability: The probability of a ticker to have a gap.
+        bad_row_probability: The probability of a ticker to have a bad row.
+    """
+    rows: int = 250
+    start_date: str = "2000-01-03"
+    volatility: float = 0.02
+    squeeze_probability: float = 0.05
+    # The daily rise of the largest squeeze stays far below the smallest split ratio of `quality.py`,
+    # so that squeezes are never mistaken for split artifacts.
+    squeeze_multipliers: Tuple[float, float] = (2.5, 8.0)
+    squeeze_days: int = 5
+    gap_probability: float = 0.05
+    bad_row_probability: float = 0.05
+
+
+@dataclass
+class SqueezeEpisode:
+    """An injected squeeze: The `Adj Close` rose by `multiplier` from `start_date` to `peak_date`."""
+    start_date: str
+    peak_date: str
+    multiplier: float
+    # The amount of trading days from the start to the peak:
+    days: int
+
+
+@dataclass
+class GroundTruth:
+    """The events injected into a synthetic ticker history."""
+    ticker: str
+    squeezes: List[SqueezeEpisode] = field(default_factory=list)
+    # The dates of the bad rows:
+    bad_dates: List[str] = field(default_factory=list)
+    # The first date after each gap:
+    gap_dates: List[str] = field(default_factory=list)
+    # The largest multiple of an `Adj Close` and the lowest one of the previous `days` rows,
+    # for each window of 1 to `MAX_WINDOW_DAYS` days:
+    max_multiples: List[float] = field(default_factory=list)
+
+    def has_squeeze(self, multiplier: float, days: int) -> bool:
+        """Whether the price filter `multiply_price_within_x_days(multiplier, days)` must find a squeeze.
+
+        Besides the injected squeezes, the random walk and the bad rows may rise by small multipliers.
+        """
+        if not 1 <= days <= len(self.max_multiples):
+            raise ValueError(f"The ground truth only covers windows of 1 to {len(self.max_multiples)} days.")
+        return self.max_multiples[days - 1] >= multiplier
+
+
+def _place_events(rng: np.random.Generator, rows: int, extents: List[int]) -> List[int]:
+    """Return a start row per event, such that the events do not overlap.
+
+    The rows are split into a segment per event and each event is placed at random within its segment.
+    """
+    if not extents:
+        return []
+    segment = rows // len(extents)
+    if segment < max(extents):
+        raise ValueError(f"{rows} rows are too few for {len(extents)} events of up to {max(extents)} rows.")
+    return [int(position * segment + rng.integers(0, segment - extent + 1))
+            for extent, position in zip(extents, rng.permutation(len(extents)))]
+
+
+def _max_window_multiples(adj_close: np.ndarray, max_days: int) -> List[float]:
+    """Return the largest `window_multiples` of the `Adj Close` for each window of 1 to `max_days` rows.
+
+    The windows are computed incrementally: The window of `days` previous rows is the one of `days - 1`
+    rows and the row `days` rows before. Like the rolling minimum of the filters, it ignores missing prices.
+    """
+    prior_min = np.full(len(adj_close), np.nan)
+    max_multiples = []
+    for days in range(1, max_days + 1):
+        prior_min[days:] = np.fmin(prior_min[days:], adj_close[:len(adj_close) - days])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            multiples = adj_close / prior_min
+        multiples = multiples[(prior_min != 0) & ~np.isnan(multiples)]
+        max_multiples.append(float(multiples.max()) if multiples.size else 0.0)
+    return max_multiples
+
+
+def generate_ticker_history(ticker: str, seed: int = 0, config: Optional[SyntheticMarketConfig] = None,
+                            squeezes: int = 0, gaps: int = 0, bad_rows: int = 0) -> Tuple[TickerHistory, GroundTruth]:
+    """Create a random walk price history with the given events.
+
+    Args:
+        ticker: The ticker symbol of the ground truth.
+        seed: Seed of the random number generator. The same seed always yields the same history.
+        config: The shape of the history. Defaults to `SyntheticMarketConfig()`.
+        squeezes: The amount of squeezes to inject.
+        gaps: The amount of gaps to inject.
+        bad_rows: The amount of bad rows to inject.
+
+    Returns:
+        A Panda's data frame representing the price history of a ticker and its injected events.
+    """
+    config = config or SyntheticMarketConfig()
+    rng = np.random.default_rng(seed)
+    rows, days = config.rows, config.squeeze_days
+    log_returns = rng.normal(0, config.volatility, rows)
+    log_returns[0] = 0.0
+    volume = rng.integers(1_000, 10_000_000, rows)
+
+    # A squeeze spans the window before its start, the rise and a decay three times as long as the rise.
+    # A bad row spans the windows it is part of.
+    kinds = ["squeeze"] * squeezes + ["gap"] * gaps + ["bad_row"] * bad_rows
+    extents = [{"squeeze": 5 * days + 1, "gap": 2, "bad_row": days + 1}[kind] for kind in kinds]
+    starts = _place_events(rng, rows, extents)
+
+    squeeze_rows = []
+    for kind, start in zip(kinds, starts):
+        if kind == "squeeze":
+            low, peak = start + days, start + 2 * days
+            rise = np.log(rng.uniform(*config.squeeze_multipliers))
+            log_returns[low + 1:peak + 1] = rise / days
+            log_returns[peak + 1:peak + 1 + 3 * days] += -rise / (3 * days)
+            volume[low + 1:peak + 1] *= 10
+            squeeze_rows.append((low, peak))
+
+    close = 10 * np.exp(np.cumsum(log_returns))
+    # Days open close to the previous close, hence a squeeze has a wide intraday range like a real one
+    open_ = np.append(close[0], close[:-1]) * np.exp(rng.normal(0, 0.005, rows))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, rows))
+    low_ = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, rows))
+    prices = {"Open": open_, "High": high, "Low": low_, "Close": close, "Adj Close": close.copy()}
+
+    bad_row_kinds = rng.choice(BAD_ROW_KINDS, size=bad_rows)
+    bad_row_starts = [start for kind, start in zip(kinds, starts) if kind == "bad_row"]
+    for kind, row in zip(bad_row_kinds, bad_row_starts):
+        if kind == "zero":
+            for column in prices:
+                prices[column][row] = 0.0
+        elif kind == "missing":
+            for column in prices:
+                prices[column][row] = np.nan
+        else:
+            prices["Close"][row] = prices["Adj Close"][row] = -prices["Close"][row]
+
+    # Each gap skips business days before its row
+    gap_rows = sorted(start + 1 for kind, start in zip(kinds, starts) if kind == "gap")
+    offsets = np.arange(rows)
+    for row in gap_rows:
+        offsets[row:] += GAP_BUSINESS_DAYS
+    dates = np.busday_offset(np.datetime64(config.start_date, "D"), offsets, roll="forward")
+    date_strings = dates.astype(str).tolist()
+
+    ticker_history = pd.DataFrame({
+        **prices,
+        "Volume": volume,
+        "date_id": (dates - dates[0]).astype(int) + 1,
+        "OC_High": np.fmax(prices["Open"], prices["Close"]),
+        "OC_Low": np.fmin(prices["Open"], prices["Close"]),
+    }, index=pd.Index(date_strings, name="Date"))
+
+    adj_close = ticker_history["Adj Close"].to_numpy()
+    ground_truth = GroundTruth(
+        ticker=ticker,
+        squeezes=[SqueezeEpisode(start_date=date_strings[low], peak_date=date_strings[peak],
+                                 multiplier=float(adj_close[peak] / adj_close[low]), days=days)
+                  for low, peak in sorted(squeeze_rows)],
+        bad_dates=sorted(date_strings[row] for row in bad_row_starts),
+        gap_dates=[date_strings[row] for row in gap_rows],
+        max_multiples=_max_window_multiples(adj_close, MAX_WINDOW_DAYS))
+    return ticker_history, ground_truth
+
+
+def generate_market(ticker_count: int, config: Optional[SyntheticMarketConfig] = None, seed: int = 0) \
+        -> Iterator[Tuple[TickerHistory, GroundTruth]]:
+    """Generate the histories of a universe of tickers named `T00000`, `T00001`, etc.
+
+    Each ticker has at most one event of each kind, drawn with the probabilities of the config.
+    A ticker's history only depends on the seed and its position, hence a larger universe with the
+    same seed starts with the same tickers.
+
+    Args:
+        ticker_count: The amount of tickers.
+        config: The shape of the histories. Defaults to `SyntheticMarketConfig()`.
+        seed: Seed of the random number generator.
+
+    Yields:
+        The history and the injected events of each ticker.
+    """
+    config = config or SyntheticMarketConfig()
+    for i in range(ticker_count):
+        rng = np.random.default_rng([seed, i])
+        squeezes, gaps, bad_rows = (int(draw) for draw in rng.random(3) < [config.squeeze_probability,
+                                                                           config.gap_probability,
+                                                                           config.bad_row_probability])
+        yield generate_ticker_history(f"T{i:05d}", seed=rng.integers(2 ** 32), config=config,
+                                      squeezes=squeezes, gaps=gaps, bad_rows=bad_rows)
+
+
+def write_market(dir_path: str, ticker_count: int, config: Optional[SyntheticMarketConfig] = None,
+                 seed: int = 0) -> Dict[str, GroundTruth]:
+    """Store the histories of `generate_market` as `<ticker>.csv` files and their ground truth in the dir.
+
+    Returns:
+        The ground truth per ticker, which is also stored in a `.synthetic_ground_truth.json` file.
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    ground_truths = {}
+    for ticker_history, ground_truth in generate_market(ticker_count, config, seed):
+        store_ticker_to_csv(ticker_history, os.path.join(dir_path, f"{ground_truth.ticker}.csv"))
+        ground_truths[ground_truth.ticker] = ground_truth
+    with open(os.path.join(dir_path, GROUND_TRUTH_FILE_NAME), mode="w") as fd:
+        json.dump({ticker: asdict(ground_truth) for ticker, ground_truth in ground_truths.items()}, fd, indent=2)
+    return ground_truths
+
+
+def load_ground_truth(dir_path: str) -> Dict[str, GroundTruth]:
+    """Load the ground truth of a dir written by `write_market`."""
+    with open(os.path.join(dir_path, GROUND_TRUTH_FILE_NAME)) as fd:
+        content = json.load(fd)
+    return {ticker: GroundTruth(ticker=ticker,
+                                squeezes=[SqueezeEpisode(**squeeze) for squeeze in entry["squeezes"]],
+                                bad_dates=entry["bad_dates"],
+                                gap_dates=entry["gap_dates"],
+                                max_multiples=entry["max_multiples"])
+            for ticker, entry in content.items()}
@@ -2,13 +2,24 @@ import abc
 import glob
 import io
 import os
+import queue
+import threading
+import numpy as np
 import pandas as pd
 import yfinance as yf
-from dataclasses import dataclass
+from yfinance import shared as yf_shared
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Set, Union
+from typing import Any, BinaryIO, Callable, Dict, Hashable, List, Optional, Set, Union
 
 from q4_majorshortsqueezes import get_tickers_fixed as gt
+from q4_majorshortsqueezes.blobs import BlobStore
+from q4_majorshortsqueezes.metrics import Metrics, NULL_METRICS
+from q4_majorshortsqueezes.planner import CriterionPlanner
+from q4_majorshortsqueezes.quality import check_ticker_history, PRICE_COLUMNS, QUALITY_MODES, QualityIndex
+from q4_majorshortsqueezes.retry import TransientDownloadError
+from q4_majorshortsqueezes.summary import TickerSummary, TickerSummaryIndex
 
 
 """
@@ -17,25 +28,105 @@ Date, Open, High, Low, Close, Adj Close, Volume, date_id, OC-High, OC-Low
 """
 TickerHistory = pd.DataFrame
 
+# The column types of stored ticker histories, see `load_ticker_history_from_csv`.
+# They are dtype objects, since pandas resolves type names on every parse.
+TICKER_HISTORY_DTYPES = {
+    "Open": np.dtype("float64"),
+    "High": np.dtype("float64"),
+    "Low": np.dtype("float64"),
+    "Close": np.dtype("float64"),
+    "Adj Close": np.dtype("float64"),
+    "Volume": np.dtype("int64"),
+    "date_id": np.dtype("int64"),
+    "OC_High": np.dtype("float64"),
+    "OC_Low": np.dtype("float64"),
+}
+
+# Parts of the errors that yfinance records for failed requests, which are worth a retry
+NETWORK_ERROR_MARKERS = ("ConnectionError", "Connection reset", "Timeout", "timed out")
+
 
 @dataclass
 class Ticker:
     symbol: str
     history: TickerHistory
+    # The largest min market cap bucket (in million USD) the ticker belongs to, if known.
+    market_cap: Optional[int] = None
+    _shared: Dict[Hashable, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    def shared(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return a value derived from the ticker's history that is computed only once.
+
+        All criteria evaluated on the same ticker object share these values, e.g.
+        column arrays or rolling minima, instead of each criterion scanning the frame again.
+
+        Args:
+            key: Identifies the derived value, e.g. `("values", "Adj Close")`.
+            compute: Computes the value if it has not been computed before.
+
+        Returns:
+            The derived value.
+        """
+        if key not in self._shared:
+            self._shared[key] = compute()
+        return self._shared[key]
+
+    def values(self, column: str) -> np.ndarray:
+        """Return a history column as shared NumPy array."""
+        return self.shared(("values", column), lambda: self.history[column].to_numpy())
+
+    def dates(self) -> np.ndarray:
+        """Return the dates of the history as shared NumPy array."""
+        return self.shared(("dates",), lambda: self.history.index.to_numpy())
 
 
 class TickerContainer(abc.ABC):
-    """Base class for containers that store historical ticker data."""
-    def __init__(self):
-        self._criteria: List[Callable[[Ticker], bool]] = []
+    """Base class for containers that store historical ticker data.
+
+    Args:
+        metrics: Collects the timings of criteria and storage operations.
+                 If `None` is given, no measurements are taken.
+    """
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics or NULL_METRICS
+        self._planner = CriterionPlanner(metrics=self.metrics)
+
+    def add_criterion(self, criterion: Callable[[Ticker], bool], name: Optional[str] = None,
+                      cost: Optional[float] = None, selectivity: Optional[float] = None):
+        """Add a criterion that tickers must satisfy to be stored.
 
-    def add_criterion(self, criterion: Callable[[Ticker], bool]):
-        self._criteria.append(criterion)
+        Criteria are not evaluated in the order they are added, but cheap and highly
+        selective criteria are evaluated first, see `CriterionPlanner`.
 
-    def store_ticker(self, symbol: str, ticker_history: TickerHistory):
-        ticker = Ticker(symbol, ticker_history)
-        if all(criterion(ticker) for criterion in self._criteria):
+        Args:
+            criterion: The criterion function.
+            name: The name used to report the criterion, e.g. in metrics.
+                  Defaults to the function name.
+            cost: Estimated evaluation time per ticker in seconds. Learned from evaluations if `None`.
+            selectivity: Estimated fraction of tickers that satisfy the criterion.
+                         Learned from evaluations if `None`.
+        """
+        self._planner.add(name or getattr(criterion, "__name__", repr(criterion)), criterion,
+                          cost=cost, selectivity=selectivity)
+
+    def store_ticker(self, symbol: str, ticker_history: TickerHistory) -> bool:
+        """Store a ticker if it satisfies all criteria of the container and return whether it was stored."""
+        if not self.satisfies_criteria(Ticker(symbol, ticker_history)):
+            return False
+        self.add_ticker(symbol, ticker_history)
+        return True
+
+    def satisfies_criteria(self, ticker: Ticker) -> bool:
+        """Return whether the ticker satisfies all criteria of the container."""
+        if self.metrics.enabled:
+            self.metrics.increment("rows_evaluated", len(ticker.history))
+        return self._planner.evaluate(ticker)
+
+    def add_ticker(self, symbol: str, ticker_history: TickerHistory):
+        """Store a ticker without checking the criteria, e.g. after `satisfies_criteria` was checked separately."""
+        with self.metrics.stage("write"):
             self._add_ticker_data(symbol, ticker_history)
+        self.metrics.increment("tickers_stored")
 
     @abc.abstractmethod
     def _add_ticker_data(self, ticker: str, ticker_history: TickerHistory):
@@ -61,14 +152,22 @@ class TickerContainer(abc.ABC):
     def get_tickers(self) -> List[str]:
         pass
 
+    def flush(self):
+        """Persist all pending changes of the container."""
+        pass
+
+    def close(self):
+        """Persist all pending changes and release the resources of the container."""
+        self.flush()
+
 
 class InMemoryTickerContainer(TickerContainer):
     """A container to store historical ticker data.
 
     The container only store tickers that meet all of the added criteria.
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, metrics: Optional[Metrics] = None):
+        super().__init__(metrics)
         self.__stored_tickers: Dict[str, TickerHistory] = {}
 
     def _add_ticker_data(self, ticker: str, ticker_history: TickerHistory):
@@ -88,50 +187,293 @@ class FileBackedTicketContainer(TickerContainer):
     """A ticket container that does not keep the data in memory but on the file system.
 
     If ticker data is already present, it will also have access to them.
+    The container maintains a summary index (`TickerSummaryIndex`) next to the ticker files,
+    which is written when calling `flush`.
+    Files are written atomically: They are written to a temporary file first, which then replaces
+    the ticker file. Hence, a crash never leaves half-written ticker files behind.
+
+    Args:
+        ticker_data_dir_path: The directory of the ticker files.
+        metrics: Collects the timings of criteria and storage operations.
+        write_behind: If `True`, tickers are written by a background thread, while the caller continues.
+                      Stored tickers are readable from memory until their file is written.
+                      Call `flush` or `close` to wait until all files are written.
+                      The writer writes one ticker at a time, batching was dropped on purpose: The summary and
+                      quality indexes are only updated in memory per ticker and written once by `flush`, hence
+                      batches would not save any index writes.
+        csv_engine: The csv parser used to load ticker files, see `load_ticker_history_from_csv`.
+        start_date: Only load the days of stored tickers from this date on, formatted YYYY-MM-DD.
+        end_date: Only load the days of stored tickers up to this date (inclusive), formatted YYYY-MM-DD.
+                  Summaries are only computed from tickers that are loaded without date bounds.
+        blob_store_path: If set, ticker files are hard links into this content-addressed `BlobStore`,
+                         so that identical ticker histories of several containers are stored only once.
+        quality: If set, loaded histories are validated in this mode, `flag` or `repair`, see `quality.py`.
+                 The quality reports of complete histories are kept in a `QualityIndex` next to the ticker files,
+                 so that clean tickers are not validated again.
+        save_indexes: If `False`, the summary and quality indexes are only kept in memory and never written
+                      to the directory, e.g. for directories that are only read.
     """
-    def __init__(self, ticker_data_dir_path: str):
-        super().__init__()
+    def __init__(self, ticker_data_dir_path: str, metrics: Optional[Metrics] = None,
+                 write_behind: bool = False, csv_engine: Optional[str] = None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 blob_store_path: Optional[str] = None, quality: Optional[str] = None, save_indexes: bool = True):
+        super().__init__(metrics)
         self.ticker_data_dir_path = ticker_data_dir_path
+        self.csv_engine = csv_engine
+        self.start_date = start_date
+        self.end_date = end_date
+        self._summary_index = TickerSummaryIndex(ticker_data_dir_path)
+        self._blob_store = BlobStore(blob_store_path) if blob_store_path else None
+        if quality is not None and quality not in QUALITY_MODES:
+            raise ValueError(f"Unknown quality mode `{quality}`, valid modes are: {', '.join(QUALITY_MODES)}")
+        self.quality = quality
+        self._quality_index = QualityIndex(ticker_data_dir_path)
+        self.save_indexes = save_indexes
+        self.write_behind = write_behind
+        # Tickers that are stored but not written yet, only used in write-behind mode:
+        self._pending: Dict[str, TickerHistory] = {}
+        self._pending_lock = threading.Lock()
+        self._write_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._write_error: Optional[BaseException] = None
 
     def _add_ticker_data(self, ticker: str, ticker_history: TickerHistory):
-        with open(self._ticker_data_path(ticker), mode="w") as fd:
-            store_ticker_to_csv(ticker_history, fd)
+        if not self.write_behind:
+            self._write_ticker_file(ticker, ticker_history)
+            return
+
+        self._raise_write_error()
+        with self._pending_lock:
+            self._pending[ticker] = ticker_history
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_pending_tickers, name="ticker-writer", daemon=True)
+            self._writer.start()
+        self._write_queue.put(ticker)
+
+    def _write_ticker_file(self, ticker: str, ticker_history: TickerHistory):
+        path = self._ticker_data_path(ticker)
+        content = io.StringIO()
+        store_ticker_to_csv(ticker_history, content)
+        # The temporary file does not match `*.csv`, so it is never listed as a ticker
+        temp_path = os.path.join(self.ticker_data_dir_path, f".{ticker}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if self._blob_store is None:
+                with open(temp_path, mode="w") as fd:
+                    fd.write(content.getvalue())
+                bytes_written = len(content.getvalue())
+            else:
+                bytes_written = self._blob_store.link(content.getvalue(), temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.metrics.increment("bytes_written", bytes_written)
+        self._summary_index.update(ticker, path, ticker_history)
+
+    def _write_pending_tickers(self):
+        """Loop of the background writer: Take the queued tickers one after another and write their files."""
+        while True:
+            ticker = self._write_queue.get()
+            if ticker is None:
+                self._write_queue.task_done()
+                return
+
+            with self._pending_lock:
+                ticker_history = self._pending.get(ticker)
+            # The ticker is missing if a previous queue entry has written it already
+            if ticker_history is not None and self._write_error is None:
+                try:
+                    with self.metrics.stage("write_behind"):
+                        self._write_ticker_file(ticker, ticker_history)
+                except BaseException as error:
+                    self._write_error = error
+                with self._pending_lock:
+                    # Keep the ticker pending if it was stored again while its file was written
+                    if self._pending.get(ticker) is ticker_history:
+                        del self._pending[ticker]
+            self._write_queue.task_done()
+
+    def _raise_write_error(self):
+        if self._write_error is not None:
+            raise IOError("Failed to write ticker data in the background.") from self._write_error
 
     def _ticker_data_path(self, ticker):
         return os.path.join(self.ticker_data_dir_path, f"{ticker}.csv")
 
     def __getitem__(self, ticker) -> Optional[TickerHistory]:
+        with self._pending_lock:
+            pending_history = self._pending.get(ticker)
+        if pending_history is not None:
+            return pending_history
+
         if ticker not in self.get_tickers():
             return None
         else:
-            return load_ticker_history_from_csv(self._ticker_data_path(ticker))
+            path = self._ticker_data_path(ticker)
+            if self.metrics.enabled:
+                self.metrics.increment("bytes_read", os.path.getsize(path))
+            ticker_history = load_ticker_history_from_csv(path, engine=self.csv_engine,
+                                                          start_date=self.start_date, end_date=self.end_date)
+            return self._check_loaded_history(ticker, path, ticker_history)
+
+    def _is_date_bounded(self) -> bool:
+        return bool(self.start_date or self.end_date)
+
+    def _check_loaded_history(self, ticker: str, path: str, ticker_history: TickerHistory,
+                              columns: Optional[List[str]] = None) -> TickerHistory:
+        """Validate a loaded history in the quality mode and update the sidecar indexes of complete histories."""
+        is_complete = columns is None and not self._is_date_bounded()
+        repaired = False
+        if self.quality:
+            known_report = self._quality_index.get(ticker, path)
+            report, ticker_history = check_ticker_history(ticker, ticker_history, self.quality, known_report)
+            if known_report is None and is_complete:
+                self._quality_index.update(ticker, path, report)
+            repaired = self.quality == "repair" and report.needs_repair
+        # Summaries describe the stored file, hence they are not computed from repaired histories
+        if is_complete and not repaired and self._summary_index.get(ticker, path) is None:
+            self._summary_index.update(ticker, path, ticker_history)
+        return ticker_history
+
+    def get_summary(self, ticker: str) -> Optional[TickerSummary]:
+        """Return the summary statistics of a stored ticker without loading its history.
 
-    def get_data(self) -> Dict[str, TickerHistory]:
-        tickers = self.get_tickers()
-        data = {}
-        for ticker in tickers:
-            data[ticker] = self[ticker]
+        Args:
+            ticker: A ticker symbol.
+
+        Returns:
+            The ticker's summary. If the ticker has not been summarized yet or its file has changed
+            since, return `None`. In `repair` quality mode, the summary of the stored file does not
+            describe the repaired history, hence `None` is returned unless the ticker is known to be clean.
+        """
+        path = self._ticker_data_path(ticker)
+        if self.quality == "repair":
+            report = self._quality_index.get(ticker, path)
+            if report is None or report.needs_repair:
+                return None
+        return self._summary_index.get(ticker, path)
+
+    def flush(self):
+        """Wait until all stored tickers are written and write the summary index, see `save_indexes`.
+
+        Raises:
+            IOError: If the background writer failed to write a ticker.
+        """
+        self._write_queue.join()
+        self._raise_write_error()
+        if not self.save_indexes:
+            return
+        self._summary_index.save()
+        if self.quality:
+            self._quality_index.save()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._write_queue.put(None)
+                self._writer.join()
+                self._writer = None
+
+    def get_data(self, max_workers: Optional[int] = None, tickers: Optional[List[str]] = None,
+                 columns: Optional[List[str]] = None) -> Dict[str, TickerHistory]:
+        """Load the histories of the stored tickers. The ticker files are parsed in parallel threads.
 
-        return data
+        Args:
+            max_workers: The amount of threads, see `load_ticker_histories_from_csv`.
+            tickers: The tickers to load. Defaults to all stored tickers.
+            columns: The columns to load, see `load_ticker_history_from_csv`. Defaults to all columns.
+                     In a quality mode, the price columns are loaded, too, since the validation needs them.
+        """
+        tickers = self.get_tickers() if tickers is None else tickers
+        with self._pending_lock:
+            pending = dict(self._pending)
+        file_paths = {ticker: self._ticker_data_path(ticker) for ticker in tickers if ticker not in pending}
+        if self.metrics.enabled:
+            self.metrics.increment("bytes_read", sum(os.path.getsize(path) for path in file_paths.values()))
+
+        load_columns = columns
+        if self.quality and columns is not None:
+            load_columns = list(dict.fromkeys([*columns, *PRICE_COLUMNS]))
+        loaded = load_ticker_histories_from_csv(file_paths, columns=load_columns, engine=self.csv_engine,
+                                                start_date=self.start_date, end_date=self.end_date,
+                                                max_workers=max_workers)
+        loaded = {ticker: self._check_loaded_history(ticker, file_paths[ticker], ticker_history, columns)
+                  for ticker, ticker_history in loaded.items()}
+        if load_columns is not columns:
+            loaded = {ticker: ticker_history[columns] for ticker, ticker_history in loaded.items()}
+        return {ticker: (pending[ticker] if columns is None else pending[ticker][columns])
+                if ticker in pending else loaded[ticker] for ticker in tickers}
 
     def get_tickers(self) -> List[str]:
         file_pattern = os.path.join(self.ticker_data_dir_path, "*.csv")
-        return sorted(Path(path).stem for path in glob.glob(file_pattern))
+        with self._pending_lock:
+            pending_tickers = set(self._pending)
+        return sorted(pending_tickers.union(Path(path).stem for path in glob.glob(file_pattern)))
 
 
-def load_ticker_history(ticker: str, start_date: Optional[str]) -> TickerHistory:
+def load_ticker_history(ticker: str, start_date: Optional[str], end_date: Optional[str] = None,
+                        download: Optional[Callable[[str, Optional[str], Optional[str]], pd.DataFrame]] = None) \
+        -> TickerHistory:
     """Loads a ticker data from Yahoo Finance, adds a data index column data_id and Open-Close High/Low columns.
 
     Args:
         ticker: The stock ticker.
         start_date: Start date to load stock ticker data formatted YYYY-MM-DD.
                     If `None` is given the max date range will be used.
+        end_date: End date (inclusive) to load stock ticker data formatted YYYY-MM-DD.
+                  If `None` is given the data up to today will be used.
+        download: Downloads the raw price data. Defaults to `download_ticker_history`.
 
     Returns:
         A Panda's data frame representing the price history of a ticker.
     """
-    df_data = yf.download(ticker, start=start_date, progress=False)
+    download = download or download_ticker_history
+    return normalize_ticker_history(download(ticker, start_date, end_date))
+
+
+def download_ticker_history(ticker: str, start_date: Optional[str], end_date: Optional[str] = None) -> pd.DataFrame:
+    """Download the raw price data of a ticker from Yahoo Finance.
+
+    Args:
+        ticker: The stock ticker.
+        start_date: Start date to load stock ticker data formatted YYYY-MM-DD.
+                    If `None` is given the max date range will be used.
+        end_date: End date (inclusive) to load stock ticker data formatted YYYY-MM-DD.
+                  If `None` is given the data up to today will be used.
+
+    Returns:
+        The price data as returned by Yahoo Finance, see `normalize_ticker_history`.
+
+    Raises:
+        TransientDownloadError: If no price data was returned due to a network error.
+        ValueError: If no price data was returned for another reason, e.g. the ticker is delisted or
+                    the requests are throttled.
+    """
+    # The end date of Yahoo Finance is exclusive
+    end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).strftime("%Y-%m-%d") if end_date else None
+    ticker_history = yf.download(ticker, start=start_date, end=end, progress=False)
+    if ticker_history.empty:
+        # yfinance does not raise its errors, but records them per ticker and returns an empty frame.
+        # The record is reset by each download, hence downloads must not run concurrently.
+        error = yf_shared._ERRORS.get(ticker.upper())
+        if error and any(marker in str(error) for marker in NETWORK_ERROR_MARKERS):
+            raise TransientDownloadError(f"Download of `{ticker}` failed: {error}")
+        raise ValueError(f"No price data found for `{ticker}`: {error or 'Empty response.'}")
+    return ticker_history
+
+
+def normalize_ticker_history(df_data: pd.DataFrame) -> TickerHistory:
+    """Add a data index column data_id and Open-Close High/Low columns to downloaded price data.
+
+    Args:
+        df_data: The price data as returned by `download_ticker_history`.
 
+    Returns:
+        A Panda's data frame representing the price history of a ticker.
+    """
     df_data["date_id"] = (df_data.index.date - df_data.index.date.min()).astype(
         "timedelta64[D]"
     )
@@ -150,16 +492,128 @@ def load_ticker_history(ticker: str, start_date: Optional[str]) -> TickerHistory
     return load_ticker_history_from_csv(temp)
 
 
-def load_ticker_history_from_csv(file_path: Union[str, io.StringIO]) -> TickerHistory:
+def load_ticker_history_from_csv(file_path: Union[str, io.StringIO], columns: Optional[List[str]] = None,
+                                 engine: Optional[str] = None, start_date: Optional[str] = None,
+                                 end_date: Optional[str] = None) -> TickerHistory:
     """Load a tickers historical price data from the given csv.
 
+    The columns are parsed with the types of `TICKER_HISTORY_DTYPES` instead of inferring them.
+    If the file does not match these types, e.g. because of missing volumes, the types are inferred.
+
     Args:
         file_path: The path to the comma-separated csv file that contains the historical price data.
+        columns: The columns to load besides the `Date` index. If `None` is given, all columns are loaded.
+                 Filters that only use some columns can skip parsing the others.
+        engine: The csv parser of pandas, e.g. `pyarrow` for the multithreaded parser of the optional
+                `pyarrow` package. If `None` is given, the default parser is used.
+        start_date: Only load the days from this date on, formatted YYYY-MM-DD.
+        end_date: Only load the days up to this date (inclusive), formatted YYYY-MM-DD.
+                  Since ticker files are sorted by date, the rows of a date range are located in the file
+                  by a binary search and the rows outside of it are never read or parsed.
 
     Returns:
         A Panda's data frame representing the price history of a ticker.
     """
-    return pd.read_csv(file_path, index_col="Date")
+    if start_date or end_date:
+        if not isinstance(file_path, str):
+            return _slice_date_range(load_ticker_history_from_csv(file_path, columns, engine), start_date, end_date)
+        file_path = _read_date_range(file_path, start_date, end_date)
+
+    options = dict(index_col="Date", usecols=["Date", *columns] if columns is not None else None)
+    if engine:
+        options["engine"] = engine
+    else:
+        # Ticker files are small enough to be parsed at once instead of in chunks that are concatenated
+        options["low_memory"] = False
+    dtypes = (TICKER_HISTORY_DTYPES if columns is None
+              else {column: TICKER_HISTORY_DTYPES[column] for column in columns if column in TICKER_HISTORY_DTYPES})
+    try:
+        return pd.read_csv(file_path, dtype=dtypes, **options)
+    except ValueError:
+        # E.g. missing volumes cannot be parsed as integers
+        if not isinstance(file_path, str):
+            file_path.seek(0)
+        return pd.read_csv(file_path, **options)
+
+
+def _read_date_range(file_path: str, start_date: Optional[str], end_date: Optional[str]) -> io.BytesIO:
+    """Read the header and the rows of a date range of a ticker file."""
+    with open(file_path, mode="rb") as fd:
+        header = fd.readline()
+        data_start = fd.tell()
+        size = os.fstat(fd.fileno()).st_size
+        start = _find_date_offset(fd, data_start, size, start_date.encode(), inclusive=True) if start_date \
+            else data_start
+        end = _find_date_offset(fd, start, size, end_date.encode(), inclusive=False) if end_date else size
+        fd.seek(start)
+        return io.BytesIO(header + fd.read(end - start))
+
+
+def _find_date_offset(fd: BinaryIO, low: int, high: int, date: bytes, inclusive: bool) -> int:
+    """Return the offset of the first line in [low, high) whose date is at least (`inclusive`) or after `date`.
+
+    `low` must be the offset of a line start. If there is no such line, return `high`.
+    """
+    first_line_start = low
+
+    def line_start(position: int) -> int:
+        if position <= first_line_start:
+            return first_line_start
+        fd.seek(position - 1)
+        fd.readline()
+        return fd.tell()
+
+    def is_in_range(position: int) -> bool:
+        offset = line_start(position)
+        if offset >= high:
+            return True
+        fd.seek(offset)
+        line_date = fd.readline()[:len(date)]
+        return line_date >= date if inclusive else line_date > date
+
+    # Binary search for the smallest position whose next line is in range
+    while low < high:
+        middle = (low + high) // 2
+        if is_in_range(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return line_start(low)
+
+
+def _slice_date_range(ticker_history: TickerHistory, start_date: Optional[str],
+                      end_date: Optional[str]) -> TickerHistory:
+    dates = ticker_history.index.astype(str)
+    mask = np.ones(len(dates), dtype=bool)
+    if start_date:
+        mask &= dates.str[:len(start_date)] >= start_date
+    if end_date:
+        mask &= dates.str[:len(end_date)] <= end_date
+    return ticker_history[mask]
+
+
+def load_ticker_histories_from_csv(file_paths: Dict[str, str], columns: Optional[List[str]] = None,
+                                   engine: Optional[str] = None, start_date: Optional[str] = None,
+                                   end_date: Optional[str] = None,
+                                   max_workers: Optional[int] = None) -> Dict[str, TickerHistory]:
+    """Load the historical price data of many tickers in parallel threads.
+
+    Args:
+        file_paths: A mapping of tickers and the csv files of their price data.
+        columns: The columns to load, see `load_ticker_history_from_csv`.
+        engine: The csv parser of pandas, see `load_ticker_history_from_csv`.
+        start_date: The first day to load, see `load_ticker_history_from_csv`.
+        end_date: The last day to load, see `load_ticker_history_from_csv`.
+        max_workers: The amount of threads. Defaults to the default of `ThreadPoolExecutor`.
+
+    Returns:
+        A mapping of tickers and their price history, in the order of `file_paths`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {ticker: pool.submit(load_ticker_history_from_csv, path, columns=columns, engine=engine,
+                                       start_date=start_date, end_date=end_date)
+                   for ticker, path in file_paths.items()}
+        return {ticker: future.result() for ticker, future in futures.items()}
 
 
 def store_ticker_to_csv(ticker_history: TickerHistory, file_path: Union[str, io.StringIO]):
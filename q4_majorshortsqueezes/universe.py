@@ -0,0 +1,165 @@
+"""
+A local store of dated ticker universe snapshots.
+
+A snapshot holds the listings of the exchanges at a point in time: the columns `symbol`, `exchange`,
+`sector` and `market_cap` (in million USD). Each snapshot is a compressed `.npz` file with one array
+per column, the string columns with few distinct values are stored as categories and codes.
+Runs against a snapshot need no network access and the snapshot ID records which universe a result
+was computed on. Comparing two snapshots yields the added and removed listings.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes import get_tickers_fixed as gt
+
+UNIVERSE_COLUMNS = ["symbol", "exchange", "sector", "market_cap"]
+# Columns stored as categories and codes
+_CATEGORICAL_COLUMNS = ["exchange", "sector"]
+_SNAPSHOT_ID_PATTERN = re.compile(r"^[\w.-]+$")
+
+
+@dataclass
+class UniverseChange:
+    """The symbols that were added and removed between two snapshots."""
+    added: List[str]
+    removed: List[str]
+
+
+def parse_market_cap(market_cap: Optional[str]) -> float:
+    """Convert a market cap of the NASDAQ listings, e.g. `$1.2B`, `$300M` or `1,234,567.00`, to million USD.
+
+    Missing market caps are NaN.
+    """
+    if market_cap is None or not str(market_cap).strip():
+        return float("nan")
+    market_cap = str(market_cap).strip().lstrip("$").replace(",", "")
+    if market_cap.endswith("B"):
+        return float(market_cap[:-1]) * 1000
+    if market_cap.endswith("M"):
+        return float(market_cap[:-1])
+    return float(market_cap) / 1e6
+
+
+def get_listings(exchanges: List[str]) -> pd.DataFrame:
+    """Download the current listings of the exchanges in the snapshot format.
+
+    Symbols with `.` or `^` are removed, like `get_tickers_fixed` does.
+    """
+    frames = []
+    for exchange in exchanges:
+        listings = gt.__exchange2df(exchange)
+        listings = listings[~listings["symbol"].str.contains(r"\.|\^")]
+        frames.append(pd.DataFrame({"symbol": listings["symbol"].str.strip(),
+                                    "exchange": exchange,
+                                    "sector": listings["sector"].fillna(""),
+                                    "market_cap": listings["marketCap"].map(parse_market_cap)}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=UNIVERSE_COLUMNS)
+
+
+def select_symbols(listings: pd.DataFrame, exchanges: List[str], min_market_cap: float = 0) -> List[str]:
+    """Return the symbols of the exchanges whose market cap (in million USD) is larger than the minimum.
+
+    Like `retrieve_tickers_with_get_all_tickers_package`, listings without a market cap only pass a
+    minimum of zero.
+    """
+    selected = listings["exchange"].isin(exchanges)
+    if min_market_cap:
+        selected &= listings["market_cap"] > min_market_cap
+    return sorted(set(listings.loc[selected, "symbol"]))
+
+
+class UniverseStore:
+    """A directory of universe snapshots, each stored as `<snapshot ID>.npz`.
+
+    Args:
+        dir_path: The directory of the snapshots. It is created if it does not exist.
+    """
+    FILE_EXTENSION = ".npz"
+
+    def __init__(self, dir_path: str):
+        self.dir_path = dir_path
+        os.makedirs(dir_path, exist_ok=True)
+
+    def _path(self, snapshot_id: str) -> str:
+        return os.path.join(self.dir_path, f"{snapshot_id}{self.FILE_EXTENSION}")
+
+    def snapshot_ids(self) -> List[str]:
+        """Return the IDs of all snapshots in ascending order. Dated IDs hence are in chronological order."""
+        return sorted(file_name[:-len(self.FILE_EXTENSION)] for file_name in os.listdir(self.dir_path)
+                      if file_name.endswith(self.FILE_EXTENSION))
+
+    def latest(self) -> Optional[str]:
+        """Return the ID of the latest snapshot or `None` if there is none."""
+        snapshot_ids = self.snapshot_ids()
+        return snapshot_ids[-1] if snapshot_ids else None
+
+    def previous(self, snapshot_id: str) -> Optional[str]:
+        """Return the ID of the snapshot before the given one or `None` if there is none."""
+        earlier_ids = [other_id for other_id in self.snapshot_ids() if other_id < snapshot_id]
+        return earlier_ids[-1] if earlier_ids else None
+
+    def resolve(self, snapshot_id: str) -> str:
+        """Return the ID of an existing snapshot. `latest` refers to the latest snapshot.
+
+        Raises:
+            ValueError: If the snapshot does not exist.
+        """
+        if snapshot_id == "latest":
+            snapshot_id = self.latest()
+            if snapshot_id is None:
+                raise ValueError(f"There are no universe snapshots in `{self.dir_path}`.")
+        if not os.path.exists(self._path(snapshot_id)):
+            raise ValueError(f"Universe snapshot `{snapshot_id}` does not exist in `{self.dir_path}`. "
+                             f"Available snapshots: {', '.join(self.snapshot_ids())}")
+        return snapshot_id
+
+    def save(self, listings: pd.DataFrame, snapshot_id: Optional[str] = None) -> str:
+        """Store listings as snapshot. An existing snapshot with the same ID is replaced.
+
+        Args:
+            listings: The listings with the columns of `UNIVERSE_COLUMNS`.
+            snapshot_id: The ID of the snapshot. Defaults to today's date, `YYYY-MM-DD`.
+
+        Returns:
+            The ID of the snapshot.
+        """
+        snapshot_id = snapshot_id or date.today().isoformat()
+        if not _SNAPSHOT_ID_PATTERN.match(snapshot_id) or snapshot_id == "latest":
+            raise ValueError(f"Invalid universe snapshot ID `{snapshot_id}`.")
+
+        listings = listings.drop_duplicates("symbol").sort_values("symbol")
+        arrays = {"symbol": listings["symbol"].to_numpy(dtype=str),
+                  "market_cap": listings["market_cap"].to_numpy(dtype=np.float64)}
+        for column in _CATEGORICAL_COLUMNS:
+            codes, categories = pd.factorize(listings[column].fillna("").astype(str))
+            arrays[f"{column}.codes"] = codes.astype(np.int16)
+            arrays[f"{column}.categories"] = np.asarray(categories, dtype=str)
+
+        temp_path = f"{self._path(snapshot_id)}.{os.getpid()}.tmp"
+        with open(temp_path, mode="wb") as fd:
+            np.savez_compressed(fd, **arrays)
+        os.replace(temp_path, self._path(snapshot_id))
+        logging.info("Stored universe snapshot `%s` with %s listings.", snapshot_id, len(listings))
+        return snapshot_id
+
+    def load(self, snapshot_id: str) -> pd.DataFrame:
+        """Load the listings of a snapshot, see `resolve` for the valid IDs."""
+        with np.load(self._path(self.resolve(snapshot_id))) as arrays:
+            listings = pd.DataFrame({"symbol": arrays["symbol"].astype(object)})
+            for column in _CATEGORICAL_COLUMNS:
+                listings[column] = arrays[f"{column}.categories"].astype(object)[arrays[f"{column}.codes"]]
+            listings["market_cap"] = arrays["market_cap"]
+        return listings[UNIVERSE_COLUMNS]
+
+    def diff(self, old_snapshot_id: str, new_snapshot_id: str) -> UniverseChange:
+        """Return the symbols that were added and removed from the old to the new snapshot."""
+        old_symbols = set(self.load(old_snapshot_id)["symbol"])
+        new_symbols = set(self.load(new_snapshot_id)["symbol"])
+        return UniverseChange(added=sorted(new_symbols - old_symbols), removed=sorted(old_symbols - new_symbols))
@@ -1,9 +1,29 @@
+import os
+import threading
+import time
+
+import pandas as pd
 import pytest
+import shutil
+import yfinance as yf
 from unittest import mock
+from yfinance import shared as yf_shared
 
-from q4_majorshortsqueezes.api.pull_data import main
+from q4_majorshortsqueezes.api.pull_data import main, StageConcurrency
+from q4_majorshortsqueezes.filter import price_multi_criterion
+from q4_majorshortsqueezes.ledger import FailureLedger
+from q4_majorshortsqueezes.metrics import Metrics
+from q4_majorshortsqueezes.profiling import CriterionProfiler
 from q4_majorshortsqueezes.ticker import FileBackedTicketContainer
 
+price_multi_50_within_5_days = price_multi_criterion(multiplier=50, days=5)
+
+
+@pytest.fixture()
+def source_dir(ticker_sample_data_dir, tmpdir):
+    """A copy of the sample data, so that runs never change the fixtures."""
+    yield str(shutil.copytree(ticker_sample_data_dir, tmpdir.join("source")))
+
 
 @pytest.mark.integration_test
 def test_main_download_data():
@@ -14,28 +34,231 @@ def test_main_download_data():
     assert result.get_tickers() == ["AMC", "GME"]
 
 
-def test_main_use_csv_data(ticker_sample_data_dir):
+def test_main_use_csv_data(source_dir):
     # Disable downloading and ensure we load the data from csv
     with mock.patch("q4_majorshortsqueezes.api.pull_data.load_ticker_history") as m:
         m.side_effect = RuntimeError("The ticker should be loaded via a csv file.")
         result = main(tickers={"GME", "AMC", "TSLA"},
                       start_date="2020-01-01",
                       criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
-                      csv_dir_path=ticker_sample_data_dir)
+                      csv_dir_path=source_dir)
 
     assert result.get_tickers() == ["AMC", "GME"]
 
 
-def test_main_use_and_store_csv_data(ticker_sample_data_dir, tmpdir):
+def test_main_use_and_store_csv_data(source_dir, tmpdir):
     # Disable downloading and ensure we load the data from csv
     with mock.patch("q4_majorshortsqueezes.api.pull_data.load_ticker_history") as m:
         m.side_effect = RuntimeError("The ticker should be loaded via a csv file.")
         result = main(tickers={"GME", "AMC", "TSLA"},
                       start_date="2020-01-01",
                       criterion_paths=[],
-                      csv_dir_path=ticker_sample_data_dir,
+                      csv_dir_path=source_dir,
                       csv_output_dir_path=tmpdir)
 
     assert isinstance(result, FileBackedTicketContainer)
     assert result.ticker_data_dir_path == tmpdir
     assert result.get_tickers() == ["AMC", "GME", "TSLA"]
+
+
+def test_main_collects_metrics(source_dir, tmpdir):
+    metrics = Metrics()
+    criterion_path = "q4_majorshortsqueezes.filter/price_multi_2_within_5_days"
+    main(tickers={"GME", "AMC", "TSLA"},
+         start_date="2020-01-01",
+         criterion_paths=[criterion_path],
+         csv_dir_path=source_dir,
+         csv_output_dir_path=tmpdir,
+         metrics=metrics)
+
+    assert metrics.counters["tickers_processed"] == 3
+    assert metrics.counters["tickers_stored"] == 2
+    assert metrics.counters["bytes_read"] > 0
+    assert metrics.counters["bytes_written"] > 0
+    assert metrics.stages["csv_load"].calls == 3
+    assert metrics.stages[f"criterion:{criterion_path}"].calls == 3
+    assert metrics.stages["write"].calls == 2
+
+
+def test_main_profiles_criteria(source_dir):
+    profiler = CriterionProfiler()
+    criterion_path = "q4_majorshortsqueezes.filter/price_multi_2_within_5_days"
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date="2020-01-01",
+                  criterion_paths=[criterion_path],
+                  csv_dir_path=source_dir,
+                  profiler=profiler)
+
+    assert result.get_tickers() == ["AMC", "GME"]
+    assert len(profiler.slowest_tickers(criterion_path)) == 3
+    assert len(profiler.slowest_tickers("csv_load")) == 3
+
+
+def test_main_rejects_tickers_by_summary(source_dir):
+    criterion_path = f"{__name__}/price_multi_50_within_5_days"
+
+    # The first run computes the summaries and the second run uses them
+    for _ in range(2):
+        metrics = Metrics()
+        result = main(tickers={"GME", "AMC", "TSLA"},
+                      start_date=None,
+                      criterion_paths=[criterion_path],
+                      csv_dir_path=source_dir,
+                      metrics=metrics,
+                      index_source_dir=True)
+        assert result.get_tickers() == []
+
+    # Only GME's prices have ever increased by more than 50 times
+    assert metrics.counters["tickers_prefiltered"] == 2
+    assert metrics.stages["csv_load"].calls == 1
+
+
+@pytest.mark.parametrize("quality", [None, "flag"])
+def test_main_only_reads_source_dir(source_dir, quality):
+    main(tickers={"GME", "AMC", "TSLA"},
+         start_date=None,
+         criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+         csv_dir_path=source_dir,
+         quality=quality)
+
+    assert sorted(os.listdir(source_dir)) == ["AMC.csv", "GME.csv", "TSLA.csv"]
+
+
+def test_main_pipelined(source_dir, tmpdir):
+    metrics = Metrics()
+    # Disable downloading and ensure we load the data from csv
+    with mock.patch("q4_majorshortsqueezes.api.pull_data.download_ticker_history") as m:
+        m.side_effect = RuntimeError("The ticker should be loaded via a csv file.")
+        result = main(tickers={"GME", "AMC", "TSLA"},
+                      start_date=None,
+                      criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                      csv_dir_path=source_dir,
+                      csv_output_dir_path=tmpdir,
+                      metrics=metrics,
+                      concurrency=StageConcurrency(fetch=2, queue_size=1))
+
+    assert result.get_tickers() == ["AMC", "GME"]
+    assert metrics.counters["tickers_stored"] == 2
+    assert metrics.observations["queue_depth:evaluate"].count == 3
+    assert metrics.observations["queue_depth:persist"].count == 2
+
+
+def test_main_pipelined_skips_failed_tickers(source_dir):
+    metrics = Metrics()
+    with mock.patch("q4_majorshortsqueezes.api.pull_data.download_ticker_history") as m:
+        m.side_effect = ValueError("No price data found.")
+        result = main(tickers={"GME", "AMC", "UNKNOWN"},
+                      start_date=None,
+                      criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                      csv_dir_path=source_dir,
+                      metrics=metrics,
+                      concurrency=StageConcurrency())
+
+    assert result.get_tickers() == ["AMC", "GME"]
+    assert metrics.counters["tickers_failed"] == 1
+
+
+def test_main_write_behind(source_dir, tmpdir):
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date=None,
+                  criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                  csv_dir_path=source_dir,
+                  csv_output_dir_path=tmpdir,
+                  write_behind=True)
+
+    # All files are written when `main` returns
+    assert FileBackedTicketContainer(tmpdir).get_tickers() == ["AMC", "GME"]
+    assert result.get_tickers() == ["AMC", "GME"]
+
+
+def test_main_limits_csv_data_to_date_range(source_dir, tmpdir):
+    criterion_path = "q4_majorshortsqueezes.filter/price_multi_2_within_5_days"
+    # None of the tickers doubled its price within 5 days in 2020
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date=None,
+                  end_date="2020-12-31",
+                  criterion_paths=[criterion_path],
+                  csv_dir_path=source_dir)
+    assert result.get_tickers() == []
+
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date="2021-01-01",
+                  end_date="2021-01-31",
+                  criterion_paths=[criterion_path],
+                  csv_dir_path=source_dir,
+                  csv_output_dir_path=tmpdir)
+    assert result.get_tickers() == ["AMC", "GME"]
+    assert result["GME"].index[0] == "2021-01-04"
+    assert result["GME"].index[-1] == "2021-01-29"
+
+
+class NonThreadSafeDownloader:
+    """Downloads from the sample data, but fails like `yf.download` when it is called concurrently."""
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, ticker, start_date, end_date=None):
+        with self.lock:
+            self.active += 1
+            concurrent = self.active > 1
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if concurrent:
+            raise KeyError(ticker)
+        ticker_history = pd.read_csv(os.path.join(self.data_dir, f"{ticker}.csv"), index_col="Date",
+                                     parse_dates=True)
+        return ticker_history[["Open", "High", "Low", "Close", "Adj Close", "Volume"]]
+
+
+def test_main_pipelined_downloads_one_at_a_time(ticker_sample_data_dir):
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date=None,
+                  criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                  concurrency=StageConcurrency(fetch=8),
+                  downloader=NonThreadSafeDownloader(ticker_sample_data_dir))
+
+    assert result.get_tickers() == ["AMC", "GME"]
+
+
+def test_main_stores_results_of_aborted_run(source_dir, tmpdir):
+    ledger = FailureLedger(str(tmpdir.join("ledger.json")))
+    downloader = mock.Mock(side_effect=KeyError("UNKNOWN"))
+
+    with pytest.raises(KeyError):
+        main(tickers={"GME", "AMC", "TSLA", "UNKNOWN"},
+             start_date=None,
+             criterion_paths=[],
+             csv_dir_path=source_dir,
+             csv_output_dir_path=str(tmpdir),
+             write_behind=True,
+             ledger=ledger,
+             downloader=downloader)
+
+    # The tickers before the failing one are written by the background writer
+    assert FileBackedTicketContainer(str(tmpdir)).get_tickers() == ["AMC", "GME", "TSLA"]
+    assert os.path.exists(ledger.path)
+
+
+@pytest.mark.parametrize("concurrency", [None, StageConcurrency()])
+def test_main_skips_tickers_with_network_errors_without_retries(source_dir, tmpdir, monkeypatch, concurrency):
+    ledger = FailureLedger(str(tmpdir.join("ledger.json")))
+
+    # yfinance records the network error and returns an empty frame
+    def download(ticker, *args, **kwargs):
+        yf_shared._ERRORS = {ticker.upper(): "ConnectionError('Connection aborted.')"}
+        return pd.DataFrame()
+    monkeypatch.setattr(yf_shared, "_ERRORS", {})
+    monkeypatch.setattr(yf, "download", download)
+
+    result = main(tickers={"GME", "AMC", "UNKNOWN"},
+                  start_date=None,
+                  criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                  csv_dir_path=source_dir,
+                  concurrency=concurrency,
+                  ledger=ledger)
+
+    assert result.get_tickers() == ["AMC", "GME"]
+    assert ledger.entries["UNKNOWN"].error_class == "TransientDownloadError"
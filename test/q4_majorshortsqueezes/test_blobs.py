@@ -0,0 +1,30 @@
+import os
+
+from q4_majorshortsqueezes.blobs import BlobStore
+
+
+def test_link_stores_identical_content_once(tmpdir):
+    store = BlobStore(tmpdir.join("blobs"))
+
+    assert store.link("Date,Adj Close\n", tmpdir.join("a.csv")) == len("Date,Adj Close\n")
+    assert store.link("Date,Adj Close\n", tmpdir.join("b.csv")) == 0
+    assert store.link("Date,Close\n", tmpdir.join("c.csv")) == len("Date,Close\n")
+
+    assert os.path.samefile(tmpdir.join("a.csv"), tmpdir.join("b.csv"))
+    assert not os.path.samefile(tmpdir.join("a.csv"), tmpdir.join("c.csv"))
+    with open(tmpdir.join("b.csv")) as fd:
+        assert fd.read() == "Date,Adj Close\n"
+
+
+def test_prune_removes_unlinked_blobs(tmpdir):
+    store = BlobStore(tmpdir.join("blobs"))
+    store.link("Date,Adj Close\n", tmpdir.join("a.csv"))
+    store.link("Date,Close\n", tmpdir.join("b.csv"))
+    # Replacing a ticker file unlinks it from its previous blob
+    store.link("Date,Open\n", tmpdir.join("b.tmp"))
+    os.replace(tmpdir.join("b.tmp"), tmpdir.join("b.csv"))
+
+    assert store.prune() == 1
+    assert os.path.exists(store.put("Date,Adj Close\n"))
+    with open(tmpdir.join("b.csv")) as fd:
+        assert fd.read() == "Date,Open\n"
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from q4_majorshortsqueezes.catalog import EventCatalog
+from q4_majorshortsqueezes.study import parse_identifier
+
+
+@pytest.fixture()
+def results_dir(tmpdir):
+    files = {
+        "nasdaq_min_100_multi_3_days_10.csv": ["GME,2021-01-22,65.01,3.5", "AMC,2020-03-01,2.0,3.1"],
+        "nasdaq_min_10_multi_3_days_10.csv": ["GME,2021-01-22,65.01,3.5", "XYZ,2021-06-01,1.0,4.0"],
+        "nyse_min_100_multi_5_days_5.csv": ["AMC,2021-01-27,19.9,6.7"],
+        "amex_min_100_multi_2_days_5.csv": [],
+    }
+    for file_name, rows in files.items():
+        with open(os.path.join(tmpdir, file_name), mode="w") as fd:
+            fd.write("\n".join(["Ticker,Date,Adj Close,Increase", *rows]) + "\n")
+    yield str(tmpdir)
+
+
+def test_parse_identifier():
+    assert parse_identifier("nasdaq_min_100_multi_3_days_10") == ("nasdaq", 100, 3, 10)
+    with pytest.raises(ValueError):
+        parse_identifier("unfiltered_ticker_counts")
+
+
+def test_query(results_dir):
+    catalog = EventCatalog.from_results_dir(results_dir)
+    assert len(catalog) == 5
+    assert catalog.values("exchange") == ["nasdaq", "nyse"]
+
+    result = catalog.query(exchanges=["nasdaq"], min_market_caps=[100], multipliers=[3], days=[10],
+                           start_date="2021-01-01", end_date="2021-12-31")
+    assert result["ticker"].tolist() == ["GME"]
+    assert result["increase"].tolist() == [3.5]
+
+    assert catalog.query(tickers=["AMC"])["date"].dt.strftime("%Y-%m-%d").tolist() == ["2020-03-01", "2021-01-27"]
+    assert catalog.query(end_date="2021-01-22")["ticker"].tolist() == ["AMC", "GME", "GME"]
+    assert catalog.query(tickers=["TSLA"]).empty
+
+
+def test_aggregate(results_dir):
+    catalog = EventCatalog.from_results_dir(results_dir)
+    result = EventCatalog.aggregate(catalog.query(), ["exchange", "year"])
+    assert result.loc[("nasdaq", 2021)].tolist() == [3, 2, 4.0]
+    assert result.loc[("nyse", 2021)].tolist() == [1, 1, 6.7]
+    assert result.index[0] == ("nasdaq", 2021)
+
+
+def test_catalog_of_study_results(ticker_sample_data_dir):
+    results_dir = os.path.join(os.path.dirname(ticker_sample_data_dir), "results_1")
+    catalog = EventCatalog.from_results_dir(results_dir)
+    with open(os.path.join(results_dir, "nasdaq_min_1000_multi_5_days_5.csv")) as fd:
+        row_count = len(fd.readlines()) - 1
+    assert len(catalog.query(exchanges=["nasdaq"], min_market_caps=[1000], multipliers=[5], days=[5])) == row_count
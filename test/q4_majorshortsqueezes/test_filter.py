@@ -1,7 +1,27 @@
+import numpy as np
+import pandas as pd
+
 from q4_majorshortsqueezes.filter import (
+    multiply_price_with_volume_spike,
+    multiply_price_within_x_days,
+    price_multi_criterion,
+    prior_rolling_median,
+    prior_rolling_min,
+    range_min,
     RingbufferWithAutomaticFIFORemoval,
     SortedFIFOCache,
+    window_multiples,
 )
+from q4_majorshortsqueezes.ticker import Ticker
+
+
+def ticker_with_prices(**columns) -> Ticker:
+    dates = pd.bdate_range("2021-01-04", periods=len(next(iter(columns.values())))).strftime("%Y-%m-%d")
+    return Ticker("GME", pd.DataFrame(columns, index=pd.Index(dates, name="Date")))
+
+
+def ticker_with_adj_close(prices) -> Ticker:
+    return ticker_with_prices(**{"Adj Close": prices})
 
 
 class TestRingbufferWithAutomaticFIFORemoval:
@@ -40,3 +60,114 @@ class TestSortedFIFOCache:
     def test_get_first_return_none_when_cache_empty(self):
         cache = SortedFIFOCache(size=1, sort_key_func=lambda x: x)
         assert cache.get_first() is None
+
+
+class TestMultiplyPriceWithinXDays:
+    def test_prior_rolling_min(self):
+        ticker = ticker_with_adj_close([3.0, 1.0, 2.0, 4.0, 5.0])
+
+        window_min = prior_rolling_min(ticker, "Adj Close", days=2)
+
+        assert pd.isna(window_min[0])
+        assert list(window_min[1:]) == [3.0, 1.0, 1.0, 2.0]
+
+    def test_increase_within_days(self):
+        ticker = ticker_with_adj_close([2.0, 1.0, 1.5, 1.8, 2.0])
+
+        assert multiply_price_within_x_days(ticker, multiplier=2, days=3)
+        # The low of 1.0 is no longer within the window when the price reaches 2.0
+        assert not multiply_price_within_x_days(ticker, multiplier=2, days=2)
+
+    def test_ignores_zero_prices(self):
+        ticker = ticker_with_adj_close([0.0, 1.0, 1.5])
+
+        assert not multiply_price_within_x_days(ticker, multiplier=2, days=2)
+
+    def test_shares_rolling_min_between_criteria(self):
+        ticker = ticker_with_adj_close([1.0, 1.5, 2.5])
+
+        assert not multiply_price_within_x_days(ticker, multiplier=3, days=2)
+        window_min = prior_rolling_min(ticker, "Adj Close", days=2)
+        assert multiply_price_within_x_days(ticker, multiplier=2, days=2)
+        assert prior_rolling_min(ticker, "Adj Close", days=2) is window_min
+
+
+class TestWindowMultiples:
+    def test_low_high(self):
+        ticker = ticker_with_prices(Low=[1.0, 2.0, 3.0], High=[1.5, 2.5, 4.0])
+
+        multiples = window_multiples(ticker, "Low", "High", days=2)
+
+        assert pd.isna(multiples[0])
+        assert list(multiples[1:]) == [2.5, 4.0]
+
+    def test_shares_rolling_min_between_price_bases(self):
+        ticker = ticker_with_prices(Low=[1.0, 2.0, 3.0], High=[1.5, 2.5, 4.0], Close=[1.2, 2.2, 3.5])
+
+        window_multiples(ticker, "Low", "High", days=2)
+        window_min = prior_rolling_min(ticker, "Low", days=2)
+        window_multiples(ticker, "Low", "Close", days=2)
+
+        assert prior_rolling_min(ticker, "Low", days=2) is window_min
+
+    def test_price_multi_criterion_with_price_bases(self):
+        # The adjusted close prices never double, but the intraday high does
+        ticker = ticker_with_prices(**{"Adj Close": [1.0, 1.2, 1.3], "Low": [0.9, 1.1, 1.2], "High": [1.1, 1.3, 2.0]})
+
+        assert not price_multi_criterion(multiplier=2, days=2)(ticker)
+        assert price_multi_criterion(multiplier=2, days=2, low_column="Low", high_column="High")(ticker)
+
+    def test_summary_prefilter_only_for_adjusted_close(self):
+        assert hasattr(price_multi_criterion(multiplier=2, days=5), "summary_prefilter")
+        assert not hasattr(price_multi_criterion(multiplier=2, days=5, low_column="Low", high_column="High"),
+                           "summary_prefilter")
+
+
+class TestCalendarDayWindows:
+    def test_range_min(self):
+        values = np.array([5.0, 3.0, np.nan, 4.0, 1.0, 2.0])
+        starts = np.array([0, 0, 1, 2, 0, 5])
+        ends = np.array([0, 2, 3, 4, 6, 6])
+
+        result = range_min(values, starts, ends)
+
+        assert pd.isna(result[0])
+        assert list(result[1:]) == [3.0, 3.0, 4.0, 1.0, 2.0]
+
+    def test_window_shrinks_over_gaps(self):
+        # A trading halt of two weeks between the second and the third row
+        ticker = ticker_with_prices(**{"Adj Close": [1.0, 1.5, 2.5, 3.5], "date_id": [1, 2, 16, 17]})
+
+        window_min = prior_rolling_min(ticker, "Adj Close", days=7, calendar_days=True)
+        assert pd.isna(window_min[0])
+        assert window_min[1] == 1.0
+        assert pd.isna(window_min[2])  # No prices within the last 7 calendar days
+        assert window_min[3] == 2.5
+
+        # Counted in trading days, the halt would be part of a 2 day window
+        assert multiply_price_within_x_days(ticker, multiplier=2, days=2)
+        assert not multiply_price_within_x_days(ticker, multiplier=2, days=7, calendar_days=True)
+
+
+class TestVolumeConfirmedFilter:
+    def test_prior_rolling_median(self):
+        ticker = ticker_with_prices(Volume=[10, 30, 20, 100, 40])
+
+        median = prior_rolling_median(ticker, "Volume", days=3)
+
+        assert pd.isna(median[0])
+        assert list(median[1:]) == [10.0, 20.0, 20.0, 30.0]
+
+    def test_requires_price_increase_and_volume_spike(self):
+        ticker = ticker_with_prices(**{"Adj Close": [1.0, 1.0, 1.0, 2.0, 1.0, 2.5],
+                                       "Volume": [100, 100, 100, 200, 100, 500]})
+
+        # The first doubling comes with a volume of only 2x the median, the second one with 5x
+        assert multiply_price_with_volume_spike(ticker, multiplier=2, days=2,
+                                                volume_multiplier=2, volume_days=3)
+        assert multiply_price_with_volume_spike(ticker, multiplier=2, days=2,
+                                                volume_multiplier=5, volume_days=3)
+        assert not multiply_price_with_volume_spike(ticker, multiplier=2, days=2,
+                                                    volume_multiplier=6, volume_days=3)
+        assert not multiply_price_with_volume_spike(ticker, multiplier=3, days=2,
+                                                    volume_multiplier=2, volume_days=3)
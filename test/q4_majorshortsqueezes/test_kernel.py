@@ -0,0 +1,81 @@
+import pytest
+
+from q4_majorshortsqueezes.api.pull_data import import_criterion_functions, main
+from q4_majorshortsqueezes.filter import price_multi_2_within_5_days
+from q4_majorshortsqueezes.kernel import column_for_parameter, kernel_criterion, KernelCriterion
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, Ticker
+
+KERNEL_PATH = "kernel:test.q4_majorshortsqueezes.test_kernel/doubled_within_5_days"
+
+
+def doubled_within_5_days(adj_close):
+    for i in range(1, len(adj_close)):
+        window_min = adj_close[max(0, i - 5):i].min()
+        if window_min > 0 and adj_close[i] >= 2 * window_min:
+            return True
+    return False
+
+
+def uncompilable(adj_close):
+    return len({"a": adj_close}) > 0
+
+
+@pytest.fixture()
+def tickers(ticker_sample_data_dir):
+    yield [Ticker(symbol, history)
+           for symbol, history in FileBackedTicketContainer(ticker_sample_data_dir).get_data().items()]
+
+
+def test_column_for_parameter():
+    assert column_for_parameter("adj_close") == "Adj Close"
+    assert column_for_parameter("volume") == "Volume"
+    assert column_for_parameter("date_id") == "date_id"
+    with pytest.raises(ValueError):
+        column_for_parameter("price")
+
+
+def test_kernel_criterion_matches_filter(tickers):
+    criterion = KernelCriterion(doubled_within_5_days, jit=False)
+    assert criterion.columns == ["Adj Close"]
+    assert criterion.is_compiled is False
+    for ticker in tickers:
+        assert criterion(ticker) == price_multi_2_within_5_days(ticker)
+
+
+def test_kernel_criterion_is_created_once():
+    assert kernel_criterion(doubled_within_5_days) is kernel_criterion(doubled_within_5_days)
+
+
+def test_import_kernel_criterion():
+    criterion, = import_criterion_functions([KERNEL_PATH])
+    assert criterion is kernel_criterion(doubled_within_5_days)
+    assert criterion.__name__ == "doubled_within_5_days"
+
+
+def test_main_with_kernel_criterion(ticker_sample_data_dir, tmpdir):
+    result = main(tickers={"GME", "AMC", "TSLA"},
+                  start_date="2020-01-01",
+                  criterion_paths=[KERNEL_PATH],
+                  csv_dir_path=ticker_sample_data_dir,
+                  csv_output_dir_path=tmpdir)
+    expected = main(tickers={"GME", "AMC", "TSLA"},
+                    start_date="2020-01-01",
+                    criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                    csv_dir_path=ticker_sample_data_dir)
+    assert result.get_tickers() == expected.get_tickers()
+
+
+def test_compiled_kernel_criterion(tickers):
+    pytest.importorskip("numba")
+    criterion = KernelCriterion(doubled_within_5_days)
+    assert criterion.is_compiled is None
+    results = [criterion(ticker) for ticker in tickers]
+    assert criterion.is_compiled
+    assert results == [price_multi_2_within_5_days(ticker) for ticker in tickers]
+
+
+def test_uncompilable_kernel_falls_back_to_python(tickers):
+    pytest.importorskip("numba")
+    criterion = KernelCriterion(uncompilable)
+    assert criterion(tickers[0])
+    assert criterion.is_compiled is False
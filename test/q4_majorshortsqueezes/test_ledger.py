@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.api.pull_data import main, StageConcurrency
+from q4_majorshortsqueezes.ledger import FailureLedger
+from q4_majorshortsqueezes.retry import DownloadError, RetryPolicy
+
+
+def test_ledger_is_persisted(tmpdir):
+    path = str(tmpdir.join("ledger.json"))
+    ledger = FailureLedger(path)
+    ledger.record_failure("GME", ValueError("No price data found."))
+    ledger.record_failure("GME", DownloadError("Failed 3 times."))
+    ledger.record_failure("AMC", ValueError("No price data found."))
+    ledger.record_success("AMC")
+    ledger.save()
+
+    entries = FailureLedger(path).entries
+    assert list(entries) == ["GME"]
+    assert entries["GME"].attempts == 2
+    assert entries["GME"].error_class == "DownloadError"
+
+
+def test_ledger_records_cause(tmpdir):
+    ledger = FailureLedger(str(tmpdir.join("ledger.json")))
+    try:
+        raise DownloadError("Failed 3 times.") from OSError("Connection reset")
+    except DownloadError as error:
+        ledger.record_failure("GME", error)
+
+    assert ledger.entries["GME"].error_class == "OSError"
+    assert ledger.entries["GME"].message == "Connection reset"
+
+
+class FlakyDownloader:
+    """Downloads from the sample data, but fails for the given tickers with network errors."""
+    def __init__(self, data_dir, failing):
+        self.data_dir = data_dir
+        self.failing = set(failing)
+
+    def __call__(self, ticker, start_date, end_date=None):
+        if ticker in self.failing:
+            raise OSError("Connection reset")
+        ticker_history = pd.read_csv(os.path.join(self.data_dir, f"{ticker}.csv"), index_col="Date",
+                                     parse_dates=True)
+        return ticker_history[["Open", "High", "Low", "Close", "Adj Close", "Volume"]]
+
+
+@pytest.mark.parametrize("concurrency", [None, StageConcurrency()])
+def test_retry_failed_tickers(ticker_sample_data_dir, tmpdir, concurrency):
+    ledger_path = str(tmpdir.join("ledger.json"))
+    retry_policy = RetryPolicy(max_attempts=2, backoff_seconds=0)
+    criterion_paths = ["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"]
+
+    result = main(tickers={"GME", "AMC", "TSLA"}, start_date=None, criterion_paths=criterion_paths,
+                  concurrency=concurrency, ledger=FailureLedger(ledger_path), retry_policy=retry_policy,
+                  downloader=FlakyDownloader(ticker_sample_data_dir, failing={"GME", "TSLA"}))
+
+    assert result.get_tickers() == ["AMC"]
+    ledger = FailureLedger(ledger_path)
+    assert ledger.symbols() == ["GME", "TSLA"]
+    assert ledger.entries["GME"].error_class == "OSError"
+
+    result = main(tickers=set(ledger.symbols()), start_date=None, criterion_paths=criterion_paths,
+                  concurrency=concurrency, ledger=ledger, retry_policy=retry_policy,
+                  downloader=FlakyDownloader(ticker_sample_data_dir, failing={"TSLA"}))
+
+    assert result.get_tickers() == ["GME"]
+    ledger = FailureLedger(ledger_path)
+    assert ledger.symbols() == ["TSLA"]
+    assert ledger.entries["TSLA"].attempts == 2
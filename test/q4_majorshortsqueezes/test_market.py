@@ -0,0 +1,50 @@
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from q4_majorshortsqueezes.filter import window_multiples
+from q4_majorshortsqueezes.market import active_squeeze_counts, trading_calendar
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, Ticker
+
+THRESHOLDS = [(2, 5), (3, 5), (2, 10)]
+
+
+def test_active_squeeze_counts_match_filter(ticker_sample_data_dir):
+    container = FileBackedTicketContainer(ticker_sample_data_dir)
+    result = active_squeeze_counts(container, THRESHOLDS, chunk_size=2)
+
+    calendar = trading_calendar(container)
+    assert result.index.equals(calendar)
+    assert result.loc["2021-01-27", "multi_2_days_5"] > 0
+
+    expected = pd.DataFrame(0, index=calendar, columns=[*(f"multi_{m}_days_{d}" for m, d in THRESHOLDS), "listed"])
+    for symbol, ticker_history in container.get_data().items():
+        ticker = Ticker(symbol, ticker_history)
+        expected.loc[ticker_history.index, "listed"] += 1
+        for multiplier, days in THRESHOLDS:
+            with np.errstate(invalid="ignore"):
+                satisfied = window_multiples(ticker, "Adj Close", "Adj Close", days) >= multiplier
+            expected.loc[ticker_history.index[satisfied], f"multi_{multiplier}_days_{days}"] += 1
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+
+def test_active_squeeze_counts_on_a_given_calendar(ticker_sample_data_dir):
+    container = FileBackedTicketContainer(ticker_sample_data_dir)
+    calendar = pd.Index(["2021-01-26", "2021-01-27", "2021-01-30"])
+    result = active_squeeze_counts(container, [(2, 1)], calendar=calendar)
+    assert result["listed"].tolist() == [3, 3, 0]
+    assert result["multi_2_days_1"].tolist()[2] == 0
+
+
+def test_trading_calendar_loads_chunks_of_tickers(ticker_sample_data_dir):
+    container = FileBackedTicketContainer(ticker_sample_data_dir)
+    expected = pd.Index(sorted({date for ticker_history in container.get_data().values()
+                                for date in ticker_history.index}))
+
+    with mock.patch.object(container, "get_data", wraps=container.get_data) as get_data:
+        calendar = trading_calendar(container, chunk_size=2)
+
+    assert calendar.tolist() == expected.tolist()
+    assert get_data.call_count == 2
+    assert all(len(call.kwargs["tickers"]) <= 2 for call in get_data.call_args_list)
@@ -0,0 +1,70 @@
+import json
+import os
+
+from q4_majorshortsqueezes.metrics import Metrics, NullMetrics
+
+
+class TestMetrics:
+    def test_stage(self):
+        metrics = Metrics()
+
+        with metrics.stage("download"):
+            pass
+        with metrics.stage("download"):
+            pass
+
+        assert metrics.stages["download"].calls == 2
+        assert metrics.stages["download"].wall_seconds >= 0
+
+    def test_increment(self):
+        metrics = Metrics()
+
+        metrics.increment("tickers_processed")
+        metrics.increment("bytes_read", 100)
+        metrics.increment("bytes_read", 50)
+
+        assert metrics.counters == {"tickers_processed": 1, "bytes_read": 150}
+
+    def test_observe(self):
+        metrics = Metrics()
+
+        metrics.observe("queue_depth:fetch", 2)
+        metrics.observe("queue_depth:fetch", 4)
+
+        assert metrics.observations["queue_depth:fetch"].count == 2
+        assert metrics.observations["queue_depth:fetch"].mean == 3
+        assert metrics.observations["queue_depth:fetch"].max == 4
+
+    def test_write_json_and_prometheus_text(self, tmpdir):
+        metrics = Metrics()
+        with metrics.stage("download"):
+            pass
+        metrics.increment("tickers_processed", 3)
+        metrics.observe("queue_depth:fetch", 2)
+
+        json_path = os.path.join(tmpdir, "metrics.json")
+        metrics.write(json_path)
+        with open(json_path) as fd:
+            assert json.load(fd)["counters"] == {"tickers_processed": 3}
+
+        prom_path = os.path.join(tmpdir, "metrics.prom")
+        metrics.write(prom_path)
+        with open(prom_path) as fd:
+            content = fd.read()
+        assert 'q4_stage_calls_total{stage="download"} 1' in content
+        assert "q4_tickers_processed_total 3" in content
+        assert 'q4_observation_max{observation="queue_depth:fetch"} 2' in content
+
+
+class TestNullMetrics:
+    def test_ignores_measurements(self):
+        metrics = NullMetrics()
+
+        with metrics.stage("download"):
+            pass
+        metrics.increment("tickers_processed")
+        metrics.observe("queue_depth:fetch", 2)
+
+        assert metrics.stages == {}
+        assert metrics.counters == {}
+        assert metrics.observations == {}
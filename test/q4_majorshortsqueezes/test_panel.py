@@ -0,0 +1,51 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from q4_majorshortsqueezes.filter import multiply_price_within_x_days
+from q4_majorshortsqueezes.panel import evaluate_criteria, SharedPanel
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, Ticker
+
+
+@pytest.fixture()
+def ticker_histories(ticker_sample_data_dir):
+    yield FileBackedTicketContainer(ticker_sample_data_dir).get_data()
+
+
+def test_panel_tickers_are_views_of_the_histories(ticker_histories):
+    with SharedPanel.create(ticker_histories) as panel:
+        assert panel.symbols == ["AMC", "GME", "TSLA"]
+        for symbol, ticker_history in ticker_histories.items():
+            ticker = panel.ticker(symbol)
+            np.testing.assert_array_equal(ticker.values("Adj Close"), ticker_history["Adj Close"].to_numpy())
+            np.testing.assert_array_equal(ticker.dates(), ticker_history.index.to_numpy())
+            assert not ticker.values("Adj Close").flags.writeable
+            assert ticker.history.equals(ticker_history)
+
+
+def test_panel_tickers_satisfy_the_same_criteria(ticker_histories):
+    with SharedPanel.create(ticker_histories) as panel:
+        for symbol, ticker_history in ticker_histories.items():
+            for multiplier in [2, 5, 50]:
+                assert multiply_price_within_x_days(panel.ticker(symbol), multiplier, 5) \
+                       == multiply_price_within_x_days(Ticker(symbol, ticker_history), multiplier, 5)
+
+
+def test_evaluate_criteria(ticker_histories):
+    with SharedPanel.create(ticker_histories) as panel:
+        result = evaluate_criteria(panel, ["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                                   max_workers=2, chunk_size=1)
+
+    assert result == {"AMC": True, "GME": True, "TSLA": False}
+
+
+def test_close_removes_the_shared_memory(ticker_histories):
+    panel = SharedPanel.create(ticker_histories)
+    block_names = [name for name, _ in panel.layout.columns.values()]
+
+    panel.close()
+
+    for name in block_names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from q4_majorshortsqueezes.metrics import Metrics
+from q4_majorshortsqueezes.pipeline import Pipeline, PipelineStage
+
+
+def test_run_keeps_order_with_single_workers():
+    results = []
+    pipeline = Pipeline([PipelineStage("double", lambda item: item * 2),
+                         PipelineStage("collect", results.append)], queue_size=2)
+
+    pipeline.run(range(100))
+
+    assert results == [item * 2 for item in range(100)]
+
+
+def test_run_with_concurrent_workers():
+    results = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = Pipeline([PipelineStage("double", lambda item: item * 2, workers=4),
+                         PipelineStage("collect", collect, workers=2)], queue_size=2)
+
+    pipeline.run(range(100))
+
+    assert sorted(results) == [item * 2 for item in range(100)]
+
+
+def test_run_drops_items():
+    results = []
+    pipeline = Pipeline([PipelineStage("even", lambda item: item if item % 2 == 0 else None),
+                         PipelineStage("collect", results.append)])
+
+    pipeline.run(range(10))
+
+    assert results == [0, 2, 4, 6, 8]
+
+
+def test_run_isolates_value_errors():
+    def fail_on_three(item):
+        if item == 3:
+            raise ValueError("Invalid item")
+        return item
+
+    results, failed = [], []
+    pipeline = Pipeline([PipelineStage("check", fail_on_three), PipelineStage("collect", results.append)],
+                        on_error=failed.append)
+
+    pipeline.run(range(5))
+
+    assert results == [0, 1, 2, 4]
+    assert failed == [3]
+
+
+def test_run_raises_other_errors():
+    def fail(item):
+        raise RuntimeError("Broken stage")
+
+    pipeline = Pipeline([PipelineStage("fail", fail), PipelineStage("collect", lambda item: None)], queue_size=1)
+
+    with pytest.raises(RuntimeError):
+        pipeline.run(range(100))
+
+
+def test_run_observes_queue_depths():
+    metrics = Metrics()
+    pipeline = Pipeline([PipelineStage("first", lambda item: item), PipelineStage("second", lambda item: None)],
+                        queue_size=4, metrics=metrics)
+
+    pipeline.run(range(10))
+
+    assert metrics.observations["queue_depth:first"].count == 10
+    assert metrics.observations["queue_depth:second"].count == 10
+    assert metrics.observations["queue_depth:first"].max <= 4
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from q4_majorshortsqueezes.metrics import Metrics
+from q4_majorshortsqueezes.planner import CriterionPlanner
+from q4_majorshortsqueezes.ticker import Ticker, TickerHistory
+
+
+def ticker(symbol: str) -> Ticker:
+    return Ticker(symbol, MagicMock(spec=TickerHistory))
+
+
+class TestCriterionPlanner:
+    def test_keeps_given_order_without_estimates(self):
+        planner = CriterionPlanner()
+        planner.add("first", lambda t: True)
+        planner.add("second", lambda t: True)
+
+        assert [c.name for c in planner.plan()] == ["first", "second"]
+
+    def test_orders_by_given_estimates(self):
+        planner = CriterionPlanner()
+        planner.add("expensive", lambda t: True, cost=1.0, selectivity=0.1)
+        planner.add("cheap", lambda t: True, cost=0.01, selectivity=0.1)
+        planner.add("not_selective", lambda t: True, cost=0.001, selectivity=1.0)
+
+        assert [c.name for c in planner.plan()] == ["cheap", "expensive", "not_selective"]
+
+    def test_learns_selectivity(self):
+        planner = CriterionPlanner()
+        planner.add("always", lambda t: True, cost=1.0)
+        planner.add("only_gme", lambda t: t.symbol == "GME", cost=1.0)
+
+        for symbol in ["GME", "AMC", "TSLA", "SPY"]:
+            planner.evaluate(ticker(symbol))
+
+        assert [c.name for c in planner.plan()] == ["only_gme", "always"]
+
+    def test_evaluate_short_circuits(self):
+        calls = []
+        planner = CriterionPlanner()
+        planner.add("reject", lambda t: calls.append("reject") and False)
+        planner.add("accept", lambda t: calls.append("accept") or True)
+
+        assert not planner.evaluate(ticker("GME"))
+        assert calls == ["reject"]
+
+    def test_evaluate_reports_metrics(self):
+        metrics = Metrics()
+        planner = CriterionPlanner(metrics=metrics)
+        planner.add("accept", lambda t: True)
+
+        assert planner.evaluate(ticker("GME"))
+        assert metrics.stages["criterion:accept"].calls == 1
+
+    def test_concurrent_evaluations_are_counted(self):
+        planner = CriterionPlanner()
+        planner.add("only_gme", lambda t: t.symbol == "GME")
+        symbols = ["GME", "AMC"] * 500
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda symbol: planner.evaluate(ticker(symbol)), symbols))
+
+        planned, = planner.plan()
+        assert planned.evaluations == len(symbols)
+        assert planned.passes == len(symbols) // 2
@@ -0,0 +1,37 @@
+import os
+from unittest.mock import MagicMock
+
+from q4_majorshortsqueezes.profiling import CriterionProfiler
+from q4_majorshortsqueezes.ticker import Ticker, TickerHistory
+
+
+class TestCriterionProfiler:
+    def test_wrap_criterion(self):
+        profiler = CriterionProfiler()
+        criterion = profiler.wrap_criterion("my.module/criterion", lambda t: t.symbol == "GME")
+
+        assert criterion(Ticker("GME", MagicMock(spec=TickerHistory)))
+        assert not criterion(Ticker("AMC", MagicMock(spec=TickerHistory)))
+        assert [ticker for _, ticker in profiler.slowest_tickers("my.module/criterion")] \
+               in (["GME", "AMC"], ["AMC", "GME"])
+
+    def test_slowest_tickers_limited_to_top_n(self):
+        profiler = CriterionProfiler(top_n=2)
+        for ticker in ["GME", "AMC", "TSLA"]:
+            with profiler.profile("csv_load", ticker):
+                pass
+
+        assert len(profiler.slowest_tickers("csv_load")) == 2
+
+    def test_write_report(self, tmpdir):
+        profiler = CriterionProfiler()
+        criterion = profiler.wrap_criterion("my.module/criterion", lambda t: True)
+        criterion(Ticker("GME", MagicMock(spec=TickerHistory)))
+
+        report_path = profiler.write_report(tmpdir)
+
+        assert os.path.exists(os.path.join(tmpdir, "my.module_criterion.prof"))
+        with open(report_path) as fd:
+            report = fd.read()
+        assert "=== my.module/criterion ===" in report
+        assert "GME" in report
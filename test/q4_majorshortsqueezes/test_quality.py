@@ -0,0 +1,131 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.api.pull_data import main
+from q4_majorshortsqueezes.filter import price_multi_2_within_5_days
+from q4_majorshortsqueezes.quality import QualityIndex, validate_ticker_history
+from q4_majorshortsqueezes.summary import TickerSummaryIndex
+from q4_majorshortsqueezes.ticker import FileBackedTicketContainer, store_ticker_to_csv, Ticker
+
+
+def price_history(close, open_=None):
+    close = np.asarray(close, dtype=float)
+    open_ = close if open_ is None else np.asarray(open_, dtype=float)
+    dates = pd.bdate_range("2021-01-04", periods=len(close)).strftime("%Y-%m-%d")
+    return pd.DataFrame({"Open": open_, "High": np.fmax(open_, close), "Low": np.fmin(open_, close),
+                         "Close": close, "Adj Close": close, "Volume": 1000},
+                        index=pd.Index(dates, name="Date"))
+
+
+def test_sample_data_is_clean(ticker_sample_data_dir):
+    for ticker_history in FileBackedTicketContainer(ticker_sample_data_dir).get_data().values():
+        report, checked_history = validate_ticker_history(ticker_history, repair=True)
+        assert not report.needs_repair
+        assert checked_history is ticker_history
+
+
+def test_invalid_rows_are_dropped():
+    ticker_history = price_history([10, 0, 11, np.nan, -1, 12])
+
+    report, repaired = validate_ticker_history(ticker_history, repair=True)
+
+    assert report.invalid_rows == 3
+    assert repaired["Close"].tolist() == [10, 11, 12]
+
+
+def test_unadjusted_split_is_undone():
+    # A 2:1 split whose prices before the split are not adjusted
+    ticker_history = price_history([20, 21, 22, 11.1, 11.5, 11.2], open_=[20, 20.5, 21.5, 11, 11.2, 11.4])
+
+    report, repaired = validate_ticker_history(ticker_history, repair=True)
+
+    assert report.split_artifacts == 1
+    np.testing.assert_allclose(repaired["Close"], [10, 10.5, 11, 11.1, 11.5, 11.2])
+    assert not price_multi_2_within_5_days(Ticker("TEST", repaired))
+
+
+def test_spike_is_undone():
+    ticker_history = price_history([10, 10.2, 102, 10.1, 10.3], open_=[10, 10.1, 101, 10.2, 10.2])
+
+    report, repaired = validate_ticker_history(ticker_history, repair=True)
+
+    assert report.split_artifacts == 2
+    np.testing.assert_allclose(repaired["Close"], [10, 10.2, 10.2, 10.1, 10.3])
+
+
+def test_genuine_jumps_are_kept():
+    # The price doubles during the day, hence the open is not at the new level
+    ticker_history = price_history([10, 10.5, 21, 30], open_=[10, 10.2, 11, 22])
+
+    report, repaired = validate_ticker_history(ticker_history, repair=True)
+
+    assert report.split_artifacts == 0
+    assert repaired is ticker_history
+
+
+def test_flag_mode_keeps_the_history():
+    ticker_history = price_history([10, 0, 11])
+    dates = ticker_history.index.tolist()
+    ticker_history.index = pd.Index([dates[0], dates[1], "2021-03-01"], name="Date")
+
+    report, checked_history = validate_ticker_history(ticker_history)
+
+    assert (report.invalid_rows, report.gaps) == (1, 1)
+    assert checked_history is ticker_history
+
+
+@pytest.fixture()
+def data_dir(ticker_sample_data_dir, tmpdir):
+    data_dir = shutil.copytree(ticker_sample_data_dir, tmpdir.join("data"),
+                               ignore=shutil.ignore_patterns(TickerSummaryIndex.FILE_NAME))
+    ticker_history = FileBackedTicketContainer(data_dir)["GME"]
+    ticker_history.iloc[10, ticker_history.columns.get_loc("Adj Close")] = 0.0
+    store_ticker_to_csv(ticker_history, os.path.join(data_dir, "GME.csv"))
+    yield str(data_dir)
+
+
+def test_container_repairs_and_caches_reports(data_dir):
+    container = FileBackedTicketContainer(data_dir, quality="repair")
+
+    assert len(container["GME"]) == len(FileBackedTicketContainer(data_dir)["GME"]) - 1
+    assert len(container["AMC"]) == len(FileBackedTicketContainer(data_dir)["AMC"])
+    container.flush()
+
+    reports = QualityIndex(data_dir)
+    assert reports.get("GME", os.path.join(data_dir, "GME.csv")).invalid_rows == 1
+    assert not reports.get("AMC", os.path.join(data_dir, "AMC.csv")).needs_repair
+    # The summary of the stored file does not describe the repaired history
+    assert container.get_summary("GME") is None
+    assert container.get_summary("AMC") is not None
+
+
+def test_pull_data_with_repair(data_dir):
+    result = main(tickers={"GME"}, start_date=None, criterion_paths=[], csv_dir_path=data_dir, quality="repair")
+
+    assert len(result["GME"]) == len(FileBackedTicketContainer(data_dir)["GME"]) - 1
+
+
+def test_adj_close_alone_is_not_checked_for_splits():
+    ticker_history = price_history([20, 21, 22, 11.1, 11.5, 11.2])[["Adj Close"]]
+
+    report, checked_history = validate_ticker_history(ticker_history, repair=True)
+
+    assert report.split_artifacts == 0
+    assert checked_history is ticker_history
+
+
+def test_column_loads_are_validated_on_all_price_columns(ticker_sample_data_dir, data_dir):
+    container = FileBackedTicketContainer(data_dir, quality="repair")
+
+    assert all(ticker_history.columns.empty for ticker_history in container.get_data(columns=[]).values())
+    adj_close = container.get_data(columns=["Adj Close"])
+    assert list(adj_close["GME"].columns) == ["Adj Close"]
+    # The zero price is dropped, the squeezes are kept
+    assert len(adj_close["GME"]) == len(FileBackedTicketContainer(data_dir)["GME"]) - 1
+    for ticker in ["AMC", "GME"]:
+        original = FileBackedTicketContainer(ticker_sample_data_dir)[ticker]["Adj Close"]
+        assert adj_close[ticker]["Adj Close"].max() == original.max()
@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+import yfinance as yf
+from yfinance import shared as yf_shared
+
+from q4_majorshortsqueezes.retry import CircuitBreaker, DownloadError, RetryingDownloader, RetryPolicy
+from q4_majorshortsqueezes.ticker import download_ticker_history
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeDownloader:
+    """Raises the given errors one after another, then returns a price history."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, ticker, start_date, end_date=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return pd.DataFrame({"Close": [1.0]})
+
+
+def retrying(download, clock, **policy):
+    return RetryingDownloader(download, RetryPolicy(**policy), sleep=clock.sleep, clock=clock)
+
+
+def test_retries_with_exponential_backoff():
+    clock = FakeClock()
+    download = FakeDownloader(OSError("Connection reset"), OSError("Connection reset"))
+
+    result = retrying(download, clock, max_attempts=3, backoff_seconds=2)("GME", None)
+
+    assert len(result) == 1
+    assert download.calls == 3
+    assert clock.sleeps == [2, 4]
+
+
+def test_backoff_is_limited():
+    assert RetryPolicy(backoff_seconds=1, max_backoff_seconds=5).backoff(10) == 5
+
+
+def test_fails_after_max_attempts():
+    clock = FakeClock()
+    download = FakeDownloader(*[OSError("Connection reset")] * 3)
+
+    with pytest.raises(DownloadError) as error_info:
+        retrying(download, clock, max_attempts=2)("GME", None)
+
+    assert download.calls == 2
+    assert isinstance(error_info.value, ValueError)
+    assert isinstance(error_info.value.__cause__, OSError)
+
+
+def test_does_not_retry_other_errors():
+    download = FakeDownloader(ValueError("No price data found."))
+
+    with pytest.raises(ValueError, match="No price data"):
+        retrying(download, FakeClock())("UNKNOWN", None)
+
+    assert download.calls == 1
+
+
+def test_throttling_opens_circuit_breaker():
+    clock = FakeClock()
+    download = FakeDownloader(*[RuntimeError("429 Client Error: Too Many Requests")] * 2)
+
+    retrying(download, clock, max_attempts=3, backoff_seconds=1, throttle_threshold=2,
+             throttle_pause_seconds=30)("GME", None)
+
+    # The backoff after the first error, then the backoff and the pause after the second error
+    assert clock.sleeps == [1, 2, 28]
+
+
+def test_circuit_breaker_resets_on_success():
+    clock = FakeClock()
+    breaker = CircuitBreaker(threshold=2, pause_seconds=10, clock=clock, sleep=clock.sleep)
+
+    breaker.record_throttling()
+    breaker.record_success()
+    breaker.record_throttling()
+    assert not breaker.is_open
+
+    breaker.record_throttling()
+    assert breaker.is_open
+    breaker.wait()
+    assert clock.sleeps == [10]
+    assert not breaker.is_open
+
+
+@pytest.fixture()
+def failing_yf_download(monkeypatch):
+    """Let `yf.download` fail like yfinance does: It records the error and returns an empty frame."""
+    monkeypatch.setattr(yf_shared, "_ERRORS", {})
+
+    def fail_with(error):
+        def download(ticker, *args, **kwargs):
+            yf_shared._ERRORS = {ticker.upper(): error}
+            return pd.DataFrame()
+        monkeypatch.setattr(yf, "download", download)
+    yield fail_with
+
+
+@pytest.mark.parametrize("error", ["YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')",
+                                   "ConnectionError('Connection aborted.')"])
+def test_retries_recorded_yfinance_errors(failing_yf_download, error):
+    failing_yf_download(error)
+    clock = FakeClock()
+
+    with pytest.raises(DownloadError) as error_info:
+        retrying(download_ticker_history, clock, max_attempts=3, backoff_seconds=1, throttle_threshold=10)("gme", None)
+
+    assert clock.sleeps == [1, 2]
+    assert error in str(error_info.value.__cause__)
+
+
+def test_does_not_retry_missing_price_data(failing_yf_download):
+    failing_yf_download("No data found, symbol may be delisted")
+    clock = FakeClock()
+
+    with pytest.raises(ValueError, match="delisted") as error_info:
+        retrying(download_ticker_history, clock, max_attempts=3)("GME", None)
+
+    assert not isinstance(error_info.value, DownloadError)
+    assert clock.sleeps == []
@@ -0,0 +1,162 @@
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.api.pull_data import main, StageConcurrency
+from q4_majorshortsqueezes.ledger import FailureLedger
+from q4_majorshortsqueezes.retry import RetryPolicy
+from q4_majorshortsqueezes.shard import merge_shards, Shard, shard_of, ShardManifest
+from q4_majorshortsqueezes.synthetic import SyntheticMarketConfig, write_market
+
+CRITERION_PATHS = ["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"]
+
+
+def test_shards_partition_tickers():
+    tickers = {f"T{i}" for i in range(100)}
+    shards = [Shard(index, 3).select(tickers) for index in range(3)]
+
+    assert set.union(*shards) == tickers
+    assert sum(len(shard) for shard in shards) == len(tickers)
+    # The hash is stable across processes and runs
+    assert [shard_of(ticker, 4) for ticker in ["AMC", "GME", "TSLA"]] == [3, 3, 1]
+
+
+def test_invalid_shard():
+    with pytest.raises(ValueError):
+        Shard(3, 3)
+
+
+@pytest.fixture()
+def market_dir(tmpdir):
+    market_dir = str(tmpdir.join("market"))
+    ground_truths = write_market(market_dir, 60, SyntheticMarketConfig(squeeze_probability=0.3), seed=3)
+    yield market_dir, set(ground_truths)
+
+
+def run_shard(market_dir, tickers, output_dir, shard, **kwargs):
+    # The squeeze events are collected from the INFO log
+    root = logging.getLogger()
+    previous_level = root.level
+    root.setLevel(logging.INFO)
+    try:
+        main(tickers=tickers, start_date=None, criterion_paths=CRITERION_PATHS, csv_dir_path=market_dir,
+             csv_output_dir_path=output_dir, shard=shard, **kwargs)
+    finally:
+        root.setLevel(previous_level)
+
+
+class FlakyDownloader:
+    """Downloads from the synthetic market, but fails for the given tickers with network errors."""
+    def __init__(self, market_dir, failing=()):
+        self.market_dir = market_dir
+        self.failing = set(failing)
+
+    def __call__(self, ticker, start_date, end_date=None):
+        if ticker in self.failing:
+            raise OSError("Connection reset")
+        ticker_history = pd.read_csv(os.path.join(self.market_dir, f"{ticker}.csv"), index_col="Date",
+                                     parse_dates=True)
+        return ticker_history[["Open", "High", "Low", "Close", "Adj Close", "Volume"]]
+
+
+@pytest.mark.parametrize("shared_output_dir", [False, True])
+def test_merged_shards_equal_single_run(market_dir, tmpdir, shared_output_dir):
+    market_dir, tickers = market_dir
+    single_dir = str(tmpdir.join("single"))
+    os.mkdir(single_dir)
+    run_shard(market_dir, tickers, single_dir, Shard(0, 1))
+    single_run = ShardManifest.load(os.path.join(single_dir, Shard(0, 1).manifest_file_name))
+
+    shard_dirs = [str(tmpdir.join("shards" if shared_output_dir else f"shard_{index}")) for index in range(3)]
+    for shard_dir in set(shard_dirs):
+        os.mkdir(shard_dir)
+    # Each shard runs in its own process like on separate machines
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        shards = [Shard(index, 3) for index in range(3)]
+        list(pool.map(run_shard, [market_dir] * 3, [tickers] * 3, shard_dirs, shards))
+
+    merged_dir = str(tmpdir.join("merged"))
+    merged = merge_shards(shard_dirs, merged_dir)
+
+    assert single_run.satisfied
+    assert merged.satisfied == single_run.satisfied
+    assert merged.tickers == single_run.tickers
+    assert merged.events == single_run.events
+    for ticker in single_run.satisfied:
+        with open(os.path.join(merged_dir, f"{ticker}.csv")) as fd, \
+                open(os.path.join(single_dir, f"{ticker}.csv")) as single_fd:
+            assert fd.read() == single_fd.read()
+
+
+@pytest.mark.parametrize("concurrency", [None, StageConcurrency()])
+def test_shard_manifest_ignores_stale_ticker_files(market_dir, tmpdir, concurrency):
+    market_dir, tickers = market_dir
+    single_dir = str(tmpdir.join("single"))
+    os.mkdir(single_dir)
+    run_shard(market_dir, tickers, single_dir, Shard(0, 1))
+    single_run = ShardManifest.load(os.path.join(single_dir, Shard(0, 1).manifest_file_name))
+
+    # An earlier run left the file of a ticker behind, which does not satisfy the criteria of this run
+    output_dir = str(tmpdir.join("shard"))
+    os.mkdir(output_dir)
+    shard = Shard(0, 2)
+    stale_ticker = sorted(shard.select(tickers) - set(single_run.satisfied))[0]
+    shutil.copyfile(os.path.join(market_dir, f"{stale_ticker}.csv"), os.path.join(output_dir, f"{stale_ticker}.csv"))
+    run_shard(market_dir, tickers, output_dir, shard, concurrency=concurrency)
+    manifest = ShardManifest.load(os.path.join(output_dir, shard.manifest_file_name))
+
+    assert stale_ticker not in manifest.satisfied
+    assert manifest.satisfied == sorted(shard.select(single_run.satisfied))
+
+
+def test_merge_needs_all_shards(market_dir, tmpdir):
+    market_dir, tickers = market_dir
+    output_dir = str(tmpdir.join("shards"))
+    os.mkdir(output_dir)
+    run_shard(market_dir, tickers, output_dir, Shard(0, 2))
+
+    with pytest.raises(ValueError, match=r"missing: \[1\]"):
+        merge_shards([output_dir], output_dir)
+
+    run_shard(market_dir, tickers - {"T00000"}, output_dir, Shard(1, 2))
+    with pytest.raises(ValueError, match="different tickers"):
+        merge_shards([output_dir], output_dir)
+
+
+def test_retried_shard_updates_its_manifest(market_dir, tmpdir):
+    market_dir, tickers = market_dir
+    single_dir = str(tmpdir.join("single"))
+    os.mkdir(single_dir)
+    run_shard(None, tickers, single_dir, Shard(0, 1), downloader=FlakyDownloader(market_dir))
+    single_run = ShardManifest.load(os.path.join(single_dir, Shard(0, 1).manifest_file_name))
+
+    output_dir = str(tmpdir.join("shards"))
+    os.mkdir(output_dir)
+    shard = Shard(0, 2)
+    satisfied = sorted(shard.select(single_run.satisfied))
+    failing = set(satisfied[:2]) | set(sorted(shard.select(tickers) - set(satisfied))[:1])
+    ledger = FailureLedger(str(tmpdir.join("ledger.json")))
+    retry_policy = RetryPolicy(max_attempts=2, backoff_seconds=0)
+    run_shard(None, tickers, output_dir, shard, ledger=ledger, retry_policy=retry_policy,
+              downloader=FlakyDownloader(market_dir, failing))
+    assert sorted(failing) == ledger.symbols()
+
+    run_shard(None, set(ledger.symbols()), output_dir, shard, ledger=ledger, retry_policy=retry_policy,
+              downloader=FlakyDownloader(market_dir), update_shard_manifest=True)
+    run_shard(None, tickers, output_dir, Shard(1, 2), downloader=FlakyDownloader(market_dir))
+    merged = merge_shards([output_dir], output_dir)
+
+    assert not ledger.entries
+    assert merged.satisfied == single_run.satisfied
+    assert merged.tickers == single_run.tickers
+    assert merged.events == single_run.events
+
+
+def test_update_needs_shard_manifest(market_dir, tmpdir):
+    market_dir, tickers = market_dir
+    with pytest.raises(ValueError, match="manifest"):
+        run_shard(market_dir, tickers, str(tmpdir), Shard(0, 2), update_shard_manifest=True)
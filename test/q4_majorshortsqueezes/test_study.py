@@ -0,0 +1,110 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from q4_majorshortsqueezes.study import build_study_steps, market_cap_buckets, run_steps, Step, StudyManifest
+
+
+def fail():
+    raise ValueError("Step failed")
+
+
+def do_nothing():
+    pass
+
+
+@pytest.fixture()
+def study_dirs(ticker_sample_data_dir, tmpdir):
+    data_dir = tmpdir.mkdir("data")
+    results_dir = tmpdir.mkdir("results")
+    for exchange in ["nyse", "amex"]:
+        shutil.copytree(ticker_sample_data_dir, data_dir.join(f"ticker_data__{exchange}_min_10m"))
+    yield str(data_dir), str(results_dir)
+
+
+def test_run_study(study_dirs):
+    data_dir, results_dir = study_dirs
+    steps = build_study_steps(data_dir, results_dir, exchanges=["nyse", "amex"], market_caps=[10],
+                              multipliers=[2, 5], days=[5])
+    manifest = StudyManifest(os.path.join(results_dir, "manifest.json"))
+
+    run_steps(steps, manifest, max_workers=2)
+
+    with open(os.path.join(results_dir, "unfiltered_ticker_counts.csv")) as fd:
+        assert fd.read() == "Exchange,Min Marketcap,Ticket Count\nnyse,10,3\namex,10,3\n"
+    with open(os.path.join(results_dir, "nyse_min_10_multi_2_days_5.csv"), newline="") as fd:
+        rows = list(csv.reader(fd))
+    assert rows[0] == ["Ticker", "Date", "Adj Close", "Increase"]
+    assert [row[0] for row in rows[1:]] == ["AMC", "GME"]
+    assert sorted(os.listdir(os.path.join(data_dir, "ticker_data__amex_min_10_multi_2_days_5"))) \
+           == [".ticker_summaries.json", "AMC.csv", "GME.csv"]
+    assert set(StudyManifest(manifest.path).completed) == {step.step_id for step in steps}
+
+
+def test_run_study_with_nested_market_caps(study_dirs):
+    data_dir, results_dir = study_dirs
+    # Only GME belongs to the larger market cap bucket
+    os.mkdir(os.path.join(data_dir, "ticker_data__nyse_min_100m"))
+    shutil.copy(os.path.join(data_dir, "ticker_data__nyse_min_10m", "GME.csv"),
+                os.path.join(data_dir, "ticker_data__nyse_min_100m", "GME.csv"))
+    steps = build_study_steps(data_dir, results_dir, exchanges=["nyse"], market_caps=[100, 10],
+                              multipliers=[2], days=[5])
+
+    run_steps(steps, StudyManifest(os.path.join(results_dir, "manifest.json")), max_workers=1)
+
+    for market_cap, expected_tickers in [(10, ["AMC", "GME"]), (100, ["GME"])]:
+        with open(os.path.join(results_dir, f"nyse_min_{market_cap}_multi_2_days_5.csv"), newline="") as fd:
+            assert [row[0] for row in list(csv.reader(fd))[1:]] == expected_tickers
+        output_dir = os.path.join(data_dir, f"ticker_data__nyse_min_{market_cap}_multi_2_days_5")
+        assert sorted(os.listdir(output_dir)) == [".ticker_summaries.json"] + [f"{t}.csv" for t in expected_tickers]
+
+
+def test_run_study_with_blob_dir(study_dirs):
+    data_dir, results_dir = study_dirs
+    blob_dir = os.path.join(data_dir, "blobs")
+    steps = build_study_steps(data_dir, results_dir, exchanges=["nyse", "amex"], market_caps=[10],
+                              multipliers=[2, 3], days=[5], blob_dir=blob_dir)
+
+    run_steps(steps, StudyManifest(os.path.join(results_dir, "manifest.json")), max_workers=2)
+
+    gme_files = [os.path.join(data_dir, f"ticker_data__{exchange}_min_10_multi_{multiplier}_days_5", "GME.csv")
+                 for exchange in ["nyse", "amex"] for multiplier in [2, 3]]
+    assert all(os.path.samefile(gme_files[0], gme_file) for gme_file in gme_files)
+    with open(gme_files[0]) as fd, open(os.path.join(data_dir, "ticker_data__nyse_min_10m", "GME.csv")) as source_fd:
+        assert fd.read() == source_fd.read()
+
+
+def test_market_cap_buckets(study_dirs):
+    data_dir, _ = study_dirs
+    os.mkdir(os.path.join(data_dir, "ticker_data__nyse_min_1000m"))
+    shutil.copy(os.path.join(data_dir, "ticker_data__nyse_min_10m", "GME.csv"),
+                os.path.join(data_dir, "ticker_data__nyse_min_1000m", "GME.csv"))
+    os.mkdir(os.path.join(data_dir, "ticker_data__nyse_min_100m"))
+
+    buckets = market_cap_buckets(data_dir, "nyse", [1000, 100, 10])
+
+    assert buckets["GME"] == [10, 1000]
+    assert buckets["AMC"] == [10]
+
+
+def test_run_steps_resumes_from_manifest(tmpdir):
+    manifest = StudyManifest(os.path.join(tmpdir, "manifest.json"))
+    manifest.mark_completed("failing")
+
+    # The failing step is not run again, since it is already completed
+    run_steps([Step("failing", fail, ()), Step("next", do_nothing, (), dependencies=["failing"])], manifest)
+
+    assert set(manifest.completed) == {"failing", "next"}
+
+
+def test_run_steps_skips_dependents_of_failed_steps(tmpdir):
+    manifest = StudyManifest(os.path.join(tmpdir, "manifest.json"))
+
+    with pytest.raises(RuntimeError):
+        run_steps([Step("failing", fail, ()),
+                   Step("dependent", do_nothing, (), dependencies=["failing"]),
+                   Step("independent", do_nothing, ())], manifest)
+
+    assert set(manifest.completed) == {"independent"}
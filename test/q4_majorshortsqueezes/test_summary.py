@@ -0,0 +1,68 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import pandas as pd
+
+from q4_majorshortsqueezes.summary import summarize_ticker_history, TickerSummaryIndex
+
+
+def store_adj_close(dir_path, prices) -> Tuple[str, pd.DataFrame]:
+    dates = pd.bdate_range("2021-01-04", periods=len(prices)).strftime("%Y-%m-%d")
+    ticker_history = pd.DataFrame({"Adj Close": prices}, index=pd.Index(dates, name="Date"))
+    path = os.path.join(dir_path, "GME.csv")
+    ticker_history.to_csv(path)
+    return path, ticker_history
+
+
+def test_summarize_ticker_history(tmpdir):
+    path, ticker_history = store_adj_close(tmpdir, [4.0, 2.0, 3.0, 8.0, 1.0])
+
+    summary = summarize_ticker_history(ticker_history, path)
+
+    assert summary.row_count == 5
+    assert summary.min == 1.0
+    assert summary.max == 8.0
+    assert summary.max_running_ratio == 4.0
+    assert summary.last_date == "2021-01-08"
+
+
+def test_summarize_ticker_history_with_non_positive_prices(tmpdir):
+    path, ticker_history = store_adj_close(tmpdir, [4.0, 0.0, 3.0])
+
+    assert math.isinf(summarize_ticker_history(ticker_history, path).max_running_ratio)
+
+
+class TestTickerSummaryIndex:
+    def test_save_and_load(self, tmpdir):
+        path, ticker_history = store_adj_close(tmpdir, [1.0, 2.0])
+        index = TickerSummaryIndex(tmpdir)
+        index.update("GME", path, ticker_history)
+        index.save()
+
+        loaded_index = TickerSummaryIndex(tmpdir)
+        assert loaded_index.get("GME", path) == index.get("GME", path)
+        assert loaded_index.get("GME", path).max_running_ratio == 2.0
+        assert loaded_index.get("AMC", path) is None
+
+    def test_outdated_summary_is_ignored(self, tmpdir):
+        path, ticker_history = store_adj_close(tmpdir, [1.0, 2.0])
+        index = TickerSummaryIndex(tmpdir)
+        index.update("GME", path, ticker_history)
+
+        store_adj_close(tmpdir, [1.0, 2.0, 3.0])
+
+        assert index.get("GME", path) is None
+
+    def test_concurrent_updates(self, tmpdir):
+        path, ticker_history = store_adj_close(tmpdir, [1.0, 2.0])
+        tickers = [f"T{i}" for i in range(200)]
+        index = TickerSummaryIndex(tmpdir)
+
+        # The index is loaded by the first of the threads, while others put their records already
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda ticker: (index.update(ticker, path, ticker_history), index.save()), tickers))
+
+        loaded_index = TickerSummaryIndex(tmpdir)
+        assert all(loaded_index.get(ticker, path) is not None for ticker in tickers)
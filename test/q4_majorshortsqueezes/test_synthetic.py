@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.api.pull_data import main
+from q4_majorshortsqueezes.filter import price_multi_criterion
+from q4_majorshortsqueezes.quality import validate_ticker_history
+from q4_majorshortsqueezes.synthetic import (
+    generate_market,
+    generate_ticker_history,
+    load_ground_truth,
+    SyntheticMarketConfig,
+    write_market,
+)
+from q4_majorshortsqueezes.ticker import load_ticker_history_from_csv, Ticker
+
+CONFIG = SyntheticMarketConfig(squeeze_probability=0.3, gap_probability=0.3, bad_row_probability=0.3)
+
+
+def test_same_seed_yields_same_history():
+    first, first_truth = generate_ticker_history("T", seed=7, squeezes=1, gaps=1, bad_rows=1)
+    second, second_truth = generate_ticker_history("T", seed=7, squeezes=1, gaps=1, bad_rows=1)
+    other, _ = generate_ticker_history("T", seed=8, squeezes=1, gaps=1, bad_rows=1)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first_truth == second_truth
+    assert not first.equals(other)
+
+
+def test_history_has_csv_layout(ticker_sample_data_dir, tmpdir):
+    write_market(str(tmpdir), 1)
+
+    loaded = load_ticker_history_from_csv(str(tmpdir.join("T00000.csv")))
+    sample = load_ticker_history_from_csv(os.path.join(ticker_sample_data_dir, "GME.csv"))
+    assert loaded.dtypes.equals(sample.dtypes)
+    assert loaded.index.name == sample.index.name
+    assert len(loaded) == SyntheticMarketConfig.rows
+
+
+def test_too_many_events():
+    with pytest.raises(ValueError, match="too few"):
+        generate_ticker_history("T", config=SyntheticMarketConfig(rows=50), squeezes=2)
+
+
+@pytest.mark.parametrize("multiplier, days", [(2, 5), (3, 4), (3, 5), (3, 10), (5, 10), (1.2, 1), (8, 20)])
+def test_filters_find_the_injected_squeezes(multiplier, days):
+    criterion = price_multi_criterion(multiplier=multiplier, days=days)
+    histories = list(generate_market(200, CONFIG))
+
+    assert any(ground_truth.squeezes for _, ground_truth in histories)
+    for ticker_history, ground_truth in histories:
+        assert criterion(Ticker(ground_truth.ticker, ticker_history)) == ground_truth.has_squeeze(multiplier, days)
+
+
+def test_ground_truth_covers_limited_windows():
+    _, ground_truth = generate_ticker_history("T")
+    with pytest.raises(ValueError, match="1 to 20 days"):
+        ground_truth.has_squeeze(2, 21)
+
+
+def test_quality_finds_the_injected_issues():
+    for ticker_history, ground_truth in generate_market(200, CONFIG):
+        report, _ = validate_ticker_history(ticker_history)
+        assert report.invalid_rows == len(ground_truth.bad_dates)
+        assert report.gaps == len(ground_truth.gap_dates)
+        assert report.split_artifacts == 0
+
+
+def test_pull_data_from_synthetic_market(tmpdir):
+    ground_truths = write_market(str(tmpdir), 100, CONFIG, seed=1)
+
+    result = main(tickers=set(ground_truths), start_date=None,
+                  criterion_paths=["q4_majorshortsqueezes.filter/price_multi_2_within_5_days"],
+                  csv_dir_path=str(tmpdir))
+
+    assert load_ground_truth(str(tmpdir)) == ground_truths
+    assert result.get_tickers() == sorted(ticker for ticker, ground_truth in ground_truths.items()
+                                          if ground_truth.has_squeeze(2, 5))
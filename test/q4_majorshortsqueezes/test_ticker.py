@@ -1,20 +1,36 @@
+import io
 import os
+import pandas as pd
 import pytest
+import shutil
 
 from unittest.mock import MagicMock
 
+from q4_majorshortsqueezes.summary import TickerSummaryIndex
 from q4_majorshortsqueezes.ticker import (
     FileBackedTicketContainer,
     load_ticker_history,
+    load_ticker_histories_from_csv,
     load_ticker_history_from_csv,
     InMemoryTickerContainer,
     retrieve_tickers_with_get_all_tickers_package,
     store_ticker_to_csv,
     Ticker,
+    TICKER_HISTORY_DTYPES,
     TickerHistory,
 )
 
 
+class TestTicker:
+    def test_shared_values_are_computed_once(self):
+        ticker = Ticker("GME", MagicMock(spec=TickerHistory))
+        compute = MagicMock(return_value=42)
+
+        assert ticker.shared("key", compute) == 42
+        assert ticker.shared("key", compute) == 42
+        compute.assert_called_once()
+
+
 class TestInMemoryTickerContainer:
     def test_add_with_single_criterion(self):
         container = InMemoryTickerContainer()
@@ -63,6 +79,62 @@ class TestFileBackedTicketContainer:
         ticker = tickers[0]
         assert len(new_container.get_data()[ticker]) == len(sample_data_container.get_data()[ticker])
 
+    def test_date_range(self, ticker_sample_data_dir, tmpdir):
+        source_dir = shutil.copytree(ticker_sample_data_dir, tmpdir.join("source"),
+                                     ignore=shutil.ignore_patterns(TickerSummaryIndex.FILE_NAME))
+        container = FileBackedTicketContainer(source_dir, start_date="2021-01-04", end_date="2021-01-29")
+
+        ticker_history = container["GME"]
+
+        assert ticker_history.index[0] == "2021-01-04"
+        assert ticker_history.index[-1] == "2021-01-29"
+        # Summaries describe the whole history, hence they are not computed from date ranges
+        assert container.get_summary("GME") is None
+
+    def test_write_behind(self, ticker_sample_data_dir, tmpdir):
+        sample_data_container = FileBackedTicketContainer(ticker_sample_data_dir)
+        new_container = FileBackedTicketContainer(tmpdir, write_behind=True)
+
+        for ticker, ticker_history in sample_data_container.get_data().items():
+            new_container.store_ticker(ticker, ticker_history)
+            # Stored tickers are readable, even if their file is not written yet
+            assert new_container[ticker] is not None
+        assert new_container.get_tickers() == ["AMC", "GME", "TSLA"]
+        new_container.close()
+
+        for ticker in ["AMC", "GME", "TSLA"]:
+            with open(os.path.join(tmpdir, f"{ticker}.csv")) as new_fd, \
+                    open(os.path.join(ticker_sample_data_dir, f"{ticker}.csv")) as sample_fd:
+                assert new_fd.read() == sample_fd.read()
+        assert not [name for name in os.listdir(tmpdir) if name.endswith(".tmp")]
+        assert FileBackedTicketContainer(tmpdir).get_summary("GME") is not None
+
+    def test_write_behind_reports_write_errors(self, ticker_sample_data_dir, tmpdir):
+        new_container = FileBackedTicketContainer(os.path.join(tmpdir, "missing"), write_behind=True)
+
+        new_container.store_ticker("GME", FileBackedTicketContainer(ticker_sample_data_dir)["GME"])
+
+        with pytest.raises(IOError):
+            new_container.close()
+
+    def test_blob_store(self, ticker_sample_data_dir, tmpdir):
+        sample_data = FileBackedTicketContainer(ticker_sample_data_dir).get_data()
+        containers = [FileBackedTicketContainer(tmpdir.mkdir(f"output_{i}"), blob_store_path=tmpdir.join("blobs"))
+                      for i in range(3)]
+
+        for container in containers:
+            for ticker, ticker_history in sample_data.items():
+                container.store_ticker(ticker, ticker_history)
+            container.close()
+
+        for container in containers:
+            assert container.get_tickers() == ["AMC", "GME", "TSLA"]
+            assert container["GME"].equals(sample_data["GME"])
+            assert container.get_summary("GME") is not None
+        # Each ticker file is a link to the blob of its content
+        assert os.stat(containers[0]._ticker_data_path("GME")).st_nlink == 4
+        assert os.path.samefile(containers[0]._ticker_data_path("GME"), containers[2]._ticker_data_path("GME"))
+
 
 def assert_ticker_history_data_frame_layout(ticker_history: TickerHistory):
     assert ticker_history.index.name == "Date"
@@ -99,6 +171,65 @@ def test_load_ticker_history_from_csv(ticker_sample_data_dir):
     assert_ticker_history_data_frame_layout(ticker_history)
 
 
+def test_load_ticker_history_from_csv_uses_schema_types(ticker_sample_data_dir):
+    gme_csv = os.path.join(ticker_sample_data_dir, "GME.csv")
+    ticker_history = load_ticker_history_from_csv(gme_csv)
+
+    assert ticker_history.dtypes.to_dict() == TICKER_HISTORY_DTYPES
+    assert ticker_history.equals(pd.read_csv(gme_csv, index_col="Date"))
+
+
+def test_load_ticker_history_from_csv_infers_types_of_incomplete_data():
+    csv = io.StringIO("Date,Adj Close,Volume\n2021-01-04,17.25,\n2021-01-05,17.37,4961500\n")
+
+    ticker_history = load_ticker_history_from_csv(csv)
+
+    assert len(ticker_history) == 2
+    assert ticker_history["Volume"].isna().iloc[0]
+
+
+def test_load_ticker_history_from_csv_with_columns(ticker_sample_data_dir):
+    ticker_history = load_ticker_history_from_csv(os.path.join(ticker_sample_data_dir, "GME.csv"),
+                                                  columns=["Adj Close", "date_id"])
+
+    assert ticker_history.index.name == "Date"
+    assert list(ticker_history) == ["Adj Close", "date_id"]
+
+
+@pytest.mark.parametrize("start_date, end_date", [("2021-01-04", "2021-02-26"), ("2021-01-02", None),
+                                                  (None, "2020-12-31"), ("2019-12-31", "2019-12-31"),
+                                                  ("2030-01-01", None), (None, "1990-01-01")])
+def test_load_ticker_history_from_csv_with_date_range(ticker_sample_data_dir, start_date, end_date):
+    gme_csv = os.path.join(ticker_sample_data_dir, "GME.csv")
+    ticker_history = load_ticker_history_from_csv(gme_csv)
+    expected_history = ticker_history[((start_date is None) | (ticker_history.index >= (start_date or ""))) &
+                                      ((end_date is None) | (ticker_history.index <= (end_date or "")))]
+
+    ranged_history = load_ticker_history_from_csv(gme_csv, start_date=start_date, end_date=end_date)
+
+    assert list(ranged_history.index) == list(expected_history.index)
+    assert ranged_history.values.tolist() == expected_history.values.tolist()
+
+
+def test_load_ticker_history_from_csv_with_pyarrow(ticker_sample_data_dir):
+    pytest.importorskip("pyarrow")
+    gme_csv = os.path.join(ticker_sample_data_dir, "GME.csv")
+
+    ticker_history = load_ticker_history_from_csv(gme_csv, engine="pyarrow")
+
+    pd.testing.assert_frame_equal(ticker_history, load_ticker_history_from_csv(gme_csv))
+
+
+def test_load_ticker_histories_from_csv(ticker_sample_data_dir):
+    file_paths = {ticker: os.path.join(ticker_sample_data_dir, f"{ticker}.csv") for ticker in ["TSLA", "AMC", "GME"]}
+
+    ticker_histories = load_ticker_histories_from_csv(file_paths, max_workers=2)
+
+    assert list(ticker_histories) == ["TSLA", "AMC", "GME"]
+    for ticker, path in file_paths.items():
+        assert ticker_histories[ticker].equals(load_ticker_history_from_csv(path))
+
+
 @pytest.mark.integration_test
 def test_load_ticker_history_equality(tmpdir):
     gme_csv = os.path.join(tmpdir, "GNE.csv")
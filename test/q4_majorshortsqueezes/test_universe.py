@@ -0,0 +1,73 @@
+import math
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from q4_majorshortsqueezes.universe import get_listings, parse_market_cap, select_symbols, UniverseStore
+
+
+def listings(*rows):
+    return pd.DataFrame(rows, columns=["symbol", "exchange", "sector", "market_cap"])
+
+
+@pytest.fixture()
+def store(tmpdir):
+    store = UniverseStore(str(tmpdir))
+    store.save(listings(("AMC", "nyse", "Consumer Services", 1200.0),
+                        ("GME", "nyse", "Consumer Services", 300.0)), "2021-01-01")
+    store.save(listings(("GME", "nyse", "Consumer Services", 24000.0),
+                        ("TSLA", "nasdaq", "Capital Goods", 800000.0),
+                        ("XYZ", "amex", "", float("nan"))), "2021-02-01")
+    yield store
+
+
+def test_parse_market_cap():
+    assert parse_market_cap("$1.5B") == 1500
+    assert parse_market_cap("$300M") == 300
+    assert parse_market_cap("1,234,000,000.00") == 1234
+    assert math.isnan(parse_market_cap(""))
+
+
+def test_snapshot_round_trip(store):
+    assert store.snapshot_ids() == ["2021-01-01", "2021-02-01"]
+    assert store.resolve("latest") == "2021-02-01"
+    assert store.previous("2021-02-01") == "2021-01-01"
+    assert store.previous("2021-01-01") is None
+
+    snapshot = store.load("latest")
+    assert snapshot["symbol"].tolist() == ["GME", "TSLA", "XYZ"]
+    assert snapshot["exchange"].tolist() == ["nyse", "nasdaq", "amex"]
+    assert snapshot["sector"].tolist() == ["Consumer Services", "Capital Goods", ""]
+    assert snapshot["market_cap"].tolist()[:2] == [24000.0, 800000.0]
+
+
+def test_unknown_snapshot(store):
+    with pytest.raises(ValueError):
+        store.load("2020-01-01")
+    with pytest.raises(ValueError):
+        UniverseStore(str(store.dir_path) + "/empty").resolve("latest")
+
+
+def test_diff(store):
+    change = store.diff("2021-01-01", "2021-02-01")
+    assert change.added == ["TSLA", "XYZ"]
+    assert change.removed == ["AMC"]
+
+
+def test_select_symbols(store):
+    snapshot = store.load("2021-02-01")
+    assert select_symbols(snapshot, ["nyse", "nasdaq", "amex"]) == ["GME", "TSLA", "XYZ"]
+    assert select_symbols(snapshot, ["nyse", "amex"], min_market_cap=1000) == ["GME"]
+
+
+def test_get_listings():
+    rows = pd.DataFrame({"symbol": ["GME", "BRK^A", "AMC "],
+                         "sector": ["Consumer Services", "Finance", None],
+                         "marketCap": ["24,000,000,000.00", "$500B", ""]})
+    with mock.patch("q4_majorshortsqueezes.get_tickers_fixed.__exchange2df", return_value=rows):
+        result = get_listings(["nyse"])
+    assert result["symbol"].tolist() == ["GME", "AMC"]
+    assert result["exchange"].tolist() == ["nyse", "nyse"]
+    assert result["sector"].tolist() == ["Consumer Services", ""]
+    assert result["market_cap"].tolist()[0] == 24000.0